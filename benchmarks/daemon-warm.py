@@ -0,0 +1,103 @@
+"""
+The non-interactive work of `branch-new` (imports, Jira tickets for the picker,
+reconciling the pick) with and without a warm `cliutils daemon`, each in a fresh
+process as a real invocation is: `make bench-daemon-warm ARGS=RUNS`. Jira is a
+local stub serving 200 tickets; the target for a warm run is 50 ms.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+TARGET_MS = 50
+# What branch-new does before the picker opens and after a ticket is picked
+INVOCATION = """
+import time
+started = time.perf_counter()
+from cliutils.commands import branch_new
+from cliutils.tools import ClientConnections
+with ClientConnections() as clients:
+    tickets = clients.jira.retrieve_tickets()
+    clients.jira.reconcile_ticket(tickets[0])
+print((time.perf_counter() - started) * 1000)
+"""
+
+
+class JiraStub(BaseHTTPRequestHandler):
+    body = json.dumps({
+        "issues": [{"key": f"DATA-{number}", "fields": {"summary": f"Fix model {number}"}} for number in range(200)],
+        "isLast": True,
+    }).encode("utf-8")
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+def run(env, runs):
+    """Median in-process and whole-process milliseconds over runs fresh invocations."""
+    work, wall = [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", INVOCATION], env=env, capture_output=True, text=True, check=True
+        ).stdout
+        wall.append((time.perf_counter() - started) * 1000)
+        work.append(float(output))
+    return statistics.median(work), statistics.median(wall)
+
+
+def main(runs: int = 10):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JiraStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as home:
+        Path(home, ".cliutils").mkdir()
+        Path(home, ".cliutils", "cliutils-config.yaml").write_text('general:\n  team-tag: "DATA"\n')
+        host, port = server.server_address
+        env = {
+            **os.environ, "HOME": home, "JIRA_BASE_URL": f"http://{host}:{port}",
+            "JIRA_EMAIL": "bench@example.com", "JIRA_USERNAME": "bench", "JIRA_TOKEN": "bench",
+        }
+        env.pop("CLIUTILS_NO_DAEMON", None)
+        socket_path = Path(home, ".cliutils", "daemon.sock")
+
+        # The first run fills the on-disk ticket cache both paths then read from
+        run({**env, "CLIUTILS_NO_DAEMON": "1"}, 1)
+        results = {"in-process": run({**env, "CLIUTILS_NO_DAEMON": "1"}, runs)}
+
+        daemon = subprocess.Popen(  # pylint: disable=consider-using-with
+            [sys.executable, "-m", "cliutils", "daemon"], env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            while not socket_path.exists():
+                time.sleep(0.02)
+            run(env, 1)  # warms the daemon's client and parsed cache
+            results["warm daemon"] = run(env, runs)
+        finally:
+            subprocess.run([sys.executable, "-m", "cliutils", "daemon", "--stop"], env=env,
+                           capture_output=True, check=False)
+            daemon.wait(10)
+    server.shutdown()
+
+    for label, (work, wall) in results.items():
+        print(
+            f"{label:<12} work {work:6.1f} ms (target {TARGET_MS} ms), "
+            f"process {wall:6.1f} ms, median of {runs}"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
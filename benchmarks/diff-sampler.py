@@ -0,0 +1,85 @@
+"""
+Sample a synthetic diff of about MB megabytes (default 500) against capturing
+it whole: `make bench-diff-sampler ARGS=MB`. Most of the diff is a lockfile and
+compiled output, with 200 changed models alongside.
+"""
+import contextlib
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from cliutils.tools.diff_sampler import DEFAULT_MAX_DIFF_CHARS, DiffSampler
+
+
+def peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_lines(path, count, template):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as stream:
+        for start in range(0, count, 10000):
+            stream.write("".join(
+                template.format(number) for number in range(start, min(count, start + 10000))
+            ))
+
+
+def main(megabytes: int = 500):
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+
+        def git(*args):
+            subprocess.run(["git", *args], cwd=root, check=True, capture_output=True)
+
+        git("init", "-q")
+        for number in range(200):
+            write_lines(root / "models" / f"model_{number}.sql", 50, "select {0} as column_{0}\n")
+        git("add", ".")
+        git("-c", "user.name=bench", "-c", "user.email=bench@localhost", "commit", "-qm", "base")
+
+        generated = megabytes * 1024 * 1024 * 9 // 10
+        write_lines(root / "Pipfile.lock", generated * 2 // 3 // 64, '{0:>12} = "sha256:{0:0>43}"\n')
+        write_lines(
+            root / "target" / "compiled" / "run.sql", generated // 3 // 64,
+            "select * from analytics.orders where id = {0:>27} -- c\n",
+        )
+        for number in range(200):
+            write_lines(
+                root / "models" / f"model_{number}.sql",
+                megabytes * 1024 * 1024 // 10 // 200 // 48,
+                "select {0} as renamed_column_{0}, now() as at\n",
+            )
+        git("add", ".")
+        git("-c", "user.name=bench", "-c", "user.email=bench@localhost", "commit", "-qm", "change")
+
+        # DiffSampler runs git in the current directory, as the commands do
+        with contextlib.chdir(root):
+            sampler = DiffSampler(max_chars=DEFAULT_MAX_DIFF_CHARS)
+            before = peak_mb()
+            started = time.perf_counter()
+            sample = sampler.sample("HEAD~1", "HEAD")
+            elapsed = time.perf_counter() - started
+        print(
+            f"sampler: {elapsed:6.2f} s, peak RSS +{peak_mb() - before:6.1f} MB, "
+            f"{len(sample.files)} files, {len(sample.sampled)} sampled, "
+            f"{len(sample.patch)} chars"
+        )
+
+        before = peak_mb()
+        started = time.perf_counter()
+        whole = subprocess.run(
+            ["git", "diff", "HEAD~1", "HEAD"], cwd=root, capture_output=True, text=True, check=True
+        ).stdout
+        head = whole[:DEFAULT_MAX_DIFF_CHARS]
+        elapsed = time.perf_counter() - started
+        print(
+            f"capture: {elapsed:6.2f} s, peak RSS +{peak_mb() - before:6.1f} MB, "
+            f"{len(whole) / 1024 / 1024:.0f} MB read, first {len(head)} chars kept "
+            f"(starting in {head.split(chr(10), 1)[0].split(' b/')[-1]})"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,44 @@
+"""Per-keystroke filter latency of FuzzyIndex at 1k/10k/100k candidates: `make bench-fuzzy-index`."""
+# pylint: disable=protected-access
+import random
+import statistics
+import time
+from cliutils.tools.fuzzy_index import FuzzyIndex
+
+WORDS = ["models", "staging", "orders", "customers", "dag", "airflow", "fix", "add",
+         "refactor", "snapshot", "macros", "seeds", "revenue", "daily", "sync", "jira"]
+QUERIES = ["orders daily", "stgcust", "refactor macros", "DATA-12"]
+
+
+def main():
+    random.seed(7)
+    for size in (1_000, 10_000, 100_000):
+        labels = [
+            f"DATA-{number} " + " ".join(random.choices(WORDS, k=5)) + f"/{number}.sql"
+            for number in range(size)
+        ]
+        started = time.perf_counter()
+        index = FuzzyIndex(labels)
+        indexed = time.perf_counter() - started
+
+        incremental, rescans = [], []
+        for query in QUERIES:
+            for end in range(1, len(query) + 1):
+                started = time.perf_counter()
+                index.search(query[:end])
+                incremental.append(time.perf_counter() - started)
+                fresh = FuzzyIndex()
+                fresh.labels, fresh._lowered, fresh._masks = index.labels, index._lowered, index._masks
+                started = time.perf_counter()
+                fresh.search(query[:end])
+                rescans.append(time.perf_counter() - started)
+        print(
+            f"{size:>7} candidates: index {indexed * 1000:7.1f} ms | per keystroke "
+            f"p50 {statistics.median(incremental) * 1000:6.2f} ms, "
+            f"max {max(incremental) * 1000:6.2f} ms | full rescan p50 "
+            f"{statistics.median(rescans) * 1000:6.2f} ms, max {max(rescans) * 1000:6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+GitRepo's porcelain v2 status and staging on a synthetic repo with CHANGES
+changed files (default 50k): `make bench-git-status ARGS=CHANGES`. Of the
+changes, 60% are modified, 10% deleted and 30% untracked, over 250 directories.
+"""
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from cliutils.tools.git_repo import STATUS_COMMAND, GitRepo, change_paths
+
+DIRECTORIES = 250
+
+
+def timed(label, call):
+    started = time.perf_counter()
+    result = call()
+    print(f"{label:<48} {(time.perf_counter() - started) * 1000:8.1f} ms")
+    return result
+
+
+def main(changes: int = 50_000):
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+
+        def git(*args, **kwargs):
+            return subprocess.run(["git", *args], cwd=root, check=True, capture_output=True, **kwargs)
+
+        def path(number):
+            return root / f"models_{number % DIRECTORIES}" / f"model_{number}.sql"
+
+        git("init", "-q")
+        tracked = changes * 7 // 10
+        for number in range(tracked):
+            path(number).parent.mkdir(exist_ok=True)
+            path(number).write_text(f"select {number}\n")
+        git("add", ".")
+        git("-c", "user.name=bench", "-c", "user.email=bench@localhost", "commit", "-qm", "base")
+        for number in range(tracked):
+            if number % 7 == 0:
+                path(number).unlink()
+            else:
+                path(number).write_text(f"select {number} as changed\n")
+        for number in range(tracked, changes):
+            path(number).write_text(f"select {number} as new\n")
+
+        timed("git status --short", lambda: git("status", "--short"))
+        timed("git status --porcelain=v2 -z", lambda: git(*STATUS_COMMAND[1:]))
+        repo = GitRepo(cwd=root)
+        status = timed("GitRepo.status (git + parse)", lambda: repo.status)
+        groups = timed("GitRepo.changes_by_directory", repo.changes_by_directory)
+        print(f"{len(status.changes)} changes in {len(groups)} directories")
+
+        paths = change_paths(status.changes)
+        timed("GitRepo.stage, every file (update-index)", lambda: repo.stage(paths))
+        git("reset", "-q")
+        timed("GitRepo.stage, every directory (git add)", lambda: repo.stage(list(groups)))
+        git("reset", "-q")
+        timed(
+            "git add --pathspec-from-file, every file",
+            lambda: git(
+                "add", "--pathspec-from-file=-", "--pathspec-file-nul",
+                input="".join(f":(top,literal){path}\0" for path in paths).encode(),
+            ),
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,53 @@
+"""
+Handing 1k/10k/100k options to a gum picker as argv against over stdin:
+`make bench-gum-options`. A stand-in `gum` on PATH answers with the first
+option at once, so the timings are the handoff alone, not a user choosing.
+"""
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from cliutils.tools.gum_prompts import GumPrompts
+from cliutils.tools.subprocess_utilities import SubprocessUtilities
+
+RUNS = 5
+# Answers with the first option, from argv for `gum choose OPTION...`, else after reading
+# all of stdin as gum does
+FAKE_GUM = """#!/bin/sh
+if [ "$1" = choose ] && [ $# -gt 1 ] && [ "${2#--}" = "$2" ]; then echo "$2"; else sed -n 1p; fi
+"""
+
+
+def timed(call):
+    timings = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return f"p50 {statistics.median(timings) * 1000:7.1f} ms, best {min(timings) * 1000:7.1f} ms"
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        gum = Path(directory, "gum")
+        gum.write_text(FAKE_GUM)
+        gum.chmod(0o755)
+        os.environ["PATH"] = f"{directory}{os.pathsep}{os.environ['PATH']}"
+        os.environ["CLIUTILS_PROMPTS"] = "gum"
+        prompts, subprocess_utils = GumPrompts(), SubprocessUtilities()
+
+        for size in (1_000, 10_000, 100_000):
+            options = [f"DATA-{number} models/staging/orders/stg_orders_{number}.sql" for number in range(size)]
+            try:
+                argv = timed(lambda: subprocess_utils.execute(["gum", "choose", *options]))
+            except OSError as exc:
+                argv = f"fails: {exc.strerror}"
+            print(f"{size:>7} options ({sum(map(len, options)) / 1e6:5.2f} MB)")
+            print(f"  argv,  gum choose: {argv}")
+            print(f"  stdin, gum choose: {timed(lambda: prompts.gum_choose(options))}")
+            print(f"  stdin, gum filter: {timed(lambda: prompts.gum_filter(options, 'Ticket'))}")
+
+
+if __name__ == "__main__":
+    main()
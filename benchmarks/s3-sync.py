@@ -0,0 +1,69 @@
+"""
+Sync throughput for many small DAG files against a local moto server:
+`make bench-s3-sync ARGS=FILES` (needs `pip install "moto[server]"`).
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from moto.server import ThreadedMotoServer
+from cliutils.tools.s3_sync import DEFAULT_MAX_WORKERS, S3Sync
+
+
+def sync(label, root, url, workers=DEFAULT_MAX_WORKERS, verify=False, dry_run=False):
+    syncer = S3Sync(root, url, max_workers=workers)
+    started = time.perf_counter()
+    plan = syncer.plan(verify=verify)
+    planned = time.perf_counter() - started
+    if not dry_run:
+        syncer.apply(plan)
+    took = time.perf_counter() - started
+    print(
+        f"{label:<30} {len(plan.uploads):>6} up {len(plan.deletes):>3} del | "
+        f"plan {planned * 1000:7.1f} ms{' (listed)' if plan.listed else '         '} | "
+        f"total {took:6.2f}s"
+        + (f" | {len(plan.uploads) / took:6.0f} files/s" if plan.uploads and not dry_run else "")
+    )
+    return syncer
+
+
+def main(files: int = 10_000):
+    os.environ.update(
+        AWS_ACCESS_KEY_ID="testing", AWS_SECRET_ACCESS_KEY="testing", AWS_DEFAULT_REGION="us-east-1"
+    )
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=0, verbose=False)
+    server.start()
+    os.environ["AWS_ENDPOINT_URL"] = "http://%s:%d" % server.get_host_and_port()
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            dags = Path(root, "dags")
+            for number in range(files):
+                path = dags / f"team_{number % 40}" / f"dag_{number}.py"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(f"# DAG {number}\n" + "x = 1\n" * (number % 200))
+
+            url = "s3://bench/dags"
+            S3Sync(dags, url).client.create_bucket(Bucket="bench")
+            syncers = [
+                sync("first sync, 1 worker (1/40)", dags / "team_0", "s3://bench/one", workers=1),
+                sync(f"first sync, {DEFAULT_MAX_WORKERS} workers", dags, url),
+            ]
+            sync("no-op re-sync", dags, url)
+            sync("no-op re-sync, verified", dags, url, verify=True)
+            for number in range(0, files, 100):
+                Path(dags / f"team_{number % 40}" / f"dag_{number}.py").write_text("# changed\n")
+            Path(dags / "team_1" / "dag_1.py").unlink()
+            sync("dry run after 100 edits", dags, url, dry_run=True)
+            sync("re-sync after 100 edits", dags, url)
+            # The manifests are kept under CLIUTILS_HOME; the temporary trees they describe are not
+            for syncer in syncers:
+                syncer.manifest_path.unlink(missing_ok=True)
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
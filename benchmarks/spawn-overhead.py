@@ -0,0 +1,104 @@
+"""
+Per-call cost of starting a command, through SubprocessUtilities.execute against
+a shell as commands were run before: `make bench-spawn-overhead ARGS=CALLS`.
+The last scenario adds up the calls of a typical `cliutils commit`, with
+stand-ins for gum and gh that exit at once.
+"""
+import contextlib
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from cliutils.tools.subprocess_utilities import SubprocessUtilities
+
+COMMANDS = [["true"], ["git", "--version"], ["git", "rev-parse", "--show-toplevel"]]
+# What a split commit runs before and around its prompts, read-only so it can repeat
+COMMIT_RUN = [
+    ["git", "rev-parse", "--show-toplevel"],
+    ["git", "--no-optional-locks", "status", "--porcelain=v2", "--branch", "-z"],
+    ["gum", "filter", "--no-limit", "--header", "Which File(s) Go In Commit 1?"],
+    ["gum", "choose", "--header", "Commit Type", "Feat", "Fix", "Chore"],
+    ["gum", "input", "--header", "Commit Message"],
+    ["git", "symbolic-ref", "--quiet", "HEAD"],
+    ["gh", "auth", "status"],
+]
+FAKE_TOOL = "#!/bin/sh\nexit 0\n"
+
+
+def timed(call, calls):
+    timings = _timings(call, calls)
+    return (
+        f"p50 {statistics.median(timings) * 1000:6.2f} ms, "
+        f"p90 {sorted(timings)[calls * 9 // 10] * 1000:6.2f} ms"
+    )
+
+
+def _timings(call, calls):
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def commit_run(calls):
+    """All of COMMIT_RUN per run, in a scratch repository with gum and gh on PATH."""
+    with tempfile.TemporaryDirectory() as directory, contextlib.chdir(directory):
+        for tool in ("gum", "gh"):
+            path = Path(directory, "bin", tool)
+            path.parent.mkdir(exist_ok=True)
+            path.write_text(FAKE_TOOL)
+            path.chmod(0o755)
+        os.environ["PATH"] = f"{directory}/bin{os.pathsep}{os.environ['PATH']}"
+        subprocess.run(["git", "init", "--quiet"], check=True)
+        subprocess_utils = SubprocessUtilities()
+
+        def through_shell():
+            for argv in COMMIT_RUN:
+                subprocess.run(
+                    shlex.join(argv), shell=True, capture_output=True, text=True, check=False
+                )
+
+        def through_execute():
+            for argv in COMMIT_RUN:
+                subprocess_utils.execute(argv, check=False)
+
+        runs = max(1, calls // len(COMMIT_RUN))
+        shell = statistics.median(_timings(through_shell, runs))
+        direct = statistics.median(_timings(through_execute, runs))
+
+    print(f"typical commit run ({len(COMMIT_RUN)} git/gum/gh calls, p50 of {runs} runs)")
+    print(f"  shell=True:            {shell * 1000:6.2f} ms")
+    print(f"  execute (posix_spawn): {direct * 1000:6.2f} ms")
+    print(f"  saved per run:         {(shell - direct) * 1000:6.2f} ms ({1 - direct / shell:.0%})")
+
+
+def main(calls: int = 200):
+    subprocess_utils = SubprocessUtilities()
+    for argv in COMMANDS:
+        command = " ".join(argv)
+        print(command)
+        print("  shell=True:            " + timed(
+            lambda: subprocess.run(
+                command, shell=True, capture_output=True, text=True, check=False
+            ),
+            calls,
+        ))
+        # Without cwd, the resolved executable lets subprocess use posix_spawn
+        print("  execute (posix_spawn): " + timed(
+            lambda: subprocess_utils.execute(argv, check=False), calls
+        ))
+        # A cwd makes subprocess fall back to fork and exec
+        print("  execute (cwd=.):       " + timed(
+            lambda: subprocess_utils.execute(argv, check=False, cwd="."), calls
+        ))
+    commit_run(calls)
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,72 @@
+"""Search latency of TicketIndex at 100k synthetic tickets: `make bench-ticket-index`."""
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from cliutils.tools.ticket_index import DEFAULT_SPRINT_FIELD, TicketIndex
+
+STATUSES = ["To Do", "In Progress", "In Review", "Done"]
+PEOPLE = ["Ada Lovelace", "Grace Hopper", "Alan Turing", "Edsger Dijkstra", None]
+SYLLABLES = ["or", "der", "cus", "to", "mer", "re", "ve", "nue", "bil", "ling", "sta", "ging",
+             "mo", "del", "snap", "shot", "ma", "cro", "dai", "ly", "sync", "ex", "port", "dag"]
+
+
+class FakeJira:
+    """Serves size synthetic tickets as search/jql pages."""
+
+    def __init__(self, size, words):
+        self.size = size
+        self.words = words
+        self.weights = [1 / rank for rank in range(1, len(words) + 1)]
+
+    def iter_issue_pages(self, _jql_query, _fields, page_size, quiet):  # pylint: disable=unused-argument
+        for start in range(0, self.size, page_size):
+            yield [
+                {
+                    "key": f"DATA-{number}",
+                    "fields": {
+                        "summary": " ".join(random.choices(self.words, self.weights, k=7)),
+                        "status": {"name": random.choice(STATUSES)},
+                        "assignee": {"displayName": person} if (person := random.choice(PEOPLE)) else None,
+                        "labels": random.choices(self.words[:50], k=2),
+                        "updated": "2024-01-01T00:00:00.000+0000",
+                        DEFAULT_SPRINT_FIELD: [{"name": f"Sprint {number // 2000}", "state": "closed"}],
+                    },
+                }
+                for number in range(start, min(start + page_size, self.size))
+            ]
+
+
+def main():
+    random.seed(7)
+    # A Zipf-distributed vocabulary, like real summaries: a few words are everywhere
+    words = sorted({"".join(random.choices(SYLLABLES, k=random.randint(2, 4))) for _ in range(6000)})
+    random.shuffle(words)
+    queries = [" ".join(words[rank] for rank in ranks) for ranks in ((0,), (40, 300), (900, 2000, 15))]
+    queries += [words[120][:3], "DATA-4242", ""]
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = TicketIndex("https://example.atlassian.net", ["DATA"], path=Path(directory) / "tickets.sqlite3")
+        started = time.perf_counter()
+        result = index.sync(FakeJira(100_000, words))
+        synced = time.perf_counter() - started
+        size_mb = index.path.stat().st_size / 1e6
+        print(f"indexed {result.fetched} tickets in {synced:.1f} s ({size_mb:.0f} MB)")
+
+        for query in queries:
+            for filters in ({}, {"status": "In Progress"}):
+                timings = []
+                for _ in range(20):
+                    started = time.perf_counter()
+                    found = index.search(query, **filters)
+                    timings.append(time.perf_counter() - started)
+                print(
+                    f"{query or '(recent)':>28} {str(filters or ''):>25}: {len(found):>2} results, "
+                    f"p50 {statistics.median(timings) * 1000:6.2f} ms, max {max(timings) * 1000:6.2f} ms"
+                )
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
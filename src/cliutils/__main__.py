@@ -1,21 +1,78 @@
 from pathlib import Path
+import logging
+import os
+import sys
+import time
 import click
-from cliutils.cliutils_config import init_cliutils
+from cliutils import tracing
 from cliutils.commands import COMMANDS
+from cliutils.lazy_group import LazyGroup
+
+STARTED = time.perf_counter()
+STARTED_AT = time.time()
 
 config_path = Path.home() / ".cliutils" / "cliutils-config.yaml"
 
-if not config_path.exists():
-    init_cliutils()
+COMMAND_NAME = next((arg for arg in sys.argv[1:] if not arg.startswith("-")), None)
+
+def _records_metrics():
+    """Whether this invocation's timings go to the metrics store for `cliutils stats`."""
+    if os.environ.get("CLIUTILS_METRICS", "").lower() in ("0", "false", "no"):
+        return False
+    spec = COMMANDS.get(COMMAND_NAME)
+    return spec is not None and spec.record_metrics
+
+# Span totals for the metrics store; collected from the start so imports are included.
+# Without them, and without --trace, spans cost nothing
+phase_totals = tracing.collect_phases() if _records_metrics() else None
 
-@click.group()
-def main():
+def _enable_tracing(ctx, _param, value):
+    """Start tracing before the command module is imported, so its imports are traced too."""
+    trace_env = os.environ.get("CLIUTILS_TRACE", "")
+    if not value and trace_env.lower() in ("", "0", "false", "no"):
+        return
+    path = None if value or trace_env.lower() in ("1", "true", "yes") else Path(trace_env)
+    tracing.enable(path, COMMAND_NAME or ctx.info_name)
+
+@click.group(cls=LazyGroup, lazy_commands=COMMANDS)
+@click.option('--debug', is_flag=True, envvar="CLIUTILS_DEBUG", help="Print debug timings to stderr.")
+@click.option(
+    '--trace',
+    is_flag=True,
+    is_eager=True,
+    expose_value=False,
+    callback=_enable_tracing,
+    help="Record subprocess, HTTP, config and prompt timings to ~/.cliutils/traces "
+    "(Chrome trace JSON) and print a summary. CLIUTILS_TRACE=1, or a file path, does the same.",
+)
+@click.pass_context
+def main(ctx, debug):
     """
 	This is a command line tool that helps with common git and python tasks.
 	"""
+    if debug:
+        logging.basicConfig(level=logging.DEBUG, format="%(name)s: %(message)s")
+    if phase_totals is not None:
+        ctx.call_on_close(lambda: _record_metrics(ctx))
+    if not config_path.exists():
+        from cliutils.cliutils_config import init_cliutils  # pylint: disable=import-outside-toplevel
+
+        init_cliutils()
+
+def _record_metrics(ctx):
+    """Store this invocation's timings; runs as the context closes, even on an error."""
+    if ctx.invoked_subcommand is None:
+        return
+    from cliutils.tools.metrics_store import (  # pylint: disable=import-outside-toplevel
+        RECORD_METRICS,
+        record_invocation,
+    )
 
-for command in COMMANDS:
-    main.add_command(command)
+    if not ctx.meta.get(RECORD_METRICS, True):
+        return
+    record_invocation(
+        ctx.invoked_subcommand, STARTED_AT, STARTED, sys.exc_info()[1], phase_totals
+    )
 
 if __name__ == "__main__":
     main()
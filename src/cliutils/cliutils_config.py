@@ -46,6 +46,5 @@ def init_cliutils():
         file.write("theme:\n")
         file.write("  name: \"iron_gold\"\n")
         file.write("excluded-commands:\n")
-        file.write("  - cmd_s3-sync\n")
         file.write("  - __init__\n")
     console.print("Initialized .cliutils Directory", style="bold green")
@@ -1,12 +1,61 @@
-from .branch_new import branch_new
-from .commit import commit
-from .pr_create import pr_create
-from .theme_select import theme_select
+from cliutils.lazy_group import CommandSpec
 
 
-COMMANDS = [
-    branch_new,
-    commit,
-    pr_create,
-    theme_select,
-]
+COMMANDS = {
+    "branch-new": CommandSpec(
+        "cliutils.commands.branch_new",
+        "branch_new",
+        "Create and push a branch for one of your sprint tickets.",
+    ),
+    "commit": CommandSpec(
+        "cliutils.commands.commit",
+        "commit",
+        "Constructs a commit to your remote branch.",
+    ),
+    "daemon": CommandSpec(
+        "cliutils.commands.daemon",
+        "daemon",
+        "Keeps Jira sessions and caches warm between cliutils invocations.",
+    ),
+    "jobs": CommandSpec(
+        "cliutils.commands.jobs",
+        "jobs",
+        "Shows the pushes queued in the background by `commit --background-push`.",
+    ),
+    "pr-create": CommandSpec(
+        "cliutils.commands.pr_create",
+        "pr_create",
+        "Opens a new draft pull request in the current repository.",
+    ),
+    "pr-status": CommandSpec(
+        "cliutils.commands.pr_status",
+        "pr_status",
+        "Shows review, checks and mergeability for all of your open pull requests.",
+    ),
+    "prompt-segment": CommandSpec(
+        "cliutils.commands.prompt_segment",
+        "prompt_segment",
+        "Prints the git branch and status of a directory for your shell prompt.",
+        record_metrics=False,
+    ),
+    "s3-sync": CommandSpec(
+        "cliutils.commands.s3_sync",
+        "s3_sync",
+        "Uploads changed DAG and plugin files to their S3 locations.",
+    ),
+    "stats": CommandSpec(
+        "cliutils.commands.stats",
+        "stats",
+        "Reports how long cliutils commands take, from the local metrics store.",
+    ),
+    "theme-select": CommandSpec(
+        "cliutils.commands.theme_select",
+        "theme_select",
+        "Select a color theme for your CLIUtils package in the terminal.",
+    ),
+    "ws": CommandSpec(
+        "cliutils.commands.ws",
+        "ws",
+        "Runs repository commands across every repo in your workspace at once.",
+    ),
+}
@@ -1,40 +1,203 @@
+import itertools
+import logging
+import os
+import signal
+import subprocess
 import sys
+import threading
+import time
 import click
 from cliutils.tools import (
     GumPrompts,
     ConfigManager,
     SubprocessUtilities,
+    GitRepo,
+    TaskScheduler,
     ClientConnections,
 )
+from cliutils.tools.subprocess_utilities import CommandResult
+from cliutils.tools.ticket_index import DEFAULT_SPRINT_FIELD, TicketIndex
+from cliutils.tools.toolchain import requires_tools
+
+logger = logging.getLogger(__name__)
+
+FETCH_TIMEOUT = 120
+DEFAULT_INDEX_SYNC_INTERVAL = 300
+# How long a background index sync may finish its page once a ticket is picked
+SYNC_STOP_TIMEOUT = 5
 
 prompts = GumPrompts()
 config_manager = ConfigManager()
 subprocess_utils = SubprocessUtilities()
+repo = GitRepo(subprocess_utils)
 
 @click.command("branch-new")
-def branch_new():
+@click.option('--refresh', is_flag=True, help="Ignore cached Jira tickets and fetch them fresh.")
+@click.option('--search', '-s', 'query', metavar="TEXT", help="Search every ticket in your projects instead of your sprint tickets.")
+@click.option('--status', metavar="STATUS", help="With --search, only offer tickets in this status.")
+@requires_tools("git")
+def branch_new(refresh, query, status):
+    """
+    Create and push a branch for one of your sprint tickets.
+
+    Your open sprint tickets are pulled from Jira and offered in a filterable list.
+    The selected ticket's slug becomes the branch name, branched from an up to date
+    default branch and pushed to origin.
+
+    Tickets are served from a local cache when one exists and refreshed in the
+    background; pass --refresh to wait for fresh results from Jira instead. The
+    default branch is resolved and fetched while you pick a ticket.
+
+    With --search, any ticket in your projects (jira.index-projects, else your
+    team's) can be picked: the words are looked up in a local full-text index of
+    the tickets, best matches first, and Jira is only asked when nothing matches.
+    The index is built on first use and afterwards brought up to date in the
+    background, fetching just the tickets updated since; --refresh waits for that
+    instead. Ctrl-C while it is first built searches what is indexed so far, and
+    the next search carries on from there.
+    """
+    with TaskScheduler("branch-new") as scheduler:
+        # None of this depends on the ticket, so it runs while the picker is open
+        scheduler.start("fetch-default-branch", _fetch_default_branch, scheduler.stop)
+
+        if query is None:
+            ticket_slug = select_ticket_slug(refresh)
+        else:
+            ticket_slug = search_ticket_slug(query, status, refresh)
+        default_branch, fetch = scheduler.result("fetch-default-branch")
+
+    repo.run(["git", "checkout", default_branch])
+    if not fetch.ok:
+        print(f"Could not fetch origin/{default_branch}, pulling instead: {fetch.stderr}")
+    fast_forward = fetch.ok and repo.run(
+        ["git", "merge", "--ff-only", "--quiet", f"origin/{default_branch}"],
+        check=False,
+        capture_stderr=True,
+    ).ok
+    if not fast_forward:
+        repo.run(["git", "pull"])
+
+    repo.run(["git", "checkout", "-b", ticket_slug])
+    repo.run(["git", "push", "--set-upstream", "origin", ticket_slug])
+
+
+def select_ticket_slug(refresh: bool = False) -> str:
+    """Offer the sprint tickets in a picker and return the chosen ticket's branch slug."""
     with ClientConnections() as clients:
-        tickets = clients.jira.retrieve_tickets()
-        if not tickets:
+        # Wait for the first page only; the rest streams into the open picker
+        tickets = clients.jira.iter_tickets(refresh=refresh)
+        first_ticket = next(tickets, None)
+        if first_ticket is None:
             print("No tickets found")
             sys.exit(1)
 
-    ticket_titles = [ticket['title'] for ticket in tickets]
-    ticket_titles_string = " ".join([f"'{ticket}'" for ticket in ticket_titles])
-    selected_ticket = prompts.gum_filter(ticket_titles_string, "Select a ticket")
+        ticket = prompts.gum_filter(
+            itertools.chain([first_ticket], tickets),
+            "Select a ticket",
+            label=lambda ticket: ticket['title'],
+        )
+        return clients.jira.reconcile_ticket(ticket)['slug']
 
-    ticket_slug = [ ticket['slug'] for ticket in tickets if ticket['title'] == selected_ticket ][0]
 
-    _, pull_default_branch_name = subprocess_utils.run_and_capture_output(
-        "git rev-parse --abbrev-ref origin/HEAD"
+def search_ticket_slug(query: str, status: str = None, refresh: bool = False) -> str:
+    """Offer the indexed tickets matching query and return the chosen ticket's branch slug."""
+    index = _ticket_index()
+    interval = config_manager.config.get("jira", {}).get(
+        "index-sync-interval", DEFAULT_INDEX_SYNC_INTERVAL
     )
-    default_branch = pull_default_branch_name.replace("origin/", "")
+    stop = threading.Event()
+    background_sync = None
+    with ClientConnections() as clients:
+        last_synced = index.last_synced()
+        if refresh or last_synced is None:
+            _sync_index(index, clients.jira, first=last_synced is None)
+        elif time.time() - last_synced > interval:
+            # Search what is indexed now; the sync lands in time for the next search
+            background_sync = threading.Thread(
+                target=_sync_index_quietly, args=(clients.jira, stop), name="ticket-index-sync", daemon=True
+            )
+            background_sync.start()
 
-    subprocess_utils.run(f"git checkout {default_branch} && git pull")
+        try:
+            tickets = index.search(query, status=status)
+            if not tickets:
+                try:
+                    tickets = index.search_jira(clients.jira, query, status=status)
+                except Exception as exc:  # pylint: disable=broad-exception-caught
+                    logger.debug("Live ticket search failed: %s", exc)
+            if not tickets:
+                print("No tickets found")
+                sys.exit(1)
+            ticket = prompts.gum_filter(tickets, "Select a ticket", label=lambda ticket: ticket.label)
+        finally:
+            stop.set()
+            if background_sync is not None:
+                background_sync.join(SYNC_STOP_TIMEOUT)
+            index.close()
+    return ticket.slug
 
-    branch_creation_command = (
-        f'git checkout -b {ticket_slug}\
-            && git push --set-upstream origin {ticket_slug}'
+
+def _ticket_index() -> TicketIndex:
+    """The ticket index for the configured projects; one per thread, as SQLite requires."""
+    jira_config = config_manager.config.get("jira", {})
+    return TicketIndex(
+        os.getenv("JIRA_BASE_URL"),
+        jira_config.get("index-projects") or [config_manager.config["general"]["team-tag"]],
+        jira_config.get("sprint-field", DEFAULT_SPRINT_FIELD),
     )
 
-    subprocess_utils.run(branch_creation_command)
+
+def _sync_index(index, jira, first):
+    """Bring the index up to date while showing progress; Ctrl-C keeps what was fetched."""
+    console = config_manager.console
+    projects = ", ".join(index.projects)
+    message = f"Indexing the tickets in {projects}" if first else f"Updating the {projects} ticket index"
+    if first:
+        console.print(
+            f"{message} for the first time; Ctrl-C searches what is indexed so far",
+            style=config_manager.secondary_color,
+            markup=False,
+        )
+    try:
+        with console.status(f"{message}…") as spinner:
+            index.sync(jira, on_page=lambda fetched: spinner.update(f"{message}… {fetched} tickets"))
+    except KeyboardInterrupt:
+        console.print(
+            "Stopped; the next search carries on indexing", style=config_manager.quaternary_color
+        )
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        console.print(
+            f"Could not update the ticket index: {exc}",
+            style=config_manager.quaternary_color,
+            markup=False,
+        )
+
+
+def _sync_index_quietly(jira, stop):
+    index = _ticket_index()
+    try:
+        result = index.sync(jira, stop=stop)
+        logger.debug("Background index sync fetched %d ticket(s)", result.fetched)
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        logger.debug("Background index sync failed: %s", exc)
+    finally:
+        index.close()
+
+
+def _fetch_default_branch(stop=None):
+    """
+    Resolve the default branch and fetch it from origin without touching the terminal.
+    A fetch that times out comes back as a failed result, reported (and pulled
+    instead) once the picker has closed; setting stop (leaving the picker) kills it.
+    """
+    default_branch = repo.default_branch
+    argv = ["git", "fetch", "--quiet", "origin", default_branch]
+    try:
+        fetch = subprocess_utils.execute(
+            argv, check=False, capture_stderr=True, timeout=FETCH_TIMEOUT, stop=stop,
+        )
+    except subprocess.TimeoutExpired:
+        fetch = CommandResult(
+            tuple(argv), -signal.SIGKILL, FETCH_TIMEOUT, "", f"timed out after {FETCH_TIMEOUT}s"
+        )
+    return default_branch, fetch
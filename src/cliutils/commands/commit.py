@@ -1,16 +1,37 @@
+import os
+import time
 import click # type: ignore
 from cliutils.tools import (
     GumPrompts,
     ConfigManager,
     SubprocessUtilities,
+    GitRepo,
+    PushQueue,
+    ClientConnections,
 )
+from cliutils.tools.diff_sampler import DiffSampler
+from cliutils.tools.git_repo import ChangedDirectory, change_paths
+from cliutils.tools.toolchain import requires_tools
 
 prompts = GumPrompts()
 config_manager = ConfigManager()
 subprocess_utils = SubprocessUtilities()
+repo = GitRepo(subprocess_utils)
+# More picked files than this are sampled by their directories, keeping git's argv short
+MAX_SAMPLE_PATHSPECS = 1000
 
 @click.command("commit")
-def commit():
+@click.option('--by-directory', '-d', is_flag=True, help="Pick changed directories instead of single files.")
+@click.option('--known-only', is_flag=True, help="Stage only the paths git status reported instead of `git add .`.")
+@click.option(
+    '--background-push/--foreground-push',
+    default=None,
+    help="Queue the push for a background worker instead of waiting for it (default from commits.background-push).",
+)
+@click.option('--ai/--no-ai', 'use_ai', default=None, help="Suggest the commit type and message from the staged diff (default from ai.enabled).")
+@click.option('--split', is_flag=True, help="Sort the changes into several commits, then push them all at once.")
+@requires_tools("git")
+def commit(by_directory, known_only, background_push, use_ai, split):
     """
     Constructs a commit to your remote branch.
 
@@ -29,54 +50,206 @@ def commit():
     You add a file by selecting it with the tab key. Once you've selected all the
     files you'd like to add, you can press enter to continue. It will then ask you
     for a commit message and commit the changes.
+
+    With --by-directory the list shows each changed top-level directory instead, and
+    selecting one stages every change under it. With --known-only, committing all
+    changes stages just the paths `git status` reported rather than running `git add .`.
+    Selected paths are staged by a single git process over stdin, however many there are.
+
+    With --background-push (or `background-push: true` under commits in the config),
+    the push is queued for a background worker and the command returns as soon as the
+    commit is made; `cliutils jobs` shows how the queued pushes went.
+
+    With --split, the changes are sorted into several commits in one go: pick the
+    files (or, with --by-directory, the directories) for the first commit and give
+    its type and message, then the next, until nothing is left or you stop. The
+    commits are made one after another from that single `git status` and the
+    branch is pushed once at the end, with how many pushes that saved. With --ai,
+    each commit's changes are staged as soon as they are picked, and its type and
+    message are suggested from the staged diff of those changes alone.
+
+    With --ai (or `enabled: true` under ai in the config, and ANTHROPIC_API_KEY
+    set), a type and message are suggested from a sample of the staged diff and
+    pre-filled in the prompts. Suggestions are cached by diff, so retrying a
+    commit does not ask again; Ctrl-C while waiting skips the suggestion.
     """
+    if background_push is None:
+        background_push = config_manager.config["commits"].get("background-push", False)
+    if use_ai is None:
+        use_ai = config_manager.config.get("ai", {}).get("enabled", False)
+
+    if split:
+        _split_commit(by_directory, background_push, use_ai)
+        return
+
     gum_confirm_output = prompts.gum_confirm("Do you want to commit all changes?")
     confirmation = gum_confirm_output
 
     if confirmation:
-        git_add_all = "git add ."
-        subprocess_utils.run(git_add_all)
+        if known_only:
+            repo.stage_changes()
+        else:
+            repo.run(["git", "add", "."])
 
-        commit_type, commit_message = _generate_type_and_message()
-        git_commit = f"git commit -m '{commit_type}: {commit_message}'"
-        git_push = "git push"
+        commit_type, commit_message = _generate_type_and_message(use_ai)
 
-        subprocess_utils.run(git_commit)
-        subprocess_utils.run(git_push)
+        repo.run(["git", "commit", "-m", f"{commit_type}: {commit_message}"])
+        _push(background_push)
 
     else:
-        # list all files that have been changed
-        files = ""
-        tracked_files_for_commit = ""
-        changed_files = "git --no-optional-locks status --short"
-        _, changed_files_output = subprocess_utils.run_and_capture_output(changed_files)
-        changed_files_list = changed_files_output.split("\n")
-        for file in changed_files_list:
-            files += f"'{file.strip()}' "
-        tracked_files = prompts.gum_filter(files, "Which File(s) Would You Like To Add?", False)
-        tracked_files = [file[2:] for file in tracked_files.split("\n") if file]
-        for file in tracked_files:
-            tracked_files_for_commit += f"{file} "
-
-        git_add_tracked = f"git add {tracked_files_for_commit}"
-        subprocess_utils.run(git_add_tracked)
-
-        commit_type, commit_message = _generate_type_and_message()
-        git_commit = f"git commit -m '{commit_type}: {commit_message}'"
-        git_push = "git push"
-
-        subprocess_utils.run(git_commit)
-        subprocess_utils.run(git_push)
-
-def _generate_type_and_message():
-    """Prompt the user to select a commit type and message."""
-    commit_scopes = ""
-    for scope in config_manager.config["commits"]["conventional-commits"]["types"]:
-        if scope == config_manager.config["commits"]["conventional-commits"]["types"][-1]:
-            commit_scopes += f"'{scope}'"
-        else:
-            commit_scopes += f"'{scope}' "
-    commit_type = prompts.gum_filter(commit_scopes, "What Type Of Commit Is This?")
-    commit_message = prompts.gum_input("What Did You Do?")
+        # list all files (or directories) that have been changed
+        by_path = repo.changes_by_directory() if by_directory else None
+        tracked_files = prompts.gum_filter(
+            _directories(by_path) if by_directory else repo.changes,
+            "Which File(s) Would You Like To Add?",
+            False,
+            label=lambda change: change.label,
+        )
+
+        repo.stage(change_paths(_selected_changes(tracked_files, by_path)))
+
+        commit_type, commit_message = _generate_type_and_message(use_ai)
+
+        repo.run(["git", "commit", "-m", f"{commit_type}: {commit_message}"])
+        _push(background_push)
+
+def _split_commit(by_directory, background_push, use_ai=False):
+    """Ask for every commit first, then make them all from one status and push once."""
+    if by_directory:
+        # Directories stand for the changes under them, so a commit never picks up more
+        by_path = repo.changes_by_directory()
+        remaining = _directories(by_path)
+    else:
+        by_path = None
+        remaining = list(repo.changes)
+    if not remaining:
+        print("No changes to commit")
+        return
+
+    groups = []
+    while remaining:
+        selected = prompts.gum_filter(
+            remaining,
+            f"Which File(s) Go In Commit {len(groups) + 1}?",
+            False,
+            label=lambda change: change.label,
+        )
+        if not selected:
+            break
+        paths = change_paths(_selected_changes(selected, by_path))
+        pathspecs = ()
+        if use_ai:
+            # The suggestion reads the staged diff, so this commit's changes go in first
+            repo.stage(paths)
+            pathspecs = _sample_pathspecs(selected, paths, by_directory)
+        commit_type, commit_message = _generate_type_and_message(use_ai, pathspecs)
+        groups.append((f"{commit_type}: {commit_message}", paths))
+        picked = {change.path for change in selected}
+        remaining = [change for change in remaining if change.path not in picked]
+        if remaining and not prompts.gum_confirm(
+            f"{len(remaining)} Change(s) Left. Make Another Commit?"
+        ):
+            break
+    if not groups:
+        return
+
+    started = time.perf_counter()
+    if not use_ai:
+        # One update-index for every group; each commit then takes only its own paths
+        repo.stage(path for _, paths in groups for path in paths)
+    for message, paths in groups:
+        repo.commit_only(message, paths)
+    committed = time.perf_counter()
+    _push(background_push)
+    pushed = time.perf_counter()
+
+    saved = len(groups) - 1
+    summary = (
+        f"{len(groups)} commits in {committed - started:.1f}s, "
+        f"then 1 push in {pushed - committed:.1f}s"
+    )
+    if saved:
+        summary += f"; {saved} push(es) saved"
+        if not background_push:
+            summary += f", about {saved * (pushed - committed):.1f}s"
+    config_manager.console.print(summary, style=config_manager.tertiary_color)
+
+def _directories(by_path):
+    return [ChangedDirectory(path, len(changes)) for path, changes in by_path.items()]
+
+def _selected_changes(selected, by_path=None):
+    """
+    The changes behind a selection. A picked directory stands for the changes the
+    status listed under it, so a commit never picks up more than was shown.
+    """
+    if by_path is None:
+        return list(selected)
+    return [change for directory in selected for change in by_path[directory.path]]
+
+def _sample_pathspecs(selected, paths, by_directory):
+    """
+    Pathspecs limiting a diff to one commit's changes: its picked directories, or
+    its files, or the directories of those files when there are too many for argv.
+    """
+    if by_directory:
+        directories = [directory.path for directory in selected if directory.path != "./"]
+        files = [path for path in paths if "/" not in path]
+    elif len(paths) > MAX_SAMPLE_PATHSPECS:
+        directories = sorted({f"{os.path.dirname(path)}/" for path in paths if "/" in path})
+        files = [path for path in paths if "/" not in path]
+    else:
+        directories, files = [], paths
+    return [f":(top,literal){path}" for path in (*directories, *files)]
+
+def _push(background):
+    """Push the current branch, or queue the push when running in the background."""
+    target = repo.push_target() if background else None
+    if target is None:
+        # Without an upstream there is nothing to queue; let git report or set one up
+        repo.run(["git", "push"])
+        return
+
+    branch_ref, remote, remote_ref = target
+    job = PushQueue(subprocess_utils).enqueue(repo.toplevel, branch_ref, remote, remote_ref)
+    config_manager.console.print(
+        f"Push of {branch_ref.removeprefix('refs/heads/')} to {remote} queued as {job['id']}; "
+        "see `cliutils jobs`",
+        style=config_manager.tertiary_color,
+    )
+
+def _generate_type_and_message(use_ai=False, paths=()):
+    """
+    Prompt the user to select a commit type and message, pre-filled by a suggestion
+    for the staged diff, or just its paths (git pathspecs) when given.
+    """
+    commit_types = config_manager.config["commits"]["conventional-commits"]["types"]
+    suggested_type, suggested_message = _suggest_commit(commit_types, paths) if use_ai else ("", "")
+    if suggested_type in commit_types:
+        commit_types = [suggested_type, *(kind for kind in commit_types if kind != suggested_type)]
+    commit_type = prompts.gum_filter(commit_types, "What Type Of Commit Is This?")
+    commit_message = prompts.gum_input("What Did You Do?", suggested_message)
 
     return commit_type, commit_message
+
+def _suggest_commit(commit_types, paths=()):
+    """A suggested (type, message) for the staged diff, or ("", "") to prompt as usual."""
+    sample = DiffSampler(subprocess_utils).sample("--cached", paths=paths)
+    if not sample.files:
+        return "", ""
+    try:
+        with config_manager.console.status("Suggesting a commit message…"), ClientConnections() as clients:
+            suggested_type, suggested_message = clients.llm.suggest_commit(sample, commit_types)
+    except KeyboardInterrupt:
+        return "", ""
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        config_manager.console.print(
+            f"No commit suggestion: {exc}", style=config_manager.quaternary_color, markup=False
+        )
+        return "", ""
+    if suggested_message:
+        config_manager.console.print(
+            f"Suggested: {suggested_type}: {suggested_message}",
+            style=config_manager.secondary_color,
+            markup=False,
+        )
+    return suggested_type, suggested_message
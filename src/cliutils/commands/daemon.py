@@ -0,0 +1,74 @@
+import logging
+import subprocess
+import sys
+import click
+from cliutils.tools import CliutilsDaemon, DaemonClient
+from cliutils.tools.daemon import DAEMON_COMMAND, LOG_PATH, DaemonUnavailable
+from cliutils.tools.metrics_store import RECORD_METRICS
+
+@click.command("daemon")
+@click.option('--detach', is_flag=True, help="Start the daemon in the background and return.")
+@click.option('--stop', is_flag=True, help="Stop a running daemon.")
+@click.option('--status', is_flag=True, help="Show whether a daemon is running.")
+@click.option('--idle-timeout', type=int, help="Seconds without a request before exiting (default from daemon.idle-timeout).")
+def daemon(detach, stop, status, idle_timeout):
+    """
+    Keeps Jira sessions and caches warm between cliutils invocations.
+
+    While the daemon runs, commands fetch tickets through it over a Unix socket in
+    ~/.cliutils that only you can open, reusing its pooled HTTPS connections and
+    ticket caches instead of importing requests and reconnecting to Jira each time.
+    Prompts still run in your terminal. It also keeps the git status that
+    `cliutils prompt-segment` and the headline zsh theme show, so drawing a shell
+    prompt does not run git. Commands fall back to working on their own whenever
+    the daemon is not running; set CLIUTILS_NO_DAEMON=1 to skip it.
+
+    The daemon exits after --idle-timeout seconds without a request and restarts
+    itself when the cliutils config changes.
+    """
+    client = DaemonClient()
+    try:
+        running = client.call("ping")
+    except DaemonUnavailable:
+        running = None
+
+    if status:
+        if running is None:
+            print("The cliutils daemon is not running")
+            sys.exit(1)
+        print(
+            f"The cliutils daemon is running (pid {running['pid']}, up {running['uptime']:.0f}s, "
+            f"{running['jira_clients']} Jira client(s))"
+        )
+        return
+
+    if stop:
+        if running is None:
+            print("The cliutils daemon is not running")
+            return
+        try:
+            client.call("stop")
+        except DaemonUnavailable:
+            pass  # it went away on its own in the meantime
+        print(f"Stopped the cliutils daemon (pid {running['pid']})")
+        return
+
+    if running is not None:
+        print(f"The cliutils daemon is already running (pid {running['pid']})")
+        return
+
+    if detach:
+        argv = [*DAEMON_COMMAND]
+        if idle_timeout:
+            argv += ["--idle-timeout", str(idle_timeout)]
+        LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(LOG_PATH, "a", encoding="utf-8") as log:
+            subprocess.Popen(  # pylint: disable=consider-using-with
+                argv, stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True
+            )
+        print(f"Started the cliutils daemon; logging to {LOG_PATH}")
+        return
+
+    click.get_current_context().meta[RECORD_METRICS] = False
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", force=True)
+    CliutilsDaemon(idle_timeout).serve()
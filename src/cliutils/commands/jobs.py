@@ -0,0 +1,77 @@
+import logging
+import os
+import sys
+import time
+import click
+from cliutils.tools import ConfigManager, PushQueue
+from cliutils.tools.formatting import format_seconds
+from cliutils.tools.metrics_store import RECORD_METRICS
+
+config_manager = ConfigManager()
+queue = PushQueue()
+
+@click.command("jobs")
+@click.option('--all', '-a', 'show_all', is_flag=True, help="Include pushes that already finished.")
+@click.option('--retry', metavar="ID", help="Queue a failed push again.")
+@click.option('--clear', is_flag=True, help="Remove finished and failed pushes from the list.")
+@click.option('--worker', is_flag=True, hidden=True)
+def jobs(show_all, retry, clear, worker):
+    """
+    Shows the pushes queued in the background by `commit --background-push`.
+
+    Pending, running and failed pushes are listed with how long they waited in the
+    queue and how long the push itself took. Several commits to the same branch
+    queued before its push started are sent as one push, shown in the Commits
+    column. Pushes that failed on a network error are retried with backoff;
+    rejected pushes fail right away and can be queued again with --retry.
+    """
+    if worker:
+        click.get_current_context().meta[RECORD_METRICS] = False
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", force=True)
+        queue.run_worker()
+        return
+
+    if retry:
+        if not queue.retry(retry):
+            print(f"No failed push with id {retry}")
+            sys.exit(1)
+        print(f"Queued push {retry} again")
+        return
+
+    if clear:
+        print(f"Removed {queue.clear()} finished push(es)")
+        return
+
+    listed = [job for job in queue.jobs() if show_all or job["state"] != "done"]
+    if not listed:
+        print("No background pushes")
+        return
+
+    from rich.table import Table  # pylint: disable=import-outside-toplevel
+
+    table = Table(header_style=config_manager.primary_color)
+    for column in ("ID", "State", "Branch", "Repo", "Commits", "Queued", "Waited", "Took"):
+        table.add_column(column, no_wrap=True)
+    table.add_column("Error")
+
+    now = time.time()
+    for job in listed:
+        started_at, finished_at = job["started_at"], job["finished_at"]
+        waited = (started_at or now) - job["queued_at"]
+        took = finished_at - started_at if finished_at and started_at else None
+        if job["state"] == "running":
+            took = now - started_at
+        table.add_row(
+            job["id"],
+            job["state"] + (f" ({job['attempts']} tries)" if job["attempts"] > 1 else ""),
+            job["branch_ref"].removeprefix("refs/heads/"),
+            os.path.basename(job["repo"]),
+            str(job["commits"]),
+            f"{format_seconds(now - job['queued_at'])} ago",
+            format_seconds(waited),
+            format_seconds(took) if took is not None else "",
+            (job["error"] or "").strip().split("\n", 1)[0],
+            style=config_manager.quaternary_color if job["state"] == "failed" else None,
+        )
+
+    config_manager.console.print(table)
@@ -1,25 +1,34 @@
 import sys
-import json
-import re
-import shlex
 import subprocess
-from pathlib import Path
 import click
 from cliutils.tools import (
     GumPrompts,
     ConfigManager,
     SubprocessUtilities,
+    GitRepo,
+    ClientConnections,
 )
+from cliutils.tools.diff_sampler import DiffSampler
+from cliutils.tools.pull_requests import (
+    generate_pr_title_default,
+    parse_ticket_from_branch,
+    resolve_template,
+)
+from cliutils.tools.toolchain import requires_tools
 
-ASSETS_PATH = Path(__file__).parent.parent / "assets"
+CHANGES_HEADING = "## What Changes?"
 
 prompts = GumPrompts()
 config_manager = ConfigManager()
 subprocess_utils = SubprocessUtilities()
+repo = GitRepo(subprocess_utils)
 
 @click.command("pr-create")
 @click.option('--ticket-only', '-to', is_flag=True, help="Create a pull request with only a ticket reference.")
-def pr_create(ticket_only):
+@click.option('--with-diff', '-d', is_flag=True, help="Pre-fill the body with a diffstat and a sample of the diff.")
+@click.option('--ai/--no-ai', 'use_ai', default=None, help="Have the body written from the branch's diff (default from ai.enabled).")
+@requires_tools("git", "gh")
+def pr_create(ticket_only, with_diff, use_ai):
     """
     Opens a new draft pull request in the current repository.
 
@@ -31,89 +40,118 @@ def pr_create(ticket_only):
     If the pull request has a corresponding ticket, the ticket number will be added
     to the pull request title. If the pull request does not have a corresponding ticket,
     the pull request title will be generated from the branch name.
+
+    With --with-diff, the "What Changes?" section starts out with the diffstat
+    against the default branch and a sample of the diff, capped at
+    `diffs.max-diff-chars` and favouring source files over lockfiles and
+    generated output.
+
+    With --ai (or `enabled: true` under ai in the config, and ANTHROPIC_API_KEY
+    set), the template is filled in from the same diff sample before the editor
+    opens. The text is shown as it is written; Ctrl-C stops it and keeps the
+    plain template. Answers are cached, so re-running on an unchanged branch is
+    immediate.
     """
 
-    _, branch_name = _pull_branch_name()
+    branch_name = repo.branch
 
+    if branch_name is None:
+        print("You are not on a branch. Please create a new branch and try again.")
+        sys.exit()
     if branch_name == "main":
         print("You are on the main branch. Please create a new branch and try again.")
         sys.exit()
 
     team_tag = config_manager.config["general"]["team-tag"]
-    ticket_reference, pr_header, cleaned_branch = _parse_ticket_from_branch(branch_name, team_tag)
+    ticket_reference, pr_header, cleaned_branch = parse_ticket_from_branch(branch_name, team_tag)
 
-    pr_title_default = _generate_pr_title_default(cleaned_branch)
+    pr_title_default = generate_pr_title_default(cleaned_branch)
     pr_title = prompts.gum_input("What Do You Want To Name This PR?", pr_title_default)
 
-    pr_body_template = _resolve_template(ticket_only)
+    pr_body_template = resolve_template(ticket_only)
     pr_body_with_ticket = pr_body_template.replace("replace_ticket_ref", ticket_reference)
+    if use_ai is None:
+        use_ai = config_manager.config.get("ai", {}).get("enabled", False)
+    if use_ai:
+        pr_body_with_ticket = _suggest_body(branch_name, pr_body_with_ticket) or pr_body_with_ticket
+    elif with_diff:
+        pr_body_with_ticket = _prefill_changes(pr_body_with_ticket)
     pr_body = prompts.gum_write("What Did You Do?", pr_body_with_ticket)
 
     _submit_pr(pr_header, pr_title, pr_body)
 
 
-def _parse_ticket_from_branch(branch_name: str, team_tag: str) -> tuple[str, str, str]:
-    """Extract ticket reference and clean branch name for PR title generation."""
-    ticket_pattern = rf"{team_tag}-(\d{{1,4}})"
-    ticket_match = re.search(ticket_pattern, branch_name)
+def _sample_branch_diff():
+    return DiffSampler(subprocess_utils).sample(f"origin/{repo.default_branch}...HEAD")
 
-    if ticket_match:
-        ticket_reference = ticket_match.group(0)
-        pr_header = f"{ticket_reference}: "
-        cleaned_branch = re.sub(rf".*{team_tag}-\d{{1,4}}-", "", branch_name)
-    else:
-        ticket_reference = ""
-        pr_header = ""
-        cleaned_branch = branch_name
 
-    return ticket_reference, pr_header, cleaned_branch
+def _suggest_body(branch_name: str, template: str) -> str:
+    """The template filled in from the branch's diff, shown as it streams; "" to skip."""
+    sample = _sample_branch_diff()
+    if not sample.files:
+        return ""
 
+    console = config_manager.console
+    console.rule("Suggested body", style=config_manager.primary_color)
 
-def _resolve_template(ticket_only: bool) -> str:
-    """Load the appropriate PR body template."""
-    template_name = "data_dbt_ticket_only.md" if ticket_only else "data_dbt_verbose.md"
-    template_path = ASSETS_PATH / "templates" / "pull_requests" / template_name
-    return template_path.read_text()
+    def show(text):
+        console.print(text, end="", style=config_manager.secondary_color, markup=False, highlight=False)
+
+    # The connection is closed before the editor opens, whether or not it finished
+    try:
+        with ClientConnections() as clients:
+            body = clients.llm.suggest_pr_body(
+                branch_name, "\n".join(sample.stat_lines()), sample.patch, template, on_text=show
+            )
+    except KeyboardInterrupt:
+        console.print("\nStopped; starting from the template", style=config_manager.quaternary_color)
+        return ""
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        console.print(
+            f"\nNo suggested body: {exc}", style=config_manager.quaternary_color, markup=False
+        )
+        return ""
+    console.print()
+    return body
+
+
+def _prefill_changes(pr_body: str) -> str:
+    """Put the branch's diffstat and a budgeted diff sample under the changes heading."""
+    sample = _sample_branch_diff()
+    if not sample.files:
+        return pr_body
+
+    changes = "\n".join([
+        sample.summary(),
+        "",
+        *(f"- `{line}`" for line in sample.stat_lines(limit=20)),
+        *([f"- ... and {len(sample.files) - 20} more file(s)"] if len(sample.files) > 20 else []),
+        "",
+        "<details><summary>Sampled diff</summary>",
+        "",
+        "````diff",
+        sample.patch.rstrip("\n"),
+        "````",
+        "",
+        "</details>",
+        "",
+    ])
+    if CHANGES_HEADING not in pr_body:
+        return f"{pr_body.rstrip()}\n\n{CHANGES_HEADING}\n{changes}"
+    return pr_body.replace(CHANGES_HEADING, f"{CHANGES_HEADING}\n{changes}", 1)
 
 
 def _submit_pr(pr_header: str, pr_title: str, pr_body: str) -> None:
     """Attempt to create a draft PR, falling back to a non-draft if needed."""
-    escaped_body = shlex.quote(pr_body)
     full_title = f"{pr_header}{pr_title}"
+    gh_pr_create = ["gh", "pr", "create", "--title", full_title, "--body", pr_body]
 
     try:
-        subprocess_utils.run(f"gh pr create --title '{full_title}' --body {escaped_body} --draft")
+        subprocess_utils.execute([*gh_pr_create, "--draft"], capture=False)
     except subprocess.CalledProcessError as error:
         print(f"Attempting to create pull request without --draft flag because of: {error}")
         try:
-            subprocess_utils.run(f"gh pr create --title '{full_title}' --body {escaped_body}")
+            subprocess_utils.execute(gh_pr_create, capture=False)
         except subprocess.CalledProcessError as err:
             print(f"Failed to create pull request because of: {err}")
             sys.exit()
-
-
-def _generate_pr_title_default(branch_name: str) -> str:
-    """Convert a branch name into a human-readable PR title."""
-    protected_keywords = ["data-", "infra-", "spike-"]
-    prepositions = _load_prepositions()
-
-    keyword_match = next(
-        (kw for kw in protected_keywords if kw in branch_name),
-        ""
-    )
-    pr_heading = keyword_match.replace("-", " - ") if keyword_match else ""
-    title_body = branch_name.replace(keyword_match, "").replace("-", " ")
-
-    words = [w.title() if w not in prepositions else w for w in title_body.split()]
-    return pr_heading + " ".join(words)
-
-
-def _load_prepositions() -> list[str]:
-    """Load the prepositions list used for PR title casing."""
-    prepositions_file = ASSETS_PATH / "data" / "prepositions.json"
-    with open(prepositions_file, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def _pull_branch_name() -> tuple[str, str]:
-    return subprocess_utils.run_and_capture_output("git branch --show-current")
@@ -0,0 +1,163 @@
+import os
+import time
+import click
+from cliutils.tools import ClientConnections, ConfigManager, SubprocessUtilities, Workspace
+from cliutils.tools.github_client import read_snapshot, repo_from_remote
+from cliutils.tools.formatting import format_seconds
+from cliutils.tools.pull_requests import parse_ticket_from_branch
+from cliutils.tools.workspace import WorkspaceError
+
+DEFAULT_SNAPSHOT_TTL = 60
+REVIEW_LABELS = {
+    "APPROVED": "approved",
+    "CHANGES_REQUESTED": "changes requested",
+    "REVIEW_REQUIRED": "waiting",
+}
+CHECK_LABELS = {
+    "SUCCESS": "✔ passing",
+    "FAILURE": "✘ failing",
+    "ERROR": "✘ error",
+    "PENDING": "… running",
+    "EXPECTED": "… expected",
+}
+MERGE_LABELS = {
+    "CLEAN": "ready",
+    "HAS_HOOKS": "ready",
+    "UNSTABLE": "ready, checks failing",
+    "BLOCKED": "blocked",
+    "BEHIND": "behind base",
+    "DIRTY": "conflicts",
+    "DRAFT": "draft",
+}
+
+config_manager = ConfigManager()
+subprocess_utils = SubprocessUtilities()
+
+@click.command("pr-status")
+@click.option('--repo', '-r', 'repo_names', multiple=True, metavar="OWNER/NAME", help="Only this repo; repeatable.")
+@click.option('--refresh', is_flag=True, help="Fetch from GitHub even if the snapshot is recent.")
+@click.option('--cached', '-c', is_flag=True, help="Show the last snapshot without contacting GitHub.")
+def pr_status(repo_names, refresh, cached):
+    """
+    Shows review, checks and mergeability for all of your open pull requests.
+
+    The repos are those given with --repo, else `pr-status.repos` in the config,
+    else the repos of your workspace manifest, else the current repo. All of
+    them are asked for in one GraphQL query, and one more per further page, in
+    place of a `gh pr view` and `gh pr checks` per pull request. The ticket
+    column is read from each branch name with the team tag, as `pr-create` does.
+
+    The answer is kept as a snapshot. One younger than `pr-status.snapshot-ttl`
+    seconds is shown without asking GitHub; an older one is shown at once and
+    replaced when the fresh answer arrives. --cached only shows the snapshot.
+
+    The token is GITHUB_TOKEN or GH_TOKEN, else the one gh is logged in with.
+    """
+    status_config = config_manager.config.get("pr-status", {})
+    repos = _resolve_repos(repo_names, status_config)
+    graphql_url = os.getenv("GITHUB_GRAPHQL_URL")
+    snapshot = read_snapshot(repos, graphql_url)
+    if cached and snapshot is None:
+        raise click.ClickException("No snapshot yet; run `cliutils pr-status` to fetch one")
+
+    console = config_manager.console
+    if snapshot is not None:
+        age = time.time() - snapshot.fetched_at
+        if cached or (not refresh and age < status_config.get("snapshot-ttl", DEFAULT_SNAPSHOT_TTL)):
+            console.print(_table(snapshot, _stale(snapshot)))
+            return
+
+    with ClientConnections() as clients:
+        github = clients.github
+        if snapshot is not None and console.is_terminal:
+            _redisplay(github, repos, snapshot)
+            return
+
+        with console.status("Fetching your pull requests…"):
+            try:
+                fresh = github.open_pull_requests(repos, quiet=True)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                if snapshot is None:
+                    raise click.ClickException(f"Could not fetch pull requests: {exc}") from exc
+                console.print(_table(snapshot, f"{_stale(snapshot)}; refresh failed: {exc}"))
+                return
+        console.print(_table(fresh, "just now"))
+
+
+def _redisplay(github, repos, snapshot):
+    """Show the snapshot while it refreshes, then the fresh answer in its place."""
+    from rich.live import Live  # pylint: disable=import-outside-toplevel
+
+    stale = _stale(snapshot)
+    with Live(
+        _table(snapshot, f"{stale}, refreshing…"), console=config_manager.console, auto_refresh=False
+    ) as live:
+        try:
+            fresh = github.open_pull_requests(repos, quiet=True)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            live.update(_table(snapshot, f"{stale}; refresh failed: {exc}"), refresh=True)
+            return
+        live.update(_table(fresh, "just now"), refresh=True)
+
+
+def _stale(snapshot):
+    return f"as of {format_seconds(time.time() - snapshot.fetched_at)} ago"
+
+
+def _resolve_repos(repo_names, status_config) -> list[str]:
+    """owner/name of each repo to ask about; an empty list asks about all of them."""
+    if repo_names or status_config.get("repos"):
+        return sorted(set(repo_names or status_config["repos"]))
+
+    manifest = os.getenv("CLIUTILS_WORKSPACE") or config_manager.config.get("workspace", {}).get("manifest")
+    try:
+        paths = [repo.path for repo in Workspace(manifest).repos if repo.path.is_dir()]
+    except WorkspaceError:
+        paths = [os.getcwd()]
+
+    repos = set()
+    for path in paths:
+        remote = subprocess_utils.execute(
+            ["git", "remote", "get-url", "origin"], cwd=path, check=False, capture_stderr=True
+        )
+        name = repo_from_remote(remote.stdout) if remote.ok else None
+        if name:
+            repos.add(name)
+    return sorted(repos)
+
+
+def _table(snapshot, freshness):
+    from rich.table import Table  # pylint: disable=import-outside-toplevel
+
+    team_tag = config_manager.config["general"]["team-tag"]
+    count = len(snapshot.pull_requests)
+    table = Table(
+        header_style=config_manager.primary_color,
+        caption=f"{count} open pull request{'' if count == 1 else 's'}, {freshness}",
+        caption_justify="left",
+    )
+    for column in ("Repo", "PR", "Ticket", "Review", "Checks", "Merge"):
+        table.add_column(column, no_wrap=True)
+    table.add_column("Title", overflow="ellipsis", no_wrap=True)
+
+    for pull_request in snapshot.pull_requests:
+        ticket_reference = parse_ticket_from_branch(pull_request.branch, team_tag)[0]
+        merge = "conflicts" if pull_request.mergeable == "CONFLICTING" else MERGE_LABELS.get(
+            pull_request.merge_state, "…"
+        )
+        attention = (
+            pull_request.review == "CHANGES_REQUESTED"
+            or pull_request.checks in ("FAILURE", "ERROR")
+            or merge == "conflicts"
+        )
+        table.add_row(
+            pull_request.repo.rsplit("/", 1)[-1],
+            f"#{pull_request.number}",
+            ticket_reference,
+            REVIEW_LABELS.get(pull_request.review, ""),
+            CHECK_LABELS.get(pull_request.checks, ""),
+            merge,
+            pull_request.title,
+            style=config_manager.quaternary_color if attention else None,
+        )
+    return table
@@ -0,0 +1,94 @@
+import logging
+import os
+import re
+import click
+from cliutils.tools import ConfigManager
+from cliutils.tools.daemon import DaemonUnavailable, get_daemon_client
+from cliutils.tools.metrics_store import RECORD_METRICS
+from cliutils.tools.prompt_status import PromptStatus, read_prompt_status
+
+logger = logging.getLogger(__name__)
+
+config_manager = ConfigManager()
+
+HEX_COLOR = re.compile(r"#([0-9a-fA-F]{2})([0-9a-fA-F]{2})([0-9a-fA-F]{2})")
+RESET = "\x1b[0m"
+# How each shell marks escape sequences as taking no space on the line
+ESCAPE_WRAPPERS = {"ansi": ("", ""), "zsh": ("%{", "%}"), "bash": ("\x01", "\x02")}
+
+@click.command("prompt-segment")
+@click.argument("path", default=".", type=click.Path(exists=True, file_okay=False))
+@click.option(
+    '--format', 'output_format',
+    type=click.Choice(["ansi", "zsh", "bash", "plain", "fields"]),
+    default="ansi",
+    show_default=True,
+    help="zsh and bash wrap the colors for PROMPT and PS1; fields prints the raw values.",
+)
+def prompt_segment(path, output_format):
+    """
+    Prints the git branch and status of a directory for your shell prompt.
+
+    The segment reads like the headline theme's, e.g. `git(main) [2+!3?↑]` for
+    two staged files, one changed, three untracked and one commit ahead, in the
+    colors of your cliutils theme. Nothing is printed outside a git repository.
+
+    While `cliutils daemon` runs, the status comes from its in-memory cache, which
+    is refreshed when git changes the index, HEAD or the branch refs, and
+    otherwise every couple of seconds, so a large repository is not scanned on
+    every prompt. Without the daemon the status is worked out directly.
+
+    --format fields prints `b|h ref staged changed untracked behind ahead stashed
+    conflicts` (h for a detached HEAD) for scripts to lay out themselves.
+    """
+    click.get_current_context().meta[RECORD_METRICS] = False
+    status = _status(path)
+    if status is None:
+        return
+    if output_format == "fields":
+        print(status.fields())
+    else:
+        print(_render(status, output_format))
+
+def _status(path):
+    """The daemon's cached status when it is running, else one `git status` here."""
+    daemon = get_daemon_client()
+    if daemon is not None:
+        try:
+            result = daemon.call("git.prompt", path=os.path.abspath(path))
+            return None if result is None else PromptStatus(**result)
+        except DaemonUnavailable as exc:
+            logger.debug("Daemon unavailable, reading the status directly: %s", exc)
+    return read_prompt_status(path)
+
+def _render(status, output_format):
+    """`git(branch) [status]`, colored like the headline theme's git segment."""
+    wrapper = ESCAPE_WRAPPERS.get(output_format)
+
+    def styled(text, color):
+        escape = _escape(color)
+        if wrapper is None or escape is None:
+            return text
+        start, end = wrapper
+        return f"{start}{escape}{end}{text}{start}{RESET}{end}"
+
+    branch = f":{status.branch}" if status.detached else status.branch
+    if output_format == "zsh":
+        branch = branch.replace("%", "%%")
+    segment = (
+        styled("git(", config_manager.tertiary_color)
+        + styled(branch, config_manager.quaternary_color)
+        + styled(")", config_manager.tertiary_color)
+    )
+    status_string = status.status_string()
+    if status_string:
+        segment += " " + styled(f"[{status_string}]", config_manager.tertiary_color)
+    return segment
+
+def _escape(color):
+    """The bold 24-bit color escape for a theme's #rrggbb color."""
+    match = HEX_COLOR.fullmatch(color or "")
+    if match is None:
+        return None
+    red, green, blue = (int(part, 16) for part in match.groups())
+    return f"\x1b[1;38;2;{red};{green};{blue}m"
@@ -0,0 +1,106 @@
+import sys
+import click
+from cliutils.tools import ConfigManager
+from cliutils.tools.s3_sync import DEFAULT_MAX_WORKERS, S3Sync, S3SyncError
+
+# Which aws-info keys hold each target's local directory and S3 location
+TARGETS = {
+    "dags": ("dag-root", "s3-dag-location"),
+    "plugins": ("plugins-root", "s3-plugins-location"),
+}
+MB = 1024 * 1024
+
+config_manager = ConfigManager()
+
+@click.command("s3-sync")
+@click.argument("targets", nargs=-1, type=click.Choice(list(TARGETS)))
+@click.option('--dry-run', '-n', is_flag=True, help="Show what would be uploaded and deleted without changing anything.")
+@click.option('--verify', is_flag=True, help="List the bucket instead of trusting the local manifest.")
+@click.option('--delete/--no-delete', default=True, help="Delete objects whose local file was removed (default on).")
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help="Uploads in flight at once (default from s3-sync.max-workers).")
+def s3_sync(targets, dry_run, verify, delete, jobs):
+    """
+    Uploads changed DAG and plugin files to their S3 locations.
+
+    The directories and locations come from `aws-info` in
+    ~/.cliutils/cliutils-config.yaml (dag-root and s3-dag-location,
+    plugins-root and s3-plugins-location); give `dags` or `plugins` to sync just
+    one. Credentials and the region come from the usual AWS environment and
+    profiles, and AWS_ENDPOINT_URL points it at an S3-compatible stand-in.
+
+    Only files whose content changed are uploaded, and objects whose local file
+    was removed are deleted. What was synced is recorded in a manifest under
+    ~/.cliutils/s3-sync, which stands in for the bucket: a --dry-run makes no
+    requests at all, and a sync only sends the uploads and deletes. Use --verify
+    when someone else may have synced the same location since. Needs boto3
+    (`pip install 'cliutils[s3]'`).
+    """
+    aws_info = config_manager.section("aws-info")
+    sync_config = config_manager.config.get("s3-sync", {})
+    configured = [
+        name for name in targets or TARGETS
+        if aws_info.get(TARGETS[name][0]) and aws_info.get(TARGETS[name][1])
+    ]
+    if not configured:
+        raise click.ClickException(
+            f"Set {' and '.join(TARGETS[targets[0] if targets else 'dags'])} under aws-info "
+            "in ~/.cliutils/cliutils-config.yaml"
+        )
+
+    failed = False
+    for name in configured:
+        root_key, location_key = TARGETS[name]
+        try:
+            syncer = S3Sync(
+                aws_info[root_key],
+                aws_info[location_key],
+                max_workers=jobs or sync_config.get("max-workers", DEFAULT_MAX_WORKERS),
+                multipart_threshold=sync_config.get("multipart-threshold-mb", 8) * MB,
+                part_size=sync_config.get("part-size-mb", 8) * MB,
+            )
+            failed |= not _sync(name, syncer, dry_run, verify, delete)
+        except S3SyncError as exc:
+            raise click.ClickException(str(exc)) from exc
+    if failed:
+        sys.exit(1)
+
+
+def _sync(name, syncer, dry_run, verify, delete):
+    """Plan and run one target's sync; False if anything failed."""
+    console = config_manager.console
+    with console.status(f"{name}: comparing {syncer.local_root} with {syncer.s3_url}"):
+        plan = syncer.plan(verify=verify, delete=delete)
+
+    source = "listed the bucket" if plan.listed else "from the manifest"
+    console.print(
+        f"{name}: {len(plan.uploads)} to upload ({plan.upload_bytes / MB:.1f} MB), "
+        f"{len(plan.deletes)} to delete, {len(plan.unchanged)} unchanged ({source})",
+        style=config_manager.primary_color,
+        markup=False,
+    )
+    if dry_run:
+        for local_file in plan.uploads:
+            console.print(f"  upload {local_file.key}", style=config_manager.tertiary_color, markup=False)
+        for key in plan.deletes:
+            console.print(f"  delete {key}", style=config_manager.quaternary_color, markup=False)
+        return True
+    if not plan.uploads and not plan.deletes:
+        # Nothing to send; apply() still records files that were hashed again
+        syncer.apply(plan)
+        return True
+
+    with console.status(f"{name}: 0/{len(plan.uploads) + len(plan.deletes)}") as progress:
+        result = syncer.apply(
+            plan, on_progress=lambda done, total: progress.update(f"{name}: {done}/{total}")
+        )
+
+    for key, error in result.failed:
+        console.print(f"  failed {key}: {error}", style=config_manager.quaternary_color, markup=False)
+    console.print(
+        f"{name}: uploaded {result.uploaded} file(s) ({result.uploaded_bytes / MB:.1f} MB) and "
+        f"deleted {result.deleted} in {result.duration:.1f}s"
+        + (f", {len(result.failed)} failed" if result.failed else ""),
+        style=config_manager.secondary_color,
+        markup=False,
+    )
+    return not result.failed
@@ -0,0 +1,109 @@
+import csv
+import json
+import re
+import sys
+import time
+import click
+from cliutils.tools import ConfigManager, MetricsStore
+from cliutils.tools.metrics_store import percentile
+
+WINDOW_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+REPORT_FIELDS = ("command", "phase", "count", "p50_ms", "p90_ms", "p99_ms", "total_s")
+
+config_manager = ConfigManager()
+
+@click.command("stats")
+@click.option('--since', default="7d", show_default=True, help="Time window, e.g. 90m, 24h, 7d or 4w.")
+@click.option('--command', 'command_name', help="Only report this command, e.g. branch-new.")
+@click.option('--phases/--no-phases', default=True, help="Include a row per subprocess, HTTP host and prompt.")
+@click.option('--format', 'output_format', type=click.Choice(["table", "csv", "json"]), default="table", show_default=True)
+def stats(since, command_name, phases, output_format):
+    """
+    Reports how long cliutils commands take, from the local metrics store.
+
+    Every invocation records its total time, the time spent waiting on prompts and
+    on git/gh/HTTP calls, and a total per phase (e.g. `git push` or `GET your.jira.host`)
+    in ~/.cliutils/metrics.sqlite3. This shows p50/p90/p99 per command and phase
+    over the --since window, and the total time spent, so slow phases and
+    regressions stand out. Use --format csv or json to export the same rows.
+
+    Set `metrics.enabled: false` in the config, or CLIUTILS_METRICS=0, to stop
+    recording.
+    """
+    match = re.fullmatch(r"(\d+)([mhdw])", since)
+    if match is None:
+        raise click.BadParameter("use a number and a unit, e.g. 90m, 24h, 7d or 4w", param_hint="--since")
+    window_start = time.time() - int(match.group(1)) * WINDOW_UNITS[match.group(2)]
+
+    store = MetricsStore()
+    try:
+        rows = _report(
+            store.invocations(window_start, command_name),
+            store.phases(window_start, command_name) if phases else [],
+        )
+    finally:
+        store.close()
+
+    if output_format == "json":
+        json.dump(rows, sys.stdout, indent=2)
+        print()
+    elif output_format == "csv":
+        writer = csv.DictWriter(sys.stdout, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    elif not rows:
+        print(f"No cliutils invocations recorded in the last {since}")
+    else:
+        _print_table(rows, since)
+
+
+def _report(invocations, phase_rows):
+    """Percentiles per command for total/prompt/tooling time, then per phase."""
+    samples = {}
+    for invocation in invocations:
+        for phase, column in (("total", "total_ms"), ("prompts", "prompt_ms"), ("tooling", "tooling_ms")):
+            samples.setdefault((invocation["command"], phase), []).append(invocation[column])
+    for phase_row in phase_rows:
+        phase = f"{phase_row['category']}: {phase_row['name']}"
+        samples.setdefault((phase_row["command"], phase), []).append(phase_row["total_ms"])
+
+    rows = []
+    for (command, phase), values in samples.items():
+        values.sort()
+        rows.append({
+            "command": command,
+            "phase": phase,
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50), 1),
+            "p90_ms": round(percentile(values, 90), 1),
+            "p99_ms": round(percentile(values, 99), 1),
+            "total_s": round(sum(values) / 1000, 1),
+        })
+    # Each command's summary rows first, then its phases by time spent
+    summary_order = {"total": 0, "prompts": 1, "tooling": 2}
+    rows.sort(key=lambda row: (
+        row["command"], summary_order.get(row["phase"], 3), -row["total_s"],
+    ))
+    return rows
+
+
+def _print_table(rows, since):
+    from rich.table import Table  # pylint: disable=import-outside-toplevel
+
+    table = Table(
+        title=f"cliutils timings, last {since}", header_style=config_manager.primary_color
+    )
+    for field in REPORT_FIELDS:
+        table.add_column(field, justify="left" if field in ("command", "phase") else "right")
+
+    previous_command = None
+    for row in rows:
+        if previous_command is not None and row["command"] != previous_command:
+            table.add_section()
+        previous_command = row["command"]
+        table.add_row(
+            *(str(row[field]) for field in REPORT_FIELDS),
+            style=config_manager.tertiary_color if row["phase"] == "total" else None,
+        )
+
+    config_manager.console.print(table)
@@ -1,37 +1,94 @@
+import os
+import sys
 import click
-import subprocess
-from pathlib import Path
-from rich.console import Console
-from cliutils.tools import TerminalInstaller
+from cliutils.tools import ConfigManager, GumPrompts
+from cliutils.tools.config_manager import USER_CONFIG_PATH
+from cliutils.tools.config_writer import set_config_value
+from cliutils.tools.theme_registry import ThemeRegistry
 
-console = Console()
-utils = TerminalInstaller()
+prompts = GumPrompts()
+config_manager = ConfigManager()
 
 @click.command("theme-select")
-def theme_select():
+@click.option('--preview', '-p', is_flag=True, help="Pick from a live preview of each theme's colors.")
+def theme_select(preview):
     """
     Select a color theme for your CLIUtils package in the terminal.
 
-    The default them is 'iron gold'. The available themes are stored in the tools package. The command will prompt you to select a theme from the available options to use as your color theme.
+    The default theme is 'iron gold'. The available themes are the ones packaged
+    with cliutils and any theme files you put in ~/.cliutils/themes. The command
+    will prompt you to select a theme from the available options to use as your
+    color theme, and saves it in ~/.cliutils/cliutils-config.yaml.
+
+    With --preview, the picker draws a sample prompt and palette in the colors
+    of the highlighted theme as you move through the list. The TERMINAL_THEME
+    environment variable, when set, still takes precedence over the selection.
     """
-    config = utils.load_config()
-    themes_list = ""
-    (
-        primary_color,
-        secondary_color,
-        tertiary_color,
-        quaternary_color,
-        prompt_color,
-        cursor_style,
-        cursor_color,
-        filter_prompt
-    ) = utils.load_theme(config)
-    themes_dir = Path(__file__).parent.parent / "themes"
-    themes = utils.find_all_files_in_directory('python', themes_dir, 'yaml')
-    for theme in themes:
-        themes_list += f"'{theme}' "
-    theme_name = utils.gum_filter(themes_list, "Select A Theme")
-    tools_config_loc = Path.home() / ".cliutils" / "cliutils-config.yaml"
-    cmd = f'''awk '/theme:/ {{c=1}} c && /name:/ {{sub(/name: .*/, "name: \\"{theme_name}\\""); c=0}} 1' {tools_config_loc} > temp && mv temp {tools_config_loc}'''
-    subprocess.run(cmd, shell=True, check=True)
-    console.print(f"Theme {theme_name} selected", style="bold green")
+    registry = ThemeRegistry()
+    if not registry.themes:
+        print("No themes found")
+        sys.exit(1)
+
+    if preview:
+        theme_name = _pick_with_preview(registry)
+    else:
+        theme_name = prompts.gum_filter(registry.names(), "Select A Theme")
+    if not theme_name:
+        sys.exit(1)
+
+    set_config_value(USER_CONFIG_PATH, "theme", "name", theme_name)
+    config_manager.console.print(f"Theme {theme_name} selected", style="bold green")
+    overriding = os.environ.get("TERMINAL_THEME")
+    if overriding and overriding != theme_name:
+        config_manager.console.print(
+            f"TERMINAL_THEME is set to {overriding}, which is used instead while it is set",
+            style=config_manager.quaternary_color,
+        )
+
+
+def _pick_with_preview(registry):
+    """A fuzzy picker, drawn in-process, that shows the highlighted theme as you move."""
+    from cliutils.tools.native_prompts import FilterPrompt  # pylint: disable=import-outside-toplevel
+
+    names = registry.names()
+    current = config_manager.settings.theme_name
+    # Start on the theme in use
+    names.sort(key=lambda name: name != current)
+    picker = FilterPrompt(
+        config_manager, "Select A Theme", True, preview=lambda name: _preview(registry.get(name))
+    )
+    try:
+        return picker.run(names, str)
+    except KeyboardInterrupt:
+        config_manager.console.print("Aborted!", style=config_manager.quaternary_color)
+        sys.exit(1)
+
+
+def _preview(info):
+    """A sample shell prompt, picker and palette drawn in the theme's own colors."""
+    from rich.text import Text  # pylint: disable=import-outside-toplevel
+
+    theme, palette, icons = info.theme, info.palette, info.icons
+    text = Text()
+    text.append(icons.get("user_icon", ""), style=palette.get("user_color"))
+    text.append("you ", style=palette.get("user_color"))
+    text.append(icons.get("path_icon", ""), style=palette.get("path_color"))
+    text.append("~/code/analytics ", style=palette.get("path_color"))
+    text.append(icons.get("branch_icon", ""), style=palette.get("branch_color"))
+    text.append("DATA-42-orders", style=palette.get("branch_color"))
+    text.append("\n")
+    text.append(theme.cursor_style, style=theme.prompt_color)
+    text.append("cliutils commit\n")
+    text.append("What Type Of Commit Is This?\n", style=theme.primary_color)
+    text.append(theme.filter_prompt, style=theme.quaternary_color)
+    text.append("f\n")
+    text.append(theme.cursor_style, style=theme.cursor_color)
+    text.append("F", style=theme.tertiary_color)
+    text.append("eat\n", style=theme.secondary_color)
+    text.append(" " * len(theme.cursor_style))
+    text.append("F", style=theme.tertiary_color)
+    text.append("ix\n", style=theme.prompt_color)
+    for name, color in palette.items():
+        text.append("██ ", style=color)
+        text.append(f"{name.removesuffix('_color')}  ", style="dim")
+    return text
@@ -0,0 +1,280 @@
+import os
+import sys
+import time
+from functools import partial
+import click
+from cliutils.tools import ConfigManager, GumPrompts, TaskScheduler, Workspace
+from cliutils.tools.workspace import DEFAULT_MAX_WORKERS, RepoSkipped, WorkspaceError
+from cliutils.tools.pull_requests import (
+    generate_pr_title_default,
+    parse_ticket_from_branch,
+    resolve_template,
+)
+from cliutils.tools.toolchain import requires_tools
+from cliutils.commands.branch_new import select_ticket_slug
+
+STATE_ICONS = {"ok": "✔", "skipped": "–", "failed": "✘"}
+
+prompts = GumPrompts()
+config_manager = ConfigManager()
+
+@click.group("ws")
+@click.option('--manifest', type=click.Path(dir_okay=False), envvar="CLIUTILS_WORKSPACE", help="Workspace manifest (default ~/.cliutils/workspace.yml).")
+@click.option('--repo', '-r', 'repo_names', multiple=True, help="Only run in this repo (by name); repeatable.")
+@click.option('--jobs', '-j', type=click.IntRange(min=1), help="Repos to work on at once (default from workspace.max-workers).")
+@click.option('--verbose', '-v', is_flag=True, help="Show every repo's git output, not just failures.")
+@click.pass_context
+@requires_tools("git")
+def ws(ctx, manifest, repo_names, jobs, verbose):
+    """
+    Runs repository commands across every repo in your workspace at once.
+
+    The repos are listed in ~/.cliutils/workspace.yml:
+
+    \b
+        repos:
+          - ~/code/analytics-dbt
+          - path: ~/code/airflow-dags
+            name: dags
+
+    Prompts (the ticket, the commit message, the PR title) are asked once, then
+    each repo is worked on in parallel, up to --jobs at a time, so creating a
+    branch in twelve repos takes about as long as the slowest one. Output is
+    collected per repo and shown when all are done; a repo that fails does not
+    stop the others, and the command exits 1 if any failed.
+    """
+    workspace_config = config_manager.config.get("workspace", {})
+    workspace = Workspace(
+        manifest or workspace_config.get("manifest"),
+        jobs or workspace_config.get("max-workers", DEFAULT_MAX_WORKERS),
+    )
+    try:
+        selected = workspace.select(repo_names)
+    except WorkspaceError as exc:
+        raise click.ClickException(str(exc)) from exc
+    # Pushes run side by side, so a credential prompt would have nobody to answer it
+    os.environ.setdefault("GIT_TERMINAL_PROMPT", "0")
+    ctx.obj = (workspace, selected, verbose)
+
+
+@ws.command("status")
+@click.pass_obj
+def ws_status(obj):
+    """Show each repo's branch, how far it is from its upstream, and its changes."""
+    workspace, selected, verbose = obj
+    _run_and_report(workspace, _status, selected, verbose)
+
+
+@ws.command("branch-new")
+@click.option('--refresh', is_flag=True, help="Ignore cached Jira tickets and fetch them fresh.")
+@click.pass_obj
+def ws_branch_new(obj, refresh):
+    """Create and push the same ticket branch in every repo."""
+    workspace, selected, verbose = obj
+    with TaskScheduler("ws-branch-new") as scheduler:
+        # Every repo fetches its default branch while the picker is open
+        scheduler.start("fetch-default-branches", workspace.run, _fetch_default_branch, selected)
+        ticket_slug = select_ticket_slug(refresh)
+        fetched = {
+            outcome.repo for outcome in scheduler.result("fetch-default-branches") if outcome.ok
+        }
+
+    _run_and_report(workspace, partial(_create_branch, ticket_slug, fetched), selected, verbose)
+
+
+@ws.command("commit")
+@click.pass_obj
+def ws_commit(obj):
+    """Commit and push every change in each repo with one commit message."""
+    workspace, selected, verbose = obj
+    outcomes = _run(workspace, _changes, selected)
+    _warn_failed(outcomes)
+    changed = [outcome.repo for outcome in outcomes if outcome.value]
+    if not changed:
+        print("No changes to commit in the workspace")
+        return
+
+    names = ", ".join(repo.name for repo in changed)
+    if not prompts.gum_confirm(f"Commit all changes in {len(changed)} repo(s): {names}?"):
+        changed = prompts.gum_filter(
+            changed, "Which Repos Would You Like To Commit?", False, label=lambda repo: repo.name
+        )
+        if not changed:
+            return
+
+    commit_types = config_manager.config["commits"]["conventional-commits"]["types"]
+    commit_type = prompts.gum_filter(commit_types, "What Type Of Commit Is This?")
+    commit_message = prompts.gum_input("What Did You Do?")
+
+    _run_and_report(
+        workspace, partial(_commit_and_push, f"{commit_type}: {commit_message}"), changed, verbose
+    )
+
+
+@ws.command("pr-create")
+@click.option('--ticket-only', '-to', is_flag=True, help="Create the pull requests with only a ticket reference.")
+@click.pass_obj
+@requires_tools("gh")
+def ws_pr_create(obj, ticket_only):
+    """Open a draft pull request, with one title and body, in each repo on a pushed branch."""
+    workspace, selected, verbose = obj
+    outcomes = _run(workspace, _pr_branch, selected)
+    _warn_failed(outcomes)
+    branches = {outcome.repo: outcome.value for outcome in outcomes if outcome.value}
+    if not branches:
+        print("No workspace repo is on a pushed feature branch")
+        sys.exit(1)
+
+    team_tag = config_manager.config["general"]["team-tag"]
+    ticket_reference, pr_header, cleaned_branch = parse_ticket_from_branch(
+        next(iter(branches.values())), team_tag
+    )
+    pr_title = prompts.gum_input(
+        "What Do You Want To Name These PRs?", generate_pr_title_default(cleaned_branch)
+    )
+    pr_body_template = resolve_template(ticket_only)
+    pr_body = prompts.gum_write(
+        "What Did You Do?", pr_body_template.replace("replace_ticket_ref", ticket_reference)
+    )
+
+    _run_and_report(
+        workspace, partial(_open_pr, f"{pr_header}{pr_title}", pr_body), list(branches), verbose
+    )
+
+
+def _run(workspace, operation, repos):
+    """Run an operation across repos behind a progress line."""
+    done = []
+
+    with config_manager.console.status(f"0/{len(repos)} repos done") as progress:
+        def on_done(outcome):
+            done.append(outcome)
+            progress.update(f"{len(done)}/{len(repos)} repos done, last: {outcome.repo.name}")
+
+        return workspace.run(operation, repos, on_done)
+
+
+def _run_and_report(workspace, operation, repos, verbose):
+    started = time.perf_counter()
+    outcomes = _run(workspace, operation, repos)
+    _report(outcomes, time.perf_counter() - started, verbose)
+
+
+def _warn_failed(outcomes):
+    """Name the repos a preparatory step failed in; the command goes on without them."""
+    for outcome in outcomes:
+        if outcome.state == "failed":
+            config_manager.console.print(
+                f"Skipping {outcome.repo.name}: {outcome.summary}",
+                style=config_manager.quaternary_color,
+                markup=False,
+            )
+
+
+def _report(outcomes, elapsed, verbose):
+    """Print one line per repo, then the output of failed repos; exit 1 if any failed."""
+    from rich.markup import escape  # pylint: disable=import-outside-toplevel
+    from rich.table import Table  # pylint: disable=import-outside-toplevel
+
+    console = config_manager.console
+    styles = {
+        "ok": config_manager.tertiary_color,
+        "skipped": None,
+        "failed": config_manager.quaternary_color,
+    }
+
+    table = Table(header_style=config_manager.primary_color, box=None, pad_edge=False)
+    for column in ("", "Repo", "Result", "Took"):
+        table.add_column(column, no_wrap=column != "Result")
+    for outcome in outcomes:
+        table.add_row(
+            STATE_ICONS[outcome.state],
+            outcome.repo.name,
+            escape(outcome.summary or outcome.state),
+            f"{outcome.duration:.1f}s",
+            style=styles[outcome.state],
+        )
+    console.print(table)
+
+    for outcome in outcomes:
+        if outcome.log and (verbose or outcome.state == "failed"):
+            console.rule(f"{outcome.repo.name} ({outcome.repo.path})", style=styles[outcome.state])
+            console.print(escape("\n".join(outcome.log)), highlight=False)
+
+    failed = sum(outcome.state == "failed" for outcome in outcomes)
+    console.print(
+        f"{len(outcomes)} repo(s) in {elapsed:.1f}s "
+        f"({sum(outcome.duration for outcome in outcomes):.1f}s one after another), "
+        f"{failed} failed",
+        style=config_manager.secondary_color,
+    )
+    if failed:
+        sys.exit(1)
+
+
+def _status(session):
+    status = session.git.status
+    parts = [status.branch or f"detached at {(status.oid or '')[:8]}"]
+    if status.upstream:
+        parts.append(f"↑{status.ahead} ↓{status.behind}")
+    else:
+        parts.append("no upstream")
+    if status.changes:
+        parts.append(f"{len(status.changes)} changed")
+    session.summary = ", ".join(parts)
+
+
+def _changes(session):
+    changes = session.git.changes
+    if not changes:
+        raise RepoSkipped("nothing to commit")
+    session.summary = f"{len(changes)} changed"
+    return len(changes)
+
+
+def _fetch_default_branch(session):
+    default_branch = session.git.default_branch
+    session.run(["git", "fetch", "--quiet", "origin", default_branch])
+
+
+def _create_branch(ticket_slug, fetched, session):
+    """The branch-new steps for one repo; the default branch was fetched beforehand."""
+    default_branch = session.git.default_branch
+    if session.repo not in fetched:
+        session.run(["git", "fetch", "--quiet", "origin", default_branch])
+    session.run(["git", "checkout", "--quiet", default_branch])
+    if not session.run(
+        ["git", "merge", "--ff-only", "--quiet", f"origin/{default_branch}"], check=False
+    ).ok:
+        session.run(["git", "pull", "--quiet"])
+    session.run(["git", "checkout", "--quiet", "-b", ticket_slug])
+    session.run(["git", "push", "--quiet", "--set-upstream", "origin", ticket_slug])
+    session.summary = f"{ticket_slug} from {default_branch}"
+
+
+def _commit_and_push(message, session):
+    session.run(["git", "add", "."])
+    session.run(["git", "commit", "--quiet", "-m", message])
+    session.run(["git", "push", "--quiet"])
+    session.summary = f"committed and pushed {session.git.branch}"
+
+
+def _pr_branch(session):
+    """The repo's branch when it can have a pull request opened from it."""
+    status = session.git.status
+    if status.branch is None or status.branch == session.git.default_branch:
+        raise RepoSkipped(f"on {status.branch or 'a detached HEAD'}")
+    if status.upstream is None:
+        raise RepoSkipped(f"{status.branch} is not pushed")
+    session.summary = status.branch
+    return status.branch
+
+
+def _open_pr(title, body, session):
+    gh_pr_create = ["gh", "pr", "create", "--title", title, "--body", body]
+    result = session.run([*gh_pr_create, "--draft"], check=False)
+    if not result.ok:
+        # Not every repository allows drafts; branch-level failures repeat here
+        result = session.run(gh_pr_create)
+    # gh prints the new pull request's URL last
+    session.summary = (result.stdout or "").strip().rpartition("\n")[2]
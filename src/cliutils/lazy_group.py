@@ -0,0 +1,52 @@
+from importlib import import_module
+from typing import NamedTuple
+import time
+import click
+from cliutils import tracing
+
+
+class CommandSpec(NamedTuple):
+    """Where to find a command, what to show for it in --help, and whether it is timed."""
+    module: str
+    attribute: str
+    short_help: str
+    # False for commands that never record metrics, so their spans are not collected
+    record_metrics: bool = True
+
+
+class LazyGroup(click.Group):
+    """A click group that only imports a command's module when it is invoked."""
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def list_commands(self, ctx):
+        return sorted({*super().list_commands(ctx), *self.lazy_commands})
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name in self.commands:
+            return self.commands[cmd_name]
+        spec = self.lazy_commands.get(cmd_name)
+        if spec is None:
+            return None
+        started = time.perf_counter()
+        command = getattr(import_module(spec.module), spec.attribute)
+        tracing.record(f"import {spec.module}", "import", started, time.perf_counter() - started)
+        self.add_command(command, cmd_name)
+        return command
+
+    def format_commands(self, ctx, formatter):
+        """List commands from the manifest so --help imports nothing."""
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.commands:
+                command = self.commands[name]
+                if command.hidden:
+                    continue
+                rows.append((name, command.get_short_help_str(formatter.width)))
+            else:
+                rows.append((name, self.lazy_commands[name].short_help))
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
@@ -1,17 +1,34 @@
 from .config_manager import ConfigManager
 from .gum_prompts import GumPrompts
 from .subprocess_utilities import SubprocessUtilities
+from .git_repo import GitRepo
+from .task_scheduler import TaskScheduler
+from .metrics_store import MetricsStore
+from .push_queue import PushQueue
+from .workspace import Workspace
+from .toolchain import Toolchain
 from .terminal_installer import TerminalInstaller
 from .http_client import HttpClient
 from .jira_client import JiraClient
+from .github_client import GitHubClient
+from .daemon import CliutilsDaemon, DaemonClient
 from .client_connections import ClientConnections
 
 __all__ = [
     "ConfigManager",
     "GumPrompts",
     "SubprocessUtilities",
+    "GitRepo",
+    "TaskScheduler",
+    "MetricsStore",
+    "PushQueue",
+    "Workspace",
+    "Toolchain",
     "TerminalInstaller",
     "HttpClient",
     "JiraClient",
+    "GitHubClient",
+    "CliutilsDaemon",
+    "DaemonClient",
     "ClientConnections",
 ]
@@ -1,28 +1,78 @@
 import os
-from rich.console import Console
-from cliutils.tools import JiraClient
-
-console = Console()
+import sys
+from cliutils.tools import GitHubClient, JiraClient
+from .config_manager import ConfigManager, get_console
+from .daemon import DaemonJiraClient, get_daemon_client
+from .jira_client import jira_credentials
+from .subprocess_utilities import SubprocessUtilities
+from .toolchain import Toolchain
 
 class ClientConnections:
     def __init__(self):
         self._jira = None
+        self._llm = None
+        self._github = None
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            from .llm import LLMClient, ResponseCache  # pylint: disable=import-outside-toplevel
+
+            api_key = os.getenv("ANTHROPIC_API_KEY")
+            if not api_key:
+                get_console().print(
+                    "[bold red]ANTHROPIC_API_KEY is not set;[/bold red] set it, or pass --no-ai"
+                )
+                sys.exit(1)
+            ai_config = ConfigManager().config.get("ai", {})
+            self._llm = LLMClient(
+                api_key,
+                base_url=os.getenv("ANTHROPIC_BASE_URL"),
+                model=ai_config.get("model"),
+                cache=ResponseCache(max_bytes=ai_config.get("cache-max-kb", 5120) * 1024),
+            )
+        return self._llm
 
     @property
     def jira(self):
         if self._jira is None:
-            self._jira =JiraClient(
-                base_url=os.getenv("JIRA_BASE_URL"),
-                email=os.getenv("JIRA_EMAIL"),
-                username=os.getenv("JIRA_USERNAME"),
-                api_token=os.getenv("JIRA_TOKEN"),
-            )
+            credentials = jira_credentials()
+            # A running `cliutils daemon` answers from its warm client and caches
+            daemon = get_daemon_client()
+            if daemon is not None:
+                self._jira = DaemonJiraClient(daemon, **credentials)
+            else:
+                self._jira = JiraClient(**credentials)
         return self._jira
 
+    @property
+    def github(self):
+        if self._github is None:
+            token = os.getenv("GITHUB_TOKEN") or os.getenv("GH_TOKEN") or _gh_token()
+            if not token:
+                get_console().print(
+                    "[bold red]No GitHub token;[/bold red] set GITHUB_TOKEN, or log in with `gh auth login`"
+                )
+                sys.exit(1)
+            self._github = GitHubClient(token, os.getenv("GITHUB_GRAPHQL_URL"))
+        return self._github
+
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
+        if self._llm:
+            self._llm.close()
         if self._jira:
             self._jira.close()
+        if self._github:
+            self._github.close()
         return False
+
+
+def _gh_token():
+    """The token gh is logged in with, or None without gh or a login."""
+    if Toolchain().which("gh") is None:
+        return None
+    result = SubprocessUtilities().execute(["gh", "auth", "token"], check=False, capture_stderr=True)
+    return result.stdout if result.ok else None
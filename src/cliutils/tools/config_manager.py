@@ -1,72 +1,222 @@
+from dataclasses import dataclass
+from functools import cache, cached_property
 from pathlib import Path
-import subprocess
-import yaml
-from rich.console import Console
+from types import MappingProxyType
+import os
+import sys
+import time
+from cliutils import tracing
+from .file_cache import read_json, write_json_atomic
 
 ASSETS_PATH = Path(__file__).parent.parent / "assets"
+CLIUTILS_HOME = Path.home() / ".cliutils"
+CACHE_PATH = CLIUTILS_HOME / "cache"
+USER_CONFIG_PATH = CLIUTILS_HOME / "cliutils-config.yaml"
+# A theme in ~/.cliutils/themes takes the place of a packaged one with the same name
+THEME_DIRS = (CLIUTILS_HOME / "themes", ASSETS_PATH / "themes")
+COMPILED_CONFIG_PATH = CACHE_PATH / "compiled-config.json"
+COMPILED_CONFIG_VERSION = 2
+
+
+class ConfigError(Exception):
+    """A YAML file could not be parsed."""
+
+
+@dataclass(frozen=True, slots=True)
+class Theme:
+    """The resolved colors and icons used by the prompts."""
+    primary_color: str
+    secondary_color: str
+    tertiary_color: str
+    quaternary_color: str
+    prompt_color: str
+    cursor_style: str
+    cursor_color: str
+    filter_prompt: str
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """The process-wide, read-only view of config.yml, the user's config and the theme."""
+    config: MappingProxyType
+    user_config: MappingProxyType
+    theme_name: str
+    theme: Theme
+
 
 class ConfigManager:
+    """Exposes the shared Settings; constructing one is cheap after the first load."""
 
     def __init__(self):
-        self.console = Console()
         self.config_path = ASSETS_PATH / "config.yml"
-        self.config = self._load_config()
-        (
-            self.primary_color,
-            self.secondary_color,
-            self.tertiary_color,
-            self.quaternary_color,
-            self.prompt_color,
-            self.cursor_style,
-            self.cursor_color,
-            self.filter_prompt
-        ) = self._load_theme(self.config)
-
-    def _load_config(self):
-        """Load the config.yml file."""
-        try:
-            with open(self.config_path, encoding="utf-8") as stream:
-                try:
-                    config = yaml.safe_load(stream)
-                except yaml.YAMLError as exc:
-                    print(exc)
-        except FileNotFoundError:
-            self.console.print("No config.yml File Found", style="bold red")
-            exit()
-        return config
-
-    def _load_theme(self, config):
-        """Load the theme file based on the name specified in the config.yml file."""
-        config_theme = config["theme"]["name"]
-        cmd = f"echo {config_theme}"
-        theme_output = subprocess.run(
-            cmd,
-            shell=True,
-            check=True,
-            stdout=subprocess.PIPE,
-            text=True
-        )
-        theme = theme_output.stdout.strip()
-        theme_file = f"{theme}.yaml"
+        self.settings = load_settings(self.config_path)
+        self.config = self.settings.config
+        theme = self.settings.theme
+        self.primary_color = theme.primary_color
+        self.secondary_color = theme.secondary_color
+        self.tertiary_color = theme.tertiary_color
+        self.quaternary_color = theme.quaternary_color
+        self.prompt_color = theme.prompt_color
+        self.cursor_style = theme.cursor_style
+        self.cursor_color = theme.cursor_color
+        self.filter_prompt = theme.filter_prompt
+
+    def section(self, name: str) -> dict:
+        """config.yml's section `name`, key by key overridden by the user's config."""
+        return {**(self.config.get(name) or {}), **(self.settings.user_config.get(name) or {})}
+
+    @cached_property
+    def console(self):
+        return get_console()
+
+
+@cache
+def get_console():
+    """Return the shared rich Console, importing rich on first use."""
+    from rich.console import Console  # pylint: disable=import-outside-toplevel
+
+    return Console()
+
+
+@cache
+def load_settings(config_path):
+    """Load config.yml and its theme once per process, preferring the compiled cache."""
+    started = time.perf_counter()
+    compiled = _read_compiled()
+    config_stamp = _stamp(config_path)
+    if config_stamp is None:
+        get_console().print("No config.yml File Found", style="bold red")
+        sys.exit(1)
+
+    dirty = False
+    if compiled.get("config_stamp") == config_stamp:
+        raw_config = compiled["config"]
+    else:
+        raw_config = _parse_yaml(config_path)
+        compiled = {"config_stamp": config_stamp, "config": raw_config, "themes": {}}
+        dirty = True
+
+    user_config, user_dirty = _user_config(compiled)
+    dirty |= user_dirty
+
+    # The theme name may reference the environment, e.g. $TERMINAL_THEME; when that
+    # is unset, the theme picked with `cliutils theme-select` is used
+    theme_name = os.path.expandvars(str(raw_config["theme"]["name"])).strip()
+    if not theme_name or "$" in theme_name:
+        theme_name = str((user_config.get("theme") or {}).get("name") or "iron_gold")
+    theme_path = find_theme(theme_name)
+    theme_stamp = _stamp(theme_path)
+    if theme_stamp is None:
+        get_console().print("No theme file found", style="bold red")
+        sys.exit(1)
+
+    cached_theme = compiled["themes"].get(theme_name)
+    if cached_theme and cached_theme["stamp"] == theme_stamp:
+        theme_values = cached_theme["values"]
+    else:
+        theme_values = _extract_theme(_parse_yaml(theme_path))
+        compiled["themes"][theme_name] = {"stamp": theme_stamp, "values": theme_values}
+        dirty = True
+
+    if dirty:
+        _write_compiled(compiled)
 
+    tracing.record(
+        "load_settings", "config", started, time.perf_counter() - started,
+        theme=theme_name, compiled_cache_hit=not dirty,
+    )
+    return Settings(
+        config=_freeze(raw_config),
+        user_config=_freeze(user_config),
+        theme_name=theme_name,
+        theme=Theme(*theme_values),
+    )
+
+
+def find_theme(name):
+    """The file for a theme name: the first of THEME_DIRS that has it."""
+    for theme_dir in THEME_DIRS:
+        path = theme_dir / f"{name}.yaml"
+        if path.exists():
+            return path
+    return THEME_DIRS[-1] / f"{name}.yaml"
+
+
+def _user_config(compiled):
+    """~/.cliutils/cliutils-config.yaml, parsed only when that file changed."""
+    stamp = _stamp(USER_CONFIG_PATH)
+    cached = compiled.get("user_config")
+    if cached and cached["stamp"] == stamp:
+        return cached["config"], False
+    user_config = (_parse_yaml(USER_CONFIG_PATH) if stamp else None) or {}
+    if not isinstance(user_config, dict):
+        user_config = {}
+    compiled["user_config"] = {"stamp": stamp, "config": user_config}
+    return user_config, True
+
+
+def _extract_theme(theme):
+    """Pick the values the prompts use out of a parsed theme file."""
+    return [
+        theme['color_pallette']['hex_user_color'],
+        theme['color_pallette']['hex_path_color'],
+        theme['color_pallette']['hex_git_ref_color'],
+        theme['color_pallette']['hex_branch_color'],
+        theme['color_pallette']['hex_prompt_color'],
+        theme['icons']['prompt_icon'],
+        theme['color_pallette']['hex_user_color'],
+        theme['icons']['gum_filter_icon'],
+    ]
+
+
+def load_yaml(path):
+    """Parse a YAML file, raising ConfigError when it is invalid; yaml is imported on first use."""
+    import yaml  # pylint: disable=import-outside-toplevel
+
+    with open(path, encoding="utf-8") as stream, tracing.span(
+        f"parse {os.path.basename(path)}", "config", path=str(path)
+    ):
         try:
-            theme_path = ASSETS_PATH / "themes" / theme_file
-            with open(theme_path, encoding="utf-8") as stream:
-                try:
-                    theme = yaml.safe_load(stream)
-                except yaml.YAMLError as exc:
-                    print(exc)
-        except FileNotFoundError:
-            self.console.print("No theme file found", style="bold red")
-            exit()
-
-        return (
-            theme['color_pallette']['hex_user_color'],
-            theme['color_pallette']['hex_path_color'],
-            theme['color_pallette']['hex_git_ref_color'],
-            theme['color_pallette']['hex_branch_color'],
-            theme['color_pallette']['hex_prompt_color'],
-            theme['icons']['prompt_icon'],
-            theme['color_pallette']['hex_user_color'],
-            theme['icons']['gum_filter_icon']
-        )
+            return yaml.safe_load(stream)
+        except yaml.YAMLError as exc:
+            raise ConfigError(f"Invalid YAML in {path}: {exc}") from exc
+
+
+def _parse_yaml(path):
+    """load_yaml() for the startup config, where an invalid file ends the process."""
+    try:
+        return load_yaml(path)
+    except ConfigError as exc:
+        get_console().print(str(exc), style="bold red")
+        sys.exit(1)
+
+
+def _stamp(path):
+    """Return a cheap change marker for a file, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [str(path), stat.st_mtime_ns, stat.st_size]
+
+
+def _read_compiled():
+    compiled = read_json(COMPILED_CONFIG_PATH)
+    if not isinstance(compiled, dict) or compiled.get("version") != COMPILED_CONFIG_VERSION:
+        return {}
+    return compiled
+
+
+def _write_compiled(compiled):
+    """Persist the compiled cache; a failed write only costs the next start a YAML parse."""
+    compiled["version"] = COMPILED_CONFIG_VERSION
+    write_json_atomic(COMPILED_CONFIG_PATH, compiled)
+
+
+def _freeze(value):
+    """Recursively convert dicts and lists into read-only mappings and tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
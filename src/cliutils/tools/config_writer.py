@@ -0,0 +1,78 @@
+import fcntl
+import json
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from cliutils import tracing
+
+
+def set_config_value(path, section: str, key: str, value) -> None:
+    """
+    Set `section: key: value` in a YAML config file, leaving every other line as it was.
+
+    Only the one line is rewritten (or added, with its section if need be), so
+    comments and formatting survive. The file is replaced by an atomic rename
+    while holding a lock beside it, so concurrent cliutils runs never see a
+    half-written config or lose each other's changes.
+    """
+    path = Path(path)
+    with tracing.span("write config", "config", path=str(path), key=f"{section}.{key}"), _locked(path):
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            text = ""
+        _replace_atomically(path, _with_value(text, section, key, value))
+
+
+def _with_value(text: str, section: str, key: str, value) -> str:
+    lines = text.splitlines(keepends=True)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+    # A JSON scalar is also a valid YAML flow scalar, quoted as needed
+    rendered = json.dumps(value, ensure_ascii=False)
+
+    section_pattern = re.compile(rf"^{re.escape(section)}:\s*(#.*)?$")
+    key_pattern = re.compile(rf"^\s+{re.escape(key)}:(\s|$)")
+    start = next((index for index, line in enumerate(lines) if section_pattern.match(line)), None)
+    if start is None:
+        return "".join(lines) + f"{section}:\n  {key}: {rendered}\n"
+
+    indent = None
+    for index in range(start + 1, len(lines)):
+        line = lines[index]
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if not line[0].isspace():
+            break  # the next top-level key: the section ends here
+        line_indent = line[:len(line) - len(line.lstrip())]
+        indent = indent or line_indent
+        # Only the section's own keys, not a same-named key nested deeper
+        if line_indent == indent and key_pattern.match(line):
+            lines[index] = f"{indent}{key}: {rendered}\n"
+            return "".join(lines)
+    lines.insert(start + 1, f"{indent or '  '}{key}: {rendered}\n")
+    return "".join(lines)
+
+
+@contextmanager
+def _locked(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_name(f"{path.name}.lock"), "a", encoding="utf-8") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def _replace_atomically(path: Path, text: str) -> None:
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(temp_path, "w", encoding="utf-8") as stream:
+            stream.write(text)
+            stream.flush()
+            os.fsync(stream.fileno())
+        if path.exists():
+            os.chmod(temp_path, path.stat().st_mode & 0o777)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,339 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from .config_manager import ASSETS_PATH, CLIUTILS_HOME, ConfigManager
+from .jira_client import JiraClient, jira_credentials
+from .prompt_status import PromptStatusCache
+
+logger = logging.getLogger(__name__)
+
+SOCKET_PATH = CLIUTILS_HOME / "daemon.sock"
+LOG_PATH = CLIUTILS_HOME / "daemon.log"
+DAEMON_COMMAND = (sys.executable, "-m", "cliutils", "daemon")
+PROTOCOL_VERSION = 1
+CONNECT_TIMEOUT = 0.5
+WATCH_INTERVAL = 2
+DEFAULT_IDLE_TIMEOUT = 1800
+WATCHED_CONFIG_PATHS = (ASSETS_PATH / "config.yml", CLIUTILS_HOME / "cliutils-config.yaml")
+# Asked for on every prompt, so not worth a log line each
+QUIET_OPS = frozenset({"git.prompt"})
+
+
+class DaemonUnavailable(Exception):
+    """The daemon is not running or could not serve a request; callers work in-process."""
+
+
+class DaemonClient:
+    """
+    Sends requests to a running `cliutils daemon` over its Unix socket.
+
+    Each request is one JSON line; the reply is zero or more `{"items": [...]}` lines
+    followed by a final `{"ok": ...}` line, so long results stream as they are
+    produced. Any failure to connect or serve raises DaemonUnavailable.
+    """
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+
+    def call(self, op: str, **args):
+        """Run op in the daemon and return its result."""
+        return self._exchange(op, args)[1]
+
+    def stream(self, op: str, **args):
+        """Run op in the daemon and yield the items it streams back, batch by batch."""
+        items, _ = self._exchange(op, args, stream=True)
+        yield from items
+
+    def _exchange(self, op, args, stream=False):
+        request = {"version": PROTOCOL_VERSION, "op": op, "args": args}
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(str(self.path))
+            # Serving a request may take as long as the Jira call behind it
+            sock.settimeout(None)
+            stream_file = sock.makefile("rwb")
+            stream_file.write(json.dumps(request).encode("utf-8") + b"\n")
+            stream_file.flush()
+        except OSError as exc:
+            sock.close()
+            raise DaemonUnavailable(f"cannot reach daemon: {exc}") from exc
+
+        def replies():
+            with sock, stream_file:
+                for line in stream_file:
+                    reply = json.loads(line)
+                    if "items" in reply:
+                        yield from reply["items"]
+                    elif reply["ok"]:
+                        return reply.get("result")
+                    else:
+                        raise DaemonUnavailable(reply["error"])
+            raise DaemonUnavailable("daemon closed the connection")
+
+        if stream:
+            return replies(), None
+        items = replies()
+        try:
+            while True:
+                next(items)
+        except StopIteration as done:
+            return None, done.value
+
+
+def get_daemon_client() -> DaemonClient | None:
+    """A client for the daemon if its socket exists; CLIUTILS_NO_DAEMON=1 opts out."""
+    if os.environ.get("CLIUTILS_NO_DAEMON") or not SOCKET_PATH.exists():
+        return None
+    return DaemonClient()
+
+
+class DaemonJiraClient:
+    """
+    JiraClient's ticket methods served by the daemon's warm client.
+
+    The credentials never leave this process: requests carry only a digest of
+    them, and the daemon serves them only if its own credentials match. The first
+    call that cannot reach the daemon, or finds it logged in as someone else,
+    switches to a local JiraClient for the rest of the invocation; anything else
+    is delegated to that local client.
+    """
+
+    def __init__(self, daemon: DaemonClient, **credentials):
+        self.daemon = daemon
+        self.credentials = credentials
+        self.account = account_digest(credentials)
+        self._local = None
+
+    @property
+    def local(self) -> JiraClient:
+        if self._local is None:
+            self._local = JiraClient(**self.credentials)
+        return self._local
+
+    def retrieve_tickets(self, current_sprint: bool = True, refresh: bool = False) -> list[dict]:
+        return list(self.iter_tickets(current_sprint, refresh))
+
+    def iter_tickets(self, current_sprint: bool = True, refresh: bool = False):
+        if self.daemon is not None:
+            tickets = self.daemon.stream(
+                "jira.tickets",
+                account=self.account, current_sprint=current_sprint, refresh=refresh,
+            )
+            try:
+                first_ticket = next(tickets, None)
+            except DaemonUnavailable as exc:
+                self._fall_back(exc)
+            else:
+                if first_ticket is not None:
+                    yield first_ticket
+                yield from tickets
+                return
+        yield from self.local.iter_tickets(current_sprint, refresh)
+
+    def reconcile_ticket(self, ticket: dict, timeout: float = None) -> dict:
+        if self.daemon is not None:
+            try:
+                return self.daemon.call(
+                    "jira.reconcile", account=self.account, ticket=ticket, timeout=timeout
+                )
+            except DaemonUnavailable as exc:
+                self._fall_back(exc)
+        return self.local.reconcile_ticket(ticket, timeout)
+
+    def _fall_back(self, exc):
+        logger.debug("Daemon unavailable, using a local Jira client: %s", exc)
+        self.daemon = None
+
+    def __getattr__(self, name):
+        return getattr(self.local, name)
+
+    def close(self):
+        if self._local is not None:
+            self._local.close()
+
+
+class CliutilsDaemon:
+    """
+    Keeps a Jira client, with its pooled session and ticket caches, warm between
+    invocations and serves it over a Unix socket only the current user can open.
+    The client is logged in with the daemon's own JIRA_* environment; requests
+    from invocations with other credentials are refused, so they work in-process.
+    It also keeps each repository's git status for shell prompts in memory (see
+    PromptStatusCache).
+
+    The daemon exits after idle_timeout seconds without a request, and restarts
+    itself when config.yml or ~/.cliutils/cliutils-config.yaml changes so every
+    module-level setting is read afresh.
+    """
+
+    def __init__(self, idle_timeout: float = None):
+        config = ConfigManager().config
+        daemon_config = config.get("daemon", {})
+        self.idle_timeout = idle_timeout or daemon_config.get("idle-timeout", DEFAULT_IDLE_TIMEOUT)
+        prompt_config = config.get("prompt-segment", {})
+        self._prompt_status = PromptStatusCache(
+            max_age=prompt_config.get("max-age-ms", 2000) / 1000,
+            wait=prompt_config.get("wait-ms", 50) / 1000,
+        )
+        self.started_at = time.time()
+        self._config_stamps = _config_stamps()
+        self._jira_credentials = jira_credentials()
+        self._jira = None
+        self._lock = threading.Lock()
+        self._last_request = time.monotonic()
+        self._restart = False
+        self._server = None
+
+    def serve(self) -> None:
+        """Serve until idle, stopped or restarted for a config change."""
+        CLIUTILS_HOME.mkdir(mode=0o700, parents=True, exist_ok=True)
+        SOCKET_PATH.unlink(missing_ok=True)
+        previous_umask = os.umask(0o177)
+        try:
+            self._server = _DaemonServer(str(SOCKET_PATH), _DaemonHandler, self)
+        finally:
+            os.umask(previous_umask)
+        socket_inode = SOCKET_PATH.stat().st_ino
+        logger.info("Listening on %s (pid %d)", SOCKET_PATH, os.getpid())
+
+        threading.Thread(target=self._watch, name="daemon-watch", daemon=True).start()
+        try:
+            self._server.serve_forever(poll_interval=0.5)
+        finally:
+            self._server.server_close()
+            # A newer daemon may have taken the path over already
+            if SOCKET_PATH.exists() and SOCKET_PATH.stat().st_ino == socket_inode:
+                SOCKET_PATH.unlink()
+            if self._jira is not None:
+                self._jira.close()
+
+        if self._restart:
+            logger.info("Config changed, restarting")
+            os.execv(sys.executable, sys.orig_argv)
+        logger.info("Stopped")
+
+    def stop(self, restart: bool = False) -> None:
+        self._restart = restart
+        threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    def dispatch(self, op: str, args: dict):
+        self._last_request = time.monotonic()
+        if _config_stamps() != self._config_stamps:
+            self.stop(restart=True)
+            raise DaemonUnavailable("config changed, daemon restarting")
+
+        if op == "ping":
+            return {
+                "pid": os.getpid(),
+                "uptime": time.time() - self.started_at,
+                "jira_clients": 0 if self._jira is None else 1,
+            }
+        if op == "stop":
+            self.stop()
+            return None
+        if op == "jira.tickets":
+            client = self._jira_client(args["account"])
+            return client.iter_ticket_batches(args["current_sprint"], args["refresh"])
+        if op == "jira.reconcile":
+            client = self._jira_client(args["account"])
+            return client.reconcile_ticket(args["ticket"], args["timeout"])
+        if op == "git.prompt":
+            status = self._prompt_status.get(args["path"])
+            if status is None:
+                return None
+            # Shells without a JSON parser ask for the plain fields line
+            return status.fields() if args.get("fields") else status._asdict()
+        raise DaemonUnavailable(f"unknown request {op!r}")
+
+    def _jira_client(self, account: str) -> JiraClient:
+        if account != account_digest(self._jira_credentials):
+            raise DaemonUnavailable("the daemon is logged in to Jira with other credentials")
+        with self._lock:
+            if self._jira is None:
+                self._jira = JiraClient(**self._jira_credentials)
+            return self._jira
+
+    def _watch(self) -> None:
+        while True:
+            time.sleep(WATCH_INTERVAL)
+            if _config_stamps() != self._config_stamps:
+                self.stop(restart=True)
+                return
+            if time.monotonic() - self._last_request > self.idle_timeout:
+                logger.info("Idle for %ds, stopping", self.idle_timeout)
+                self.stop()
+                return
+
+
+class _DaemonServer(socketserver.ThreadingUnixStreamServer):
+    # server_close() waits for in-flight requests, including the one that asked to stop
+    daemon_threads = False
+    block_on_close = True
+
+    def __init__(self, path, handler_class, daemon_state: CliutilsDaemon):
+        self.daemon_state = daemon_state
+        super().__init__(path, handler_class)
+
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        if not _same_user(self.request):
+            logger.info("Refused a connection from another user")
+            return
+        try:
+            request = json.loads(self.rfile.readline())
+            if request.get("version") != PROTOCOL_VERSION:
+                raise DaemonUnavailable(f"protocol version {request.get('version')} unsupported")
+            started = time.perf_counter()
+            result = self.server.daemon_state.dispatch(request["op"], request["args"])
+            if hasattr(result, "__next__"):
+                for items in result:
+                    self._reply({"items": items})
+                result = None
+            self._reply({"ok": True, "result": result})
+            logger.log(
+                logging.DEBUG if request["op"] in QUIET_OPS else logging.INFO,
+                "%s served in %.1f ms", request["op"], (time.perf_counter() - started) * 1000,
+            )
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.info("Request failed: %s", exc)
+            self._reply({"ok": False, "error": f"{type(exc).__name__}: {exc}"})
+
+    def _reply(self, message):
+        self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+def account_digest(credentials: dict) -> str:
+    """Identifies a set of Jira credentials without revealing them."""
+    return hashlib.sha256(json.dumps(credentials, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _same_user(sock) -> bool:
+    """Check the peer's uid where the platform reports it; the 0600 socket covers the rest."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", credentials)
+    return uid == os.getuid()
+
+
+def _config_stamps():
+    stamps = []
+    for path in WATCHED_CONFIG_PATHS:
+        try:
+            stat = path.stat()
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamps.append(None)
+    return stamps
@@ -0,0 +1,334 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from cliutils import tracing
+from .config_manager import ConfigManager
+from .subprocess_utilities import SubprocessUtilities
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DIFF_CHARS = 6000
+# Globs as in .gitignore: without a slash they match at any depth, ** spans directories
+DEFAULT_GENERATED_PATTERNS = (
+    "*.lock", "package-lock.json", "pnpm-lock.yaml", "go.sum", "*.min.js", "*.map",
+    "target/**", "dbt_packages/**", "logs/**",
+)
+# A file's sample is not worth starting with less than this left
+MIN_FILE_CHARS = 300
+READ_CHUNK = 65536
+# How git C-quotes a path that holds one of these; other control characters go in octal
+QUOTED_CHARS = {
+    '"': '\\"', "\\": "\\\\", "\a": "\\a", "\b": "\\b", "\t": "\\t", "\n": "\\n",
+    "\v": "\\v", "\f": "\\f", "\r": "\\r",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class FileStat:
+    """
+    One changed file; added and deleted are None for binary files and for generated
+    files, whose lines are never counted.
+    """
+    path: str
+    added: int | None
+    deleted: int | None
+    generated: bool
+
+    @property
+    def binary(self) -> bool:
+        return self.added is None and not self.generated
+
+    @property
+    def churn(self) -> int:
+        return (self.added or 0) + (self.deleted or 0)
+
+
+@dataclass(slots=True)
+class DiffSample:
+    """
+    The diffstat of every changed file and a budgeted excerpt of the patch.
+
+    truncated is set when files or hunks were left out of the excerpt or cut short.
+    """
+    files: list[FileStat]
+    patch: str = ""
+    sampled: list[str] = field(default_factory=list)
+    truncated: bool = False
+
+    @property
+    def added(self) -> int:
+        return sum(stat.added or 0 for stat in self.files)
+
+    @property
+    def deleted(self) -> int:
+        return sum(stat.deleted or 0 for stat in self.files)
+
+    def summary(self) -> str:
+        return f"{len(self.files)} file(s) changed, +{self.added} -{self.deleted}"
+
+    def stat_lines(self, limit: int = 50) -> list[str]:
+        """Up to limit lines like `models/orders.sql | +12 -3`, biggest changes first."""
+        ranked = sorted(self.files, key=lambda stat: stat.churn, reverse=True)
+        return [
+            f"{stat.path} | "
+            + ("generated" if stat.generated else "binary" if stat.binary
+               else f"+{stat.added} -{stat.deleted}")
+            for stat in ranked[:limit]
+        ]
+
+
+class DiffSampler:
+    """
+    Reads a diff as a stream and keeps a representative excerpt within a budget.
+
+    `git diff --numstat -z` is read first, NUL-separated entry by entry, for the
+    diffstat. Paths matching the generated patterns (lockfiles, build output;
+    `diffs.generated-patterns` in the config) are excluded from it and only listed
+    by name, so git never diffs them, and they are left out of the excerpt with
+    binary files unless nothing else changed. The remaining files are ranked by
+    lines changed, and the patch for just those paths is read line by line. Each file
+    gets an even share of what is left of the budget when it starts, filled with
+    whole hunks where they fit. Reading stops, and git is closed, as soon as the
+    budget is spent, so memory stays bounded by the budget however large the
+    diff is.
+    """
+
+    def __init__(
+        self,
+        subprocess_utilities: SubprocessUtilities = None,
+        max_chars: int = None,
+        generated_patterns=None,
+    ):
+        self.subprocess_utilities = subprocess_utilities or SubprocessUtilities()
+        diffs_config = ConfigManager().config.get("diffs", {})
+        self.max_chars = max_chars or diffs_config.get("max-diff-chars", DEFAULT_MAX_DIFF_CHARS)
+        self.generated_patterns = tuple(
+            generated_patterns
+            or diffs_config.get("generated-patterns", DEFAULT_GENERATED_PATTERNS)
+        )
+        self._generated = re.compile(
+            "|".join(_glob_regex(pattern) for pattern in self.generated_patterns) or "(?!)"
+        )
+
+    def sample(self, *diff_args, paths=()) -> DiffSample:
+        """
+        Sample `git diff <diff_args>`, e.g. ("--cached",) or ("origin/main...HEAD",);
+        paths, as git pathspecs, limit it to those files or directories.
+        """
+        with tracing.span("sample diff", "diff", diff_args=list(diff_args)) as span:
+            files = list(self.numstat(*diff_args, paths=paths))
+            sample = DiffSample(files)
+            selected = self._select(files)
+            if selected:
+                with self.subprocess_utilities.open_output([
+                    "git", "-c", "core.quotePath=false", "diff", "--no-color", "--no-ext-diff",
+                    "--no-renames", *diff_args, "--",
+                    *(f":(top,literal){stat.path}" for stat in selected),
+                ]) as patch:
+                    self._read_patch(patch, sample, {stat.path for stat in selected})
+            span.set(files=len(files), sampled=len(sample.sampled), chars=len(sample.patch))
+        return sample
+
+    def numstat(self, *diff_args, paths=()):
+        """Yield a FileStat per changed file: counted source files, then generated ones."""
+        paths = list(paths)
+        for entry in self._entries(
+            ["git", "diff", "--numstat", "-z", "--no-renames", *diff_args, "--",
+             *paths, *self._pathspecs("exclude,")]
+        ):
+            added, deleted, path = entry.split("\t", 2)
+            binary = added == "-"
+            yield FileStat(
+                path, None if binary else int(added), None if binary else int(deleted), False
+            )
+        if not self.generated_patterns:
+            return
+        if paths:
+            # Pathspecs match if any one does, so within paths the generated ones are picked here
+            generated = (
+                path for path in self._entries(
+                    ["git", "diff", "--name-only", "-z", "--no-renames", *diff_args, "--", *paths]
+                )
+                if self.is_generated(path)
+            )
+        else:
+            generated = self._entries(
+                ["git", "diff", "--name-only", "-z", "--no-renames", *diff_args, "--",
+                 *self._pathspecs("")]
+            )
+        for path in generated:
+            yield FileStat(path, None, None, True)
+
+    def is_generated(self, path: str) -> bool:
+        return self._generated.fullmatch(path) is not None
+
+    def _pathspecs(self, magic: str) -> list[str]:
+        """The generated patterns as git glob pathspecs, matching is_generated()."""
+        return [
+            f":({magic}top,glob){'' if '/' in pattern else '**/'}{pattern}"
+            for pattern in self.generated_patterns
+        ]
+
+    def _entries(self, argv):
+        """Stream NUL-separated entries from a git command."""
+        with self.subprocess_utilities.open_output(argv) as output:
+            pending = ""
+            while chunk := output.read(READ_CHUNK):
+                *entries, pending = (pending + chunk).split("\0")
+                yield from (entry for entry in entries if entry)
+            if pending:
+                yield pending
+
+    def _select(self, files: list[FileStat]) -> list[FileStat]:
+        """The files worth a share of the budget: source first, biggest changes first."""
+        text = [stat for stat in files if not stat.binary]
+        candidates = [stat for stat in text if not stat.generated] or text
+        candidates.sort(key=lambda stat: stat.churn, reverse=True)
+        return candidates[:max(1, self.max_chars // MIN_FILE_CHARS)]
+
+    def _read_patch(self, patch, sample: DiffSample, selected: set[str]) -> None:
+        """Fill sample.patch from a patch stream, stopping once the budget is spent."""
+        reader = _PatchReader(self.max_chars, len(selected))
+        # Without renames both sides of a header name the same path
+        headers = {
+            f"diff --git {_quote_path(f'a/{path}')} {_quote_path(f'b/{path}')}\n": path
+            for path in selected
+        }
+        for line in patch:
+            if line.startswith("diff --git "):
+                reader.end_hunk()
+                if reader.done:
+                    break
+                path = headers.get(line)
+                if path is not None:
+                    sample.sampled.append(path)
+                    reader.start_file(line)
+                else:
+                    reader.skip_file()
+            elif reader.skipping:
+                continue
+            elif line.startswith("@@"):
+                reader.end_hunk()
+                if reader.file_full:
+                    reader.skip_file()
+                    if reader.done:
+                        break
+                else:
+                    reader.start_hunk(line)
+            else:
+                reader.add(line)
+        else:
+            reader.end_hunk()
+
+        sample.patch = "".join(reader.parts)
+        sample.truncated = reader.truncated or len(sample.sampled) < len(sample.files)
+        logger.debug(
+            "Sampled %d of %d file(s) in %d chars",
+            len(sample.sampled), len(sample.files), len(sample.patch),
+        )
+
+
+def _quote_path(path: str) -> str:
+    """A path as git writes it in a patch header with core.quotePath=false."""
+    quoted = "".join(
+        QUOTED_CHARS.get(char)
+        or (f"\\{ord(char):03o}" if char < " " or char == "\x7f" else char)
+        for char in path
+    )
+    return path if quoted == path else f'"{quoted}"'
+
+
+def _glob_regex(pattern: str) -> str:
+    """A .gitignore-style glob as a regex over the whole path."""
+    parts = ["" if "/" in pattern else "(?:.*/)?"]
+    for token in re.split(r"(\*\*/|\*\*|\*|\?)", pattern):
+        parts.append({
+            "**/": "(?:.*/)?", "**": ".*", "*": "[^/]*", "?": "[^/]",
+        }.get(token, re.escape(token)))
+    return "".join(parts)
+
+
+class _PatchReader:
+    """
+    The budget bookkeeping for one patch: each file's share and the hunk being read.
+
+    A hunk is buffered only up to its file's share; lines past that are counted
+    and dropped, so memory is bounded by the budget.
+    """
+
+    def __init__(self, max_chars: int, files: int):
+        self.max_chars = max_chars
+        self.files_left = files
+        self.parts = []
+        self.used = 0
+        self.share = 0
+        self.file_used = 0
+        self.hunks_kept = 0
+        self.hunk = []
+        self.hunk_chars = 0
+        self.hunk_lines = 0
+        self.skipping = True
+        self.truncated = False
+
+    @property
+    def done(self) -> bool:
+        return self.files_left == 0 or self.max_chars - self.used < MIN_FILE_CHARS // 2
+
+    @property
+    def file_full(self) -> bool:
+        return self.file_used >= self.share
+
+    def start_file(self, header: str) -> None:
+        self.share = (self.max_chars - self.used) // self.files_left
+        self.files_left -= 1
+        self.file_used = self.hunks_kept = 0
+        self.skipping = False
+        self._keep([header])
+
+    def skip_file(self) -> None:
+        self.skipping = True
+        self.truncated = True
+
+    def start_hunk(self, line: str) -> None:
+        self.hunk, self.hunk_chars, self.hunk_lines = [line], len(line), 1
+
+    def add(self, line: str) -> None:
+        if not self.hunk:
+            self._keep([line])  # file headers: index, mode, ---/+++
+            return
+        if self.hunk_chars <= self.share:
+            self.hunk.append(line)
+        self.hunk_chars += len(line)
+        self.hunk_lines += 1
+
+    def end_hunk(self) -> None:
+        """Keep the buffered hunk if it fits the file's share; the first is cut to fit."""
+        if not self.hunk:
+            return
+        room = self.share - self.file_used
+        if self.hunk_chars <= room:
+            self._keep(self.hunk)
+            self.hunks_kept += 1
+        elif self.hunks_kept == 0 and room >= MIN_FILE_CHARS // 2:
+            kept, kept_chars = [], 0
+            for line in self.hunk:
+                if kept_chars + len(line) > room - 40:
+                    break
+                kept.append(line)
+                kept_chars += len(line)
+            kept.append(f"... ({self.hunk_lines - len(kept)} more line(s) in this hunk)\n")
+            self._keep(kept)
+            self.hunks_kept += 1
+            self.file_used = self.share
+            self.truncated = True
+        else:
+            # Later hunks are not read once one does not fit
+            self.file_used = self.share
+            self.truncated = True
+        self.hunk, self.hunk_chars, self.hunk_lines = [], 0, 0
+
+    def _keep(self, lines) -> None:
+        chars = sum(len(line) for line in lines)
+        self.parts.extend(lines)
+        self.used += chars
+        self.file_used += chars
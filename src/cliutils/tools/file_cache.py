@@ -0,0 +1,26 @@
+import json
+import os
+
+
+def read_json(path):
+    """Return the JSON document at path, or None if it is missing or unreadable."""
+    try:
+        with open(path, encoding="utf-8") as stream:
+            return json.load(stream)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json_atomic(path, data):
+    """Write data as compact JSON via a temp file and rename; returns False on failure."""
+    temp_path = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as stream:
+            json.dump(data, stream, separators=(",", ":"))
+        os.replace(temp_path, path)
+    except (OSError, TypeError, ValueError):
+        # TypeError and ValueError: data holds something JSON cannot store, e.g. a YAML date
+        temp_path.unlink(missing_ok=True)
+        return False
+    return True
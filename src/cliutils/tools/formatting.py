@@ -0,0 +1,9 @@
+def format_seconds(seconds):
+    """A duration for a table cell: `850ms`, `4.2s`, `12m` or `3h`."""
+    if seconds < 1:
+        return f"{seconds * 1000:.0f}ms"
+    if seconds < 120:
+        return f"{seconds:.1f}s"
+    if seconds < 7200:
+        return f"{seconds / 60:.0f}m"
+    return f"{seconds / 3600:.0f}h"
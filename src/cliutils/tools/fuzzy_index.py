@@ -0,0 +1,116 @@
+import re
+import threading
+
+# Letters and digits get a bit each; anything else shares the remaining bits
+_BITS = {char: 1 << bit for bit, char in enumerate("abcdefghijklmnopqrstuvwxyz0123456789")}
+_SHARED_BITS = {}
+
+
+def char_mask(text: str) -> int:
+    """A bitmask of the characters in text, for ruling candidates out without a match."""
+    mask = 0
+    for char in set(text):
+        bit = _BITS.get(char) or _SHARED_BITS.get(char)
+        if bit is None:
+            bit = _SHARED_BITS[char] = 1 << (len(_BITS) + ord(char) % (64 - len(_BITS)))
+        mask |= bit
+    return mask
+
+
+class FuzzyIndex:
+    """
+    Fuzzy (in-order subsequence) filtering over a growing list of labels.
+
+    Each label is lowercased and given a character bitmask once, when it is added.
+    A query first drops every candidate whose mask lacks one of its characters,
+    then matches the rest with one compiled regex. Results are kept per query, so
+    typing another character narrows the previous query's matches instead of
+    rescanning everything, backspacing returns a kept result, and labels added
+    since (e.g. a later page of tickets) are only matched against once.
+
+    Results are candidate positions: labels containing the query as a substring
+    first, then the other fuzzy matches, each in the order they were added.
+    """
+
+    MAX_KEPT = 64
+
+    def __init__(self, labels=()):
+        self.labels = []
+        self._lowered = []
+        self._masks = []
+        self._results = {}
+        self._lock = threading.Lock()
+        self.extend(labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def extend(self, labels) -> None:
+        labels = list(labels)
+        lowered = [label.lower() for label in labels]
+        masks = [char_mask(text) for text in lowered]
+        with self._lock:
+            self.labels.extend(labels)
+            self._lowered.extend(lowered)
+            self._masks.extend(masks)
+
+    def search(self, query: str) -> list[int]:
+        query = query.lower()
+        with self._lock:
+            count = len(self.labels)
+            if not query:
+                return list(range(count))
+
+            kept = self._results.get(query)
+            if kept is None:
+                # Narrow the longest kept query this one extends, else start from nothing
+                base = next(
+                    (self._results[query[:end]] for end in range(len(query) - 1, 0, -1)
+                     if query[:end] in self._results),
+                    None,
+                )
+                # In position order, so the result does not depend on how the query was typed
+                kept = (
+                    ([], [], 0) if base is None
+                    else self._match(query, sorted(base[0] + base[1]), base[2])
+                )
+                if len(self._results) >= self.MAX_KEPT:
+                    self._results.pop(next(iter(self._results)))
+
+            exact, fuzzy, scanned = kept
+            if scanned < count:
+                new_exact, new_fuzzy, _ = self._match(query, range(scanned, count), count)
+                exact, fuzzy = exact + new_exact, fuzzy + new_fuzzy
+            self._results[query] = (exact, fuzzy, count)
+            return exact + fuzzy
+
+    def positions(self, position: int, query: str) -> list[int]:
+        """Where query's characters match in a label, for highlighting; empty if no match."""
+        text = self._lowered[position]
+        found, start = [], text.find(query.lower())
+        if query and start >= 0:
+            return list(range(start, start + len(query)))
+        start = 0
+        for char in query.lower():
+            start = text.find(char, start)
+            if start < 0:
+                return []
+            found.append(start)
+            start += 1
+        return found
+
+    def _match(self, query, candidates, scanned):
+        """Split candidates into substring and other subsequence matches of query."""
+        needed = char_mask(query)
+        lowered, masks = self._lowered, self._masks
+        candidates = [position for position in candidates if not needed & ~masks[position]]
+        if len(query) == 1 and query in _BITS:
+            # The bit is that character alone, so the mask check was the whole match
+            return candidates, [], scanned
+        exact = [position for position in candidates if query in lowered[position]]
+        search = re.compile(".*?".join(map(re.escape, query))).search
+        fuzzy = [
+            position for position in candidates
+            if query not in lowered[position] and search(lowered[position])
+        ]
+        return exact, fuzzy, scanned
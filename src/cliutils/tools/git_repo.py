@@ -0,0 +1,293 @@
+from .subprocess_utilities import SubprocessUtilities
+
+STATUS_COMMAND = (
+    "git", "--no-optional-locks", "status", "--porcelain=v2", "--branch", "-z",
+)
+
+
+class FileChange:
+    """One entry of `git status --porcelain=v2`; paths are raw, never quoted."""
+    __slots__ = ("kind", "xy", "path", "orig_path")
+
+    def __init__(self, kind: str, xy: str, path: str, orig_path: str | None = None):
+        self.kind = kind
+        self.xy = xy
+        self.path = path
+        self.orig_path = orig_path
+
+    @property
+    def staged(self) -> bool:
+        return self.xy[0] not in ".?!"
+
+    @property
+    def unstaged(self) -> bool:
+        return self.xy[1] != "."
+
+    @property
+    def untracked(self) -> bool:
+        return self.kind == "?"
+
+    @property
+    def conflicted(self) -> bool:
+        return self.kind == "u"
+
+    @property
+    def label(self) -> str:
+        """The line shown for this change in a picker, e.g. `.M src/app.py`."""
+        if self.orig_path is not None:
+            return f"{self.xy} {self.orig_path} -> {self.path}"
+        return f"{self.xy} {self.path}"
+
+    def __repr__(self):
+        return f"FileChange({self.label!r})"
+
+
+class ChangedDirectory:
+    """A directory holding changes; staging it lets git expand it to its contents."""
+    __slots__ = ("path", "count")
+
+    def __init__(self, path: str, count: int):
+        self.path = path
+        self.count = count
+
+    @property
+    def label(self) -> str:
+        return f"{self.path} ({self.count} changed)"
+
+    def __repr__(self):
+        return f"ChangedDirectory({self.label!r})"
+
+
+class RepoStatus:
+    """Branch, upstream and change list from a single porcelain v2 status call."""
+    __slots__ = ("oid", "branch", "upstream", "ahead", "behind", "changes")
+
+    def __init__(self, oid, branch, upstream, ahead, behind, changes):
+        self.oid = oid
+        self.branch = branch
+        self.upstream = upstream
+        self.ahead = ahead
+        self.behind = behind
+        self.changes = changes
+
+    @property
+    def detached(self) -> bool:
+        return self.branch is None
+
+    @classmethod
+    def parse(cls, output: str) -> "RepoStatus":
+        """Parse NUL-separated `git status --porcelain=v2 --branch -z` output."""
+        oid = branch = upstream = None
+        ahead = behind = 0
+        changes = []
+
+        entries = iter(output.split("\0"))
+        for entry in entries:
+            if not entry:
+                continue
+            kind = entry[0]
+            if kind == "#":
+                _, key, value = entry.split(" ", 2)
+                if key == "branch.oid":
+                    oid = None if value == "(initial)" else value
+                elif key == "branch.head":
+                    branch = None if value == "(detached)" else value
+                elif key == "branch.upstream":
+                    upstream = value
+                elif key == "branch.ab":
+                    ahead_field, behind_field = value.split(" ")
+                    ahead, behind = int(ahead_field), -int(behind_field)
+            elif kind == "1":
+                fields = entry.split(" ", 8)
+                changes.append(FileChange(kind, fields[1], fields[8]))
+            elif kind == "2":
+                # With -z the original path follows as its own NUL-terminated entry
+                fields = entry.split(" ", 9)
+                changes.append(FileChange(kind, fields[1], fields[9], next(entries)))
+            elif kind == "u":
+                fields = entry.split(" ", 10)
+                changes.append(FileChange(kind, fields[1], fields[10]))
+            elif kind in "?!":
+                changes.append(FileChange(kind, kind * 2, entry[2:]))
+
+        return cls(oid, branch, upstream, ahead, behind, tuple(changes))
+
+
+class GitRepo:
+    """
+    Memoized repository state for the current invocation.
+
+    The first access to status runs one porcelain v2 `git status`; default_branch
+    reads origin/HEAD once. Mutating commands go through run(), which invalidates
+    the memoized status so the next read reflects them.
+    """
+
+    def __init__(self, subprocess_utilities: SubprocessUtilities = None, cwd=None):
+        self.subprocess_utilities = subprocess_utilities or SubprocessUtilities()
+        self.cwd = cwd
+        self._status = None
+        self._default_branch = None
+        self._toplevel = None
+
+    @property
+    def status(self) -> RepoStatus:
+        if self._status is None:
+            output = self.subprocess_utilities.execute(STATUS_COMMAND, cwd=self.cwd).stdout
+            self._status = RepoStatus.parse(output)
+        return self._status
+
+    @property
+    def branch(self) -> str | None:
+        """The current branch, None when detached; read without a status if none is memoized."""
+        if self._status is not None:
+            return self._status.branch
+        head = self.subprocess_utilities.execute(
+            ["git", "symbolic-ref", "--quiet", "--short", "HEAD"], check=False, cwd=self.cwd
+        )
+        return head.stdout if head.ok else None
+
+    @property
+    def changes(self) -> tuple[FileChange, ...]:
+        return self.status.changes
+
+    def changed_directories(self, depth: int = 1) -> list[ChangedDirectory]:
+        """Group changes by their leading directories, e.g. `models/` with depth 1."""
+        return [
+            ChangedDirectory(path, len(changes))
+            for path, changes in self.changes_by_directory(depth).items()
+        ]
+
+    def changes_by_directory(self, depth: int = 1) -> dict[str, list[FileChange]]:
+        """The changes under each leading directory, sorted by directory; `./` holds the top level."""
+        grouped = {}
+        for change in self.changes:
+            parts = change.path.rstrip("/").split("/")
+            # Untracked directories are reported as a single `dir/` entry
+            limit = len(parts) if change.path.endswith("/") else len(parts) - 1
+            directory = "/".join(parts[:min(depth, limit)])
+            grouped.setdefault(f"{directory}/" if directory else "./", []).append(change)
+        return dict(sorted(grouped.items()))
+
+    def stage(self, paths) -> None:
+        """
+        Stage paths relative to the repository root, however many there are.
+
+        Files go to one `git update-index --add --remove --stdin`, and directories
+        (paths ending in `/`) to one `git add --pathspec-from-file`, where git
+        expands them itself. Both read NUL-separated paths over stdin, so there is
+        no argv limit and quotes, spaces or newlines in names need no escaping.
+        The `./` group of changes_by_directory() stands for the top-level changes
+        in the memoized status, never for the whole tree.
+        """
+        files, directories = [], []
+        for path in paths:
+            if path == "./":
+                files.extend(change_paths(self.changes_by_directory().get("./", ())))
+            else:
+                (directories if path.endswith("/") else files).append(path)
+
+        if files:
+            # update-index is linear in the number of paths; `git add` matches every
+            # file against every pathspec, which takes seconds at tens of thousands.
+            # In index order each new entry is appended rather than inserted mid-index
+            self.run(
+                ["git", "update-index", "--add", "--remove", "-z", "--stdin"],
+                input="".join(f"{path}\0" for path in sorted(files, key=_index_order)),
+                cwd=self.toplevel,
+            )
+        if directories:
+            self.run(
+                ["git", "add", "--pathspec-from-file=-", "--pathspec-file-nul"],
+                input="".join(f":(top,literal){directory}\0" for directory in directories),
+            )
+
+    def commit_only(self, message: str, paths) -> None:
+        """
+        Commit just the given staged paths (relative to the repository root), leaving
+        anything else in the index staged for a later commit. Paths go over stdin,
+        as in stage(); an untracked directory's `dir/` takes everything under it.
+        """
+        self.run(
+            ["git", "commit", "--quiet", "--only", "-m", message,
+             "--pathspec-from-file=-", "--pathspec-file-nul"],
+            input="".join(
+                f":(top,literal){path}\0" for path in paths
+            ),
+        )
+
+    def stage_changes(self) -> None:
+        """Stage exactly the paths the memoized status reported, skipping a worktree walk."""
+        self.stage(change.path for change in self.changes)
+
+    @property
+    def toplevel(self) -> str:
+        if self._toplevel is None:
+            self._toplevel = self.subprocess_utilities.execute(
+                ["git", "rev-parse", "--show-toplevel"], cwd=self.cwd
+            ).stdout
+        return self._toplevel
+
+    @property
+    def default_branch(self) -> str:
+        """The branch origin/HEAD points at, else init.defaultBranch, else `main`."""
+        if self._default_branch is None:
+            ref = self.subprocess_utilities.execute(
+                ["git", "symbolic-ref", "--quiet", "--short", "refs/remotes/origin/HEAD"],
+                check=False,
+                cwd=self.cwd,
+            )
+            if ref.ok:
+                self._default_branch = ref.stdout.removeprefix("origin/")
+            else:
+                configured = self.subprocess_utilities.execute(
+                    ["git", "config", "--get", "init.defaultBranch"], check=False, cwd=self.cwd
+                )
+                self._default_branch = configured.stdout if configured.ok else "main"
+        return self._default_branch
+
+    def push_target(self) -> tuple[str, str, str] | None:
+        """
+        The current branch ref with the remote and remote ref it pushes to, e.g.
+        `("refs/heads/x", "origin", "refs/heads/x")`; None when detached or untracked.
+        """
+        head = self.subprocess_utilities.execute(
+            ["git", "symbolic-ref", "--quiet", "HEAD"], check=False, cwd=self.cwd
+        )
+        if not head.ok:
+            return None
+        upstream = self.subprocess_utilities.execute(
+            ["git", "for-each-ref", "--format=%(upstream:remotename)%00%(upstream:remoteref)",
+             head.stdout],
+            cwd=self.cwd,
+        ).stdout
+        remote, _, remote_ref = upstream.partition("\0")
+        if not remote or not remote_ref:
+            return None
+        return head.stdout, remote, remote_ref
+
+    def run(self, argv, **kwargs):
+        """Run a git command that changes the repository, streaming its output."""
+        kwargs.setdefault("capture", False)
+        kwargs.setdefault("cwd", self.cwd)
+        try:
+            return self.subprocess_utilities.execute(argv, **kwargs)
+        finally:
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        self._status = None
+
+
+def change_paths(changes) -> list[str]:
+    """The paths a commit of changes touches; a rename also takes its old path."""
+    paths = []
+    for change in changes:
+        paths.append(change.path)
+        if change.orig_path is not None:
+            paths.append(change.orig_path)
+    return paths
+
+
+def _index_order(path: str) -> bytes:
+    """git's index sorts paths bytewise."""
+    return path.encode("utf-8", "surrogateescape")
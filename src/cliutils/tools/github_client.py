@@ -0,0 +1,221 @@
+import hashlib
+import json
+import logging
+import re
+import time
+from typing import NamedTuple
+from .config_manager import CACHE_PATH, ConfigManager
+from .file_cache import read_json, write_json_atomic
+from .http_client import HttpClient
+
+logger = logging.getLogger(__name__)
+
+config_manager = ConfigManager()
+
+DEFAULT_GRAPHQL_URL = "https://api.github.com/graphql"
+SNAPSHOT_PATH = CACHE_PATH / "pr-status"
+SNAPSHOT_VERSION = 1
+DEFAULT_PAGE_SIZE = 50
+# GitHub rejects longer search queries; more repos are split across aliased searches
+MAX_SEARCH_QUERY = 256
+SEARCH_QUERY = "is:pr is:open author:@me archived:false"
+# scheme://[user@]host/owner/name or user@host:owner/name, with or without .git
+REMOTE_PATTERN = re.compile(
+    r"^(?:[\w.+-]+://(?:[^@/]+@)?[^/]+/|[^@/:]+@[^:/]+:)([^/]+/[^/]+?)(?:\.git)?/?$"
+)
+PULL_REQUEST_FRAGMENT = """
+fragment pullRequest on PullRequest {
+  number title url isDraft headRefName updatedAt
+  repository { nameWithOwner }
+  reviewDecision mergeable mergeStateStatus
+  commits(last: 1) { nodes { commit { statusCheckRollup { state } } } }
+}
+"""
+
+
+class GitHubError(Exception):
+    """GitHub answered a GraphQL query with errors instead of data."""
+
+
+class PullRequest(NamedTuple):
+    repo: str  # owner/name
+    number: int
+    title: str
+    url: str
+    branch: str
+    draft: bool
+    # APPROVED, CHANGES_REQUESTED, REVIEW_REQUIRED; None without required reviews
+    review: str | None
+    checks: str | None  # the head commit's rollup: SUCCESS, FAILURE, ERROR, PENDING or EXPECTED
+    mergeable: str  # MERGEABLE, CONFLICTING, or UNKNOWN while GitHub works it out
+    merge_state: str  # CLEAN, BLOCKED, BEHIND, DIRTY, UNSTABLE, DRAFT, HAS_HOOKS or UNKNOWN
+    updated_at: str
+
+    @classmethod
+    def from_node(cls, node: dict) -> "PullRequest":
+        commits = node["commits"]["nodes"]
+        rollup = commits[0]["commit"]["statusCheckRollup"] if commits else None
+        return cls(
+            node["repository"]["nameWithOwner"],
+            node["number"],
+            node["title"],
+            node["url"],
+            node["headRefName"],
+            node["isDraft"],
+            node["reviewDecision"],
+            rollup["state"] if rollup else None,
+            node["mergeable"],
+            node["mergeStateStatus"],
+            node["updatedAt"],
+        )
+
+
+class PullRequestSnapshot(NamedTuple):
+    fetched_at: float
+    pull_requests: list[PullRequest]
+
+
+class GitHubClient:
+    """
+    The user's open pull requests from the GitHub GraphQL API.
+
+    Every repository is searched in one query: the repos go into `repo:`
+    qualifiers, split over aliased searches when they outgrow GitHub's query
+    length, and each further page asks only the searches that have one, by
+    cursor. Results are kept as a snapshot per set of repos for instant
+    redisplay, along with the ETag of each page's response, which is sent back
+    as If-None-Match so an unchanged page can be answered with a 304.
+    """
+
+    def __init__(self, token: str, graphql_url: str = None):
+        self.graphql_url = graphql_url or DEFAULT_GRAPHQL_URL
+        self.page_size = config_manager.config.get("pr-status", {}).get(
+            "page-size", DEFAULT_PAGE_SIZE
+        )
+        self.http = HttpClient(headers={"Authorization": f"bearer {token}"}, timeout=30)
+
+    def open_pull_requests(self, repos, quiet: bool = False) -> PullRequestSnapshot:
+        """
+        Fetch the user's open pull requests in repos (owner/name), or in every
+        repository when repos is empty, and save them as the new snapshot.
+        """
+        snapshot_path = _snapshot_path(self.graphql_url, repos)
+        previous = read_json(snapshot_path) or {}
+        known_pages = (
+            previous.get("pages", {}) if previous.get("version") == SNAPSHOT_VERSION else {}
+        )
+
+        searches = _search_queries(repos)
+        cursors = dict.fromkeys(range(len(searches)))  # search index -> cursor of its next page
+        pull_requests, pages = [], {}
+        while cursors:
+            query = _build_query(searches, cursors, self.page_size)
+            data = self._query(query, known_pages, pages, quiet)
+            next_cursors = {}
+            for index in cursors:
+                result = data[f"q{index}"]
+                # Searches may match issues too; those come back without the fragment's fields
+                pull_requests.extend(
+                    PullRequest.from_node(node) for node in result["nodes"] if node
+                )
+                if result["pageInfo"]["hasNextPage"]:
+                    next_cursors[index] = result["pageInfo"]["endCursor"]
+            cursors = next_cursors
+
+        pull_requests.sort(key=lambda pull_request: (pull_request.repo, -pull_request.number))
+        fetched_at = time.time()
+        write_json_atomic(snapshot_path, {
+            "version": SNAPSHOT_VERSION,
+            "fetched_at": fetched_at,
+            "pull_requests": [list(pull_request) for pull_request in pull_requests],
+            "pages": pages,
+        })
+        return PullRequestSnapshot(fetched_at, pull_requests)
+
+    def _query(self, payload: dict, known_pages: dict, pages: dict, quiet: bool) -> dict:
+        """Run one page's query, conditionally when the last answer to it had an ETag."""
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+        known = known_pages.get(key)
+        response = self.http.post(
+            self.graphql_url, payload, quiet=quiet, etag=known and known["etag"]
+        )
+        if response.status_code == 304 and known:
+            logger.debug("GraphQL page %s unchanged", key)
+            pages[key] = known
+            return known["data"]
+
+        body = response.json()
+        if body.get("errors"):
+            raise GitHubError("; ".join(error.get("message", "") for error in body["errors"]))
+        data = body["data"]
+        rate_limit = data.get("rateLimit") or {}
+        logger.debug(
+            "GraphQL page cost %s, %s points left",
+            rate_limit.get("cost"), rate_limit.get("remaining"),
+        )
+        etag = response.headers.get("ETag")
+        if etag:
+            pages[key] = {"etag": etag, "data": data}
+        return data
+
+    def close(self):
+        self.http.close()
+
+
+def read_snapshot(repos, graphql_url: str = None) -> PullRequestSnapshot | None:
+    """The pull requests last fetched for repos, or None if they never were; no token needed."""
+    snapshot = read_json(_snapshot_path(graphql_url or DEFAULT_GRAPHQL_URL, repos))
+    if not snapshot or snapshot.get("version") != SNAPSHOT_VERSION:
+        return None
+    return PullRequestSnapshot(
+        snapshot["fetched_at"], [PullRequest(*row) for row in snapshot["pull_requests"]]
+    )
+
+
+def repo_from_remote(url: str) -> str | None:
+    """owner/name from a GitHub remote URL, SSH or HTTPS; None if it is not one."""
+    match = REMOTE_PATTERN.search(url.strip())
+    return match.group(1) if match else None
+
+
+def _snapshot_path(graphql_url: str, repos):
+    cache_key = "\0".join([graphql_url, *sorted(repos)])
+    digest = hashlib.sha256(cache_key.encode("utf-8")).hexdigest()[:32]
+    return SNAPSHOT_PATH / f"{digest}.json"
+
+
+def _search_queries(repos) -> list[str]:
+    """
+    Search strings covering repos, each within GitHub's length limit; one
+    unrestricted search if there are no repos.
+    """
+    queries, query = [], SEARCH_QUERY
+    for repo in repos:
+        qualifier = f" repo:{repo}"
+        if query != SEARCH_QUERY and len(query) + len(qualifier) > MAX_SEARCH_QUERY:
+            queries.append(query)
+            query = SEARCH_QUERY
+        query += qualifier
+    queries.append(query)
+    return queries
+
+
+def _build_query(searches: list[str], cursors: dict, page_size: int) -> dict:
+    """One GraphQL document asking each search in cursors for its next page, aliased q0, q1..."""
+    declarations, fields, variables = [], [], {}
+    for index, cursor in cursors.items():
+        declarations.append(f"$q{index}: String!, $after{index}: String")
+        fields.append(
+            f"q{index}: search(query: $q{index}, type: ISSUE, first: {page_size}, "
+            f"after: $after{index}) "
+            "{ pageInfo { hasNextPage endCursor } nodes { ...pullRequest } }"
+        )
+        variables[f"q{index}"] = searches[index]
+        variables[f"after{index}"] = cursor
+    query = (
+        f"query({', '.join(declarations)}) {{\n  "
+        + "\n  ".join(fields)
+        + "\n  rateLimit { cost remaining }\n}\n"
+        + PULL_REQUEST_FRAGMENT
+    )
+    return {"query": query, "variables": variables}
@@ -1,95 +1,181 @@
+import os
+import sys
+from functools import cache, cached_property
 from .config_manager import ConfigManager
 from .subprocess_utilities import SubprocessUtilities
+from .toolchain import Toolchain
 
 class GumPrompts:
+    """
+    Themed prompts drawn by gum, or in-process by NativePrompts when the config's
+    `prompts.backend` (or CLIUTILS_PROMPTS) is `native`, or when gum is not installed.
+    """
 
     def __init__(self):
         self.config_manager = ConfigManager()
         self.subprocess_utilities = SubprocessUtilities()
+        self.backend = (
+            os.environ.get("CLIUTILS_PROMPTS")
+            or self.config_manager.config.get("prompts", {}).get("backend", "gum")
+        )
+
+    @cached_property
+    def native(self):
+        """The in-process backend, or None for gum; rich and beaupy load only when used."""
+        if self.backend != "native" and not _gum_missing():
+            return None
+        from .native_prompts import NativePrompts  # pylint: disable=import-outside-toplevel
+
+        return NativePrompts(self.config_manager)
 
     def gum_input(self, header, placeholder=None):
         """Prompt the user to input a value and return the input."""
+        if self.native is not None:
+            return self.native.input(header, placeholder)
         if placeholder is None:
             placeholder = ""
-        sanitize_header = header.replace("'", "'\\''")
-        sanitize_placeholder = placeholder.replace("'", "'\\''")
-        gum_input = f"gum input\
-            --header '{sanitize_header}'\
-            --width 65\
-            --header.foreground '{self.config_manager.primary_color}'\
-            --cursor.foreground '{self.config_manager.cursor_color}'\
-            --prompt '{self.config_manager.cursor_style}'\
-            --prompt.foreground '{self.config_manager.prompt_color}'\
-            --value '{sanitize_placeholder}'\
-            --char-limit 0"
-
-        _, gum_input_output = self.subprocess_utilities.run_and_capture_output(gum_input)
-
-        return gum_input_output
+        gum_input = [
+            "gum", "input",
+            "--header", header,
+            "--width", "65",
+            "--header.foreground", self.config_manager.primary_color,
+            "--cursor.foreground", self.config_manager.cursor_color,
+            "--prompt", self.config_manager.cursor_style,
+            "--prompt.foreground", self.config_manager.prompt_color,
+            "--value", placeholder,
+            "--char-limit", "0",
+        ]
+
+        return self._run(gum_input).stdout.strip()
 
     def gum_write(self, header, templated_text=None):
         """Prompt the user to write text and return the text."""
+        if self.native is not None:
+            return self.native.write(header, templated_text)
         if templated_text:
             body_from_env = templated_text
         else:
             body_from_env = " "
-        gum_write = f"gum write\
-            --header '{header}'\
-            --header.foreground '{self.config_manager.primary_color}'\
-            --cursor.foreground '{self.config_manager.cursor_color}'\
-            --prompt.foreground '{self.config_manager.secondary_color}'\
-            --char-limit 0\
-            --value $'{body_from_env}'\
-            --width 65\
-            --height 10"
-
-        _, gum_write_output = self.subprocess_utilities.run_and_capture_output(gum_write)
-
-        return gum_write_output
+        gum_write = [
+            "gum", "write",
+            "--header", header,
+            "--header.foreground", self.config_manager.primary_color,
+            "--cursor.foreground", self.config_manager.cursor_color,
+            "--prompt.foreground", self.config_manager.secondary_color,
+            "--char-limit", "0",
+            "--value", body_from_env,
+            "--width", "65",
+            "--height", "10",
+        ]
+
+        return self._run(gum_write).stdout.strip()
 
     def gum_confirm(self, message):
         """Prompt the user to confirm an action and return the confirmation."""
-        gum_confirm = f"gum confirm '{message}'\
-            --prompt.foreground '{self.config_manager.primary_color}'\
-            --selected.background '{self.config_manager.secondary_color}'\
-            --unselected.background '{self.config_manager.tertiary_color}'"
-
-        gum_confirm_process, _ = self.subprocess_utilities.run_and_capture_output(gum_confirm, store_exit_code=True)
-
-        return gum_confirm_process != 1
-
-    def gum_filter(self, filter_list, header, has_limit=True):
-        """Filter a list of options and return the selected option."""
-
-        gum_filter = f"gum filter {filter_list}\
-            --text.foreground '{self.config_manager.prompt_color}'\
-            --indicator '{self.config_manager.cursor_style}'\
-            --indicator.foreground '{self.config_manager.cursor_color}'\
-            --header '{header}'\
-            --header.foreground '{self.config_manager.primary_color}'\
-            --prompt '{self.config_manager.filter_prompt}'\
-            --prompt.foreground '{self.config_manager.quaternary_color}'\
-            --cursor-text.foreground '{self.config_manager.secondary_color}'\
-            --match.foreground '{self.config_manager.tertiary_color}'\
-            --height 10\
-            --unselected-prefix.foreground '{self.config_manager.tertiary_color}'\
-            --selected-indicator.foreground '{self.config_manager.tertiary_color}'"
+        if self.native is not None:
+            return self.native.confirm(message)
+        gum_confirm = [
+            "gum", "confirm", message,
+            "--prompt.foreground", self.config_manager.primary_color,
+            "--selected.background", self.config_manager.secondary_color,
+            "--unselected.background", self.config_manager.tertiary_color,
+        ]
+
+        gum_confirm_process = self.subprocess_utilities.execute(
+            gum_confirm, capture=False, check=False
+        )
+
+        return gum_confirm_process.returncode != 1
+
+    def gum_filter(self, options, header, has_limit=True, label=str):
+        """
+        Filter options and return the selected option, or a list of them with no limit.
+
+        options may be any iterable (consumed lazily, so it can still be streaming
+        in while the picker is open) or a readable pipe from another process, which
+        gum reads directly. label gives the line shown for each option, and the
+        selections are mapped back to the original option objects; options read
+        from a pipe come back as the lines themselves.
+        """
+        if self.native is not None:
+            return self.native.filter(options, header, has_limit, label)
+        gum_filter = [
+            "gum", "filter",
+            "--text.foreground", self.config_manager.prompt_color,
+            "--indicator", self.config_manager.cursor_style,
+            "--indicator.foreground", self.config_manager.cursor_color,
+            "--header", header,
+            "--header.foreground", self.config_manager.primary_color,
+            "--prompt", self.config_manager.filter_prompt,
+            "--prompt.foreground", self.config_manager.quaternary_color,
+            "--cursor-text.foreground", self.config_manager.secondary_color,
+            "--match.foreground", self.config_manager.tertiary_color,
+            "--height", "10",
+            "--unselected-prefix.foreground", self.config_manager.tertiary_color,
+            "--selected-indicator.foreground", self.config_manager.tertiary_color,
+        ]
 
         if not has_limit:
-            gum_filter += " --no-limit"
-
-        _, gum_filter_output = self.subprocess_utilities.run_and_capture_output(gum_filter)
-
-        return gum_filter_output
-
-    def gum_choose(self, choices):
-        """Prompt the user to choose an option from a list and return the chosen option."""
-        gum_choose = f"gum choose {choices}\
-            --ordered\
-            --cursor '{self.config_manager.cursor_style}'\
-            --cursor.foreground '{self.config_manager.quaternary_color}'\
-            --item.foreground '{self.config_manager.tertiary_color}'"
-
-        _, gum_choose_output = self.subprocess_utilities.run_and_capture_output(gum_choose)
-
-        return gum_choose_output
+            gum_filter.append("--no-limit")
+
+        selections = self._select(gum_filter, options, label)
+
+        if has_limit:
+            return selections[0] if selections else None
+        return selections
+
+    def gum_choose(self, options, label=str):
+        """Prompt the user to choose one of options and return the chosen option."""
+        if self.native is not None:
+            return self.native.choose(options, label)
+        gum_choose = [
+            "gum", "choose",
+            "--ordered",
+            "--cursor", self.config_manager.cursor_style,
+            "--cursor.foreground", self.config_manager.quaternary_color,
+            "--item.foreground", self.config_manager.tertiary_color,
+        ]
+
+        selections = self._select(gum_choose, options, label)
+
+        return selections[0] if selections else None
+
+    def _select(self, argv, options, label):
+        """Feed options to a gum picker over stdin and map its output back to options."""
+        if hasattr(options, "fileno"):
+            output = self._run(argv, input=options).stdout
+            return [line for line in output.split("\n") if line]
+
+        options_by_line = {}
+
+        def lines():
+            for option in options:
+                line = str(label(option)).replace("\n", " ")
+                options_by_line.setdefault(line, option)
+                yield line
+
+        output = self._run(
+            argv, input=list(lines()) if isinstance(options, (list, tuple)) else lines()
+        ).stdout
+
+        return [options_by_line.get(line, line) for line in output.split("\n") if line]
+
+    def _run(self, argv, **kwargs):
+        """Run a gum prompt; leaving it without an answer exits cliutils quietly."""
+        result = self.subprocess_utilities.execute(argv, check=False, **kwargs)
+        if not result.ok:
+            sys.exit(1)
+        return result
+
+
+@cache
+def _gum_missing():
+    """True, after saying so once, when gum is not on PATH and prompts are drawn in-process."""
+    if Toolchain().which("gum") is not None:
+        return False
+    ConfigManager().console.print(
+        "gum is not installed, so prompts are drawn by cliutils itself; "
+        "`brew install gum` to use it, or set prompts.backend to native to keep these",
+        style="dim",
+    )
+    return True
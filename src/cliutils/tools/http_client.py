@@ -1,55 +1,288 @@
-import requests
-from rich.console import Console
+from __future__ import annotations
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from functools import cached_property
+from typing import TYPE_CHECKING, NamedTuple
+from urllib.parse import urlsplit
+import logging
+import random
+import threading
+import time
+from cliutils import tracing
+from .config_manager import get_console
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+# A 429 was not acted on, so it is retried whatever the method
+RETRY_STATUSES = frozenset({429})
+# A gateway error may come after the server applied the request, so only these are re-sent
+IDEMPOTENT_RETRY_STATUSES = frozenset({502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30
+
+
+class HttpRequest(NamedTuple):
+    """One request for HttpClient.batch()."""
+    method: str
+    url: str
+    params: dict = None
+    payload: dict = None
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
 
-console = Console()
 
 class HttpClient:
-    def __init__(self, headers: dict = None, auth: tuple = None, timeout: int = 10):
-        self.session = requests.Session()
+    """
+    Thin wrapper around requests.Session; requests is imported on first use.
+
+    Every request waits for the rate limiter (when a rate is given) and a slot in
+    its host's connection limit. 429 responses, and 502-504 responses, connection
+    errors or timeouts on idempotent methods, are retried up to max_retries times
+    with exponential backoff and jitter, or after the server's Retry-After.
+    """
+
+    def __init__(
+        self,
+        headers: dict = None,
+        auth: tuple = None,
+        timeout: int = 10,
+        max_connections: int = 10,
+        max_per_host: int = 6,
+        rate_limit: float = None,
+        max_retries: int = 3,
+    ):
         self.timeout = timeout
+        self.auth = auth
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.rate_limiter = TokenBucket(rate_limit) if rate_limit else None
+        self._host_slots = {}
+        self._host_slots_lock = threading.Lock()
 
-        default_headers = {
+        self.headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
         }
 
         if headers:
-            default_headers.update(headers)
+            self.headers.update(headers)
+
+    @cached_property
+    def console(self):
+        return get_console()
+
+    @cached_property
+    def session(self) -> requests.Session:
+        import requests  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        session = requests.Session()
+        session.headers.update(self.headers)
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.max_connections, pool_maxsize=self.max_connections
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        if self.auth:
+            session.auth = self.auth
 
-        self.session.headers.update(default_headers)
+        return session
 
-        if auth:
-            self.session.auth = auth
+    def get(
+        self, url: str, params: dict = None, quiet: bool = False, etag: str = None
+    ) -> requests.Response:
+        return self._request("GET", url, quiet, params=params, headers=_conditional(etag))
 
-    def get(self, url: str, params: dict = None) -> requests.Response:
+    def post(
+        self, url: str, payload: dict = None, quiet: bool = False, etag: str = None
+    ) -> requests.Response:
+        """
+        POST payload as JSON. With etag (from an earlier response's ETag header) the
+        request is conditional, and a 304 response means the earlier body is current;
+        the same goes for get().
+        """
+        return self._request("POST", url, quiet, json=payload, headers=_conditional(etag))
+
+    @contextmanager
+    def stream(self, method: str, url: str, payload: dict = None, quiet: bool = False):
+        """
+        Send a request and yield the response before its body is read.
+
+        The body is read as the caller iterates it (e.g. server-sent events), and
+        the connection is closed when the block exits, so leaving early cancels
+        the request instead of waiting for the rest of the body.
+        """
+        response = self._request(method, url, quiet, json=payload, stream=True)
         try:
-            response = self.session.get(url, params=params, timeout=self.timeout)
-            response.raise_for_status()
-            return response
-        except requests.exceptions.HTTPError as e:
-            console.print(f"[bold red]HTTP error:[/bold red] {e.response.status_code} — {url}")
-            raise
-        except requests.exceptions.ConnectionError:
-            console.print(f"[bold red]Connection error:[/bold red] Could not reach {url}")
-            raise
-        except requests.exceptions.Timeout:
-            console.print(f"[bold red]Timeout:[/bold red] Request to {url} timed out")
-            raise
+            yield response
+        finally:
+            response.close()
+
+    def batch(
+        self,
+        batch_requests,
+        max_workers: int = None,
+        return_exceptions: bool = False,
+    ) -> list:
+        """
+        Send HttpRequests concurrently and return their responses in request order.
+
+        At most max_workers (default: max_connections) are in flight at once. Errors
+        are not printed; the first one is raised once every request has finished,
+        or with return_exceptions each failed request's exception takes its place in
+        the list.
+        """
+        batch_requests = list(batch_requests)
+        if not batch_requests:
+            return []
+
+        def send(request):
+            try:
+                return self._request(
+                    request.method, request.url, True,
+                    params=request.params, json=request.payload,
+                )
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                return exc
+
+        started = time.perf_counter()
+        workers = min(max_workers or self.max_connections, len(batch_requests))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http-batch") as pool:
+            results = list(pool.map(send, batch_requests))
+        logger.debug(
+            "Batch of %d requests over %d connections took %.0f ms",
+            len(batch_requests), workers, (time.perf_counter() - started) * 1000,
+        )
+
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def _request(self, method: str, url: str, quiet: bool, **kwargs) -> requests.Response:
+        """Send a request; quiet callers (e.g. background refreshes) only get the raise."""
+        import requests  # pylint: disable=import-outside-toplevel,redefined-outer-name
 
-    def post(self, url: str, payload: dict = None) -> requests.Response:
         try:
-            response = self.session.post(url, json=payload, timeout=self.timeout)
+            response = self._send(method, url, **kwargs)
             response.raise_for_status()
             return response
         except requests.exceptions.HTTPError as e:
-            console.print(f"[bold red]HTTP error:[/bold red] {e.response.status_code} — {url}")
+            if not quiet:
+                self.console.print(
+                    f"[bold red]HTTP error:[/bold red] {e.response.status_code} — {url}"
+                )
             raise
         except requests.exceptions.ConnectionError:
-            console.print(f"[bold red]Connection error:[/bold red] Could not reach {url}")
+            if not quiet:
+                self.console.print(
+                    f"[bold red]Connection error:[/bold red] Could not reach {url}"
+                )
             raise
         except requests.exceptions.Timeout:
-            console.print(f"[bold red]Timeout:[/bold red] Request to {url} timed out")
+            if not quiet:
+                self.console.print(f"[bold red]Timeout:[/bold red] Request to {url} timed out")
             raise
 
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send with rate and per-host limits, retrying what is safe to retry."""
+        import requests  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        host_slots = self._slots_for(url)
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                with host_slots, tracing.span(
+                    f"{method} {urlsplit(url).netloc}", "http", url=url, attempt=attempt
+                ) as span:
+                    response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                    span.set(status=response.status_code)
+                    if not kwargs.get("stream"):
+                        span.set(bytes=len(response.content))
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
+                if attempt >= self.max_retries or method not in IDEMPOTENT_METHODS:
+                    raise
+                delay = _backoff(attempt)
+                logger.debug("%s %s failed (%s), retrying in %.1fs", method, url, exc, delay)
+            else:
+                retryable = response.status_code in RETRY_STATUSES or (
+                    response.status_code in IDEMPOTENT_RETRY_STATUSES and method in IDEMPOTENT_METHODS
+                )
+                if not retryable or attempt >= self.max_retries:
+                    return response
+                delay = _retry_after(response)
+                if delay is None:
+                    delay = _backoff(attempt)
+                logger.debug(
+                    "%s %s returned %d, retrying in %.1fs",
+                    method, url, response.status_code, delay,
+                )
+                response.close()
+            attempt += 1
+            time.sleep(delay)
+
+    def _slots_for(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._host_slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_slots[host]
+
     def close(self):
-        self.session.close()
+        if "session" in self.__dict__:
+            self.session.close()
+
+
+def _conditional(etag: str | None) -> dict | None:
+    return {"If-None-Match": etag} if etag else None
+
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with jitter: half the step is fixed, half random."""
+    step = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)
+    return step / 2 + random.uniform(0, step / 2)
+
+
+def _retry_after(response) -> float | None:
+    """Seconds to wait from a Retry-After header, given as seconds or an HTTP date."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return min(BACKOFF_CAP, max(0.0, float(value)))
+    except ValueError:
+        pass
+    try:
+        return min(BACKOFF_CAP, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+    except (TypeError, ValueError):
+        return None
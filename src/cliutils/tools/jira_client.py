@@ -1,18 +1,198 @@
+from collections.abc import Iterator
+import hashlib
+import logging
+import os
+import threading
+import time
 from cliutils.tools import (
     ConfigManager,
     HttpClient,
 )
+from .http_client import HttpRequest
+from .config_manager import CACHE_PATH
+from .file_cache import read_json, write_json_atomic
+
+logger = logging.getLogger(__name__)
 
 config_manager = ConfigManager()
 
+TICKET_CACHE_PATH = CACHE_PATH / "jira-tickets"
+TICKET_CACHE_VERSION = 1
+TICKET_FIELDS = ("key", "title", "slug")
+DEFAULT_TICKET_CACHE_TTL = 300
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_MAX_CONNECTIONS = 8
+DEFAULT_RATE_LIMIT = 10
+DETAIL_FIELDS = (
+    "summary", "status", "issuetype", "priority", "assignee", "description", "issuelinks", "updated",
+)
+
 class JiraClient:
     def __init__(self, base_url: str, email: str, username: str, api_token: str):
         self.base_url = base_url
-        self.http = HttpClient(auth=(email, api_token))
         self.username = username
         self.project = config_manager.config["general"]["team-tag"]
+        jira_config = config_manager.config.get("jira", {})
+        self.http = HttpClient(
+            auth=(email, api_token),
+            max_connections=jira_config.get("max-connections", DEFAULT_MAX_CONNECTIONS),
+            max_per_host=jira_config.get("max-connections", DEFAULT_MAX_CONNECTIONS),
+            rate_limit=jira_config.get("rate-limit", DEFAULT_RATE_LIMIT),
+        )
+        self.cache_ttl = jira_config.get("ticket-cache-ttl", DEFAULT_TICKET_CACHE_TTL)
+        self.page_size = jira_config.get("page-size", DEFAULT_PAGE_SIZE)
+        self._refresh_thread = None
+        self._refreshed_tickets = None
+        self._parsed_cache = None
+
+    def retrieve_tickets(self, current_sprint: bool = True, refresh: bool = False) -> list[dict]:
+        """Return all of the user's tickets; see iter_tickets() for the caching rules."""
+        return list(self.iter_tickets(current_sprint, refresh))
+
+    def iter_tickets(self, current_sprint: bool = True, refresh: bool = False) -> Iterator[dict]:
+        """
+        Yield the user's tickets, serving the on-disk cache when there is one.
+
+        Tickets younger than the configured TTL are served as-is. Older tickets are
+        still served immediately, and a background refresh rewrites the cache; call
+        reconcile_ticket() to check a selection against the refreshed results.
+        Passing refresh=True skips the cache. Tickets fetched from Jira are yielded
+        page by page and only cached once every page has been read.
+        """
+        for batch in self.iter_ticket_batches(current_sprint, refresh):
+            yield from batch
+
+    def iter_ticket_batches(
+        self, current_sprint: bool = True, refresh: bool = False
+    ) -> Iterator[list[dict]]:
+        """Like iter_tickets(), but yield the whole cache or each fetched page as a list."""
+        jql_query = self._build_jql(current_sprint)
+        cache_path = self._ticket_cache_path(jql_query)
+
+        if not refresh:
+            started = time.perf_counter()
+            cached = self._read_ticket_cache(cache_path)
+            if cached is not None:
+                fetched_at, tickets = cached
+                age = time.time() - fetched_at
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                if age < self.cache_ttl:
+                    logger.debug(
+                        "Ticket cache hit: %d tickets, %.0fs old, loaded in %.1f ms",
+                        len(tickets), age, elapsed_ms,
+                    )
+                else:
+                    logger.debug(
+                        "Ticket cache stale: %d tickets, %.0fs old, loaded in %.1f ms; "
+                        "refreshing in background",
+                        len(tickets), age, elapsed_ms,
+                    )
+                    self._start_background_refresh(jql_query, cache_path)
+                yield tickets
+                return
+            logger.debug("Ticket cache miss: %s", cache_path)
+
+        yield from self._fetch_and_cache(jql_query, cache_path)
+
+    def iter_ticket_pages(
+        self,
+        jql_query: str,
+        fields: tuple[str, ...] = ('summary',),
+        page_size: int = None,
+        quiet: bool = False,
+    ) -> Iterator[list[dict]]:
+        """Yield parsed tickets one search/jql page at a time, following nextPageToken."""
+        for issues in self.iter_issue_pages(jql_query, fields, page_size, quiet):
+            yield self._parse_tickets(issues)
+
+    def iter_issue_pages(
+        self,
+        jql_query: str,
+        fields: tuple[str, ...] = ('summary',),
+        page_size: int = None,
+        quiet: bool = False,
+    ) -> Iterator[list[dict]]:
+        """Yield the raw issues of each search/jql page, following nextPageToken."""
+        params = {
+            'jql': jql_query,
+            'fields': list(fields),
+            'maxResults': page_size or self.page_size,
+        }
+        page_number = 0
+
+        while True:
+            started = time.perf_counter()
+            response = self.http.get(
+                f'{self.base_url}/rest/api/3/search/jql',
+                params=params,
+                # Later pages arrive while a picker is on screen, so only raise for them
+                quiet=quiet or page_number > 0,
+            ).json()
+            page_number += 1
+            issues = response.get('issues', [])
+            logger.debug(
+                "Fetched page %d (%d tickets) from Jira in %.0f ms",
+                page_number, len(issues), (time.perf_counter() - started) * 1000,
+            )
+            yield issues
 
-    def retrieve_tickets(self, current_sprint: bool = True) -> list[dict]:
+            next_page_token = response.get('nextPageToken')
+            if response.get('isLast', True) or not next_page_token:
+                return
+            params['nextPageToken'] = next_page_token
+
+    def fetch_ticket_details(
+        self, keys, fields: tuple[str, ...] = DETAIL_FIELDS
+    ) -> list[dict]:
+        """
+        Fetch the full issues for keys concurrently, in the order given.
+
+        The requests share the client's pooled session and rate limit, and 429s are
+        retried after Jira's Retry-After. Issues that could not be fetched are None.
+        """
+        keys = list(keys)
+        responses = self.http.batch(
+            (
+                HttpRequest(
+                    "GET", f'{self.base_url}/rest/api/3/issue/{key}', {'fields': ','.join(fields)}
+                )
+                for key in keys
+            ),
+            return_exceptions=True,
+        )
+        details = []
+        for key, response in zip(keys, responses):
+            if isinstance(response, Exception):
+                logger.debug("Could not fetch %s: %s", key, response)
+                details.append(None)
+            else:
+                details.append(response.json())
+        return details
+
+    def retrieve_ticket_details(
+        self, current_sprint: bool = True, refresh: bool = False
+    ) -> list[dict]:
+        """Full issue details for each of the user's tickets; see fetch_ticket_details()."""
+        tickets = self.retrieve_tickets(current_sprint, refresh)
+        return self.fetch_ticket_details(ticket['key'] for ticket in tickets)
+
+    def reconcile_ticket(self, ticket: dict, timeout: float = None) -> dict:
+        """Wait for any background refresh and return the refreshed copy of ticket."""
+        if self._refresh_thread is None:
+            return ticket
+        self._refresh_thread.join(self.http.timeout if timeout is None else timeout)
+        if self._refreshed_tickets is None:
+            logger.debug("Background refresh unavailable, keeping cached %s", ticket['key'])
+            return ticket
+        for refreshed in self._refreshed_tickets:
+            if refreshed['key'] == ticket['key']:
+                if refreshed != ticket:
+                    logger.debug("Ticket %s changed since it was cached", ticket['key'])
+                return refreshed
+        logger.debug("Ticket %s is no longer returned by Jira", ticket['key'])
+        return ticket
+
+    def _build_jql(self, current_sprint: bool) -> str:
         jql_query = (
             f'project = {self.project}'
             f' AND assignee = {self.username}'
@@ -22,25 +202,67 @@ class JiraClient:
         if current_sprint:
             jql_query += ' AND sprint in openSprints()'
 
-        fields = ['key', 'summary']
+        return jql_query
 
-        params = {
-            'jql': jql_query,
-            'fields': fields,
-        }
+    def _read_ticket_cache(self, cache_path):
+        """Return (fetched_at, tickets) from the cache file, reusing the last parse if unchanged."""
+        try:
+            stat = cache_path.stat()
+        except OSError:
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        # Long-lived clients (e.g. in `cliutils daemon`) read the same file repeatedly
+        if self._parsed_cache is not None and self._parsed_cache[:2] == (cache_path, stamp):
+            return self._parsed_cache[2]
+        cached = read_json(cache_path)
+        if not cached or cached.get("version") != TICKET_CACHE_VERSION:
+            return None
+        tickets = [dict(zip(TICKET_FIELDS, row)) for row in cached["tickets"]]
+        self._parsed_cache = (cache_path, stamp, (cached["fetched_at"], tickets))
+        return self._parsed_cache[2]
+
+    def _fetch_and_cache(
+        self, jql_query: str, cache_path, quiet: bool = False
+    ) -> Iterator[list[dict]]:
+        tickets = []
+        for page in self.iter_ticket_pages(jql_query, quiet=quiet):
+            tickets.extend(page)
+            yield page
+        write_json_atomic(cache_path, {
+            "version": TICKET_CACHE_VERSION,
+            "fetched_at": time.time(),
+            "tickets": [[ticket[field] for field in TICKET_FIELDS] for ticket in tickets],
+        })
 
-        response = self.http.get(f'{self.base_url}/rest/api/3/search/jql', params=params)
+    def _start_background_refresh(self, jql_query: str, cache_path) -> None:
+        def refresh():
+            try:
+                self._refreshed_tickets = [
+                    ticket
+                    for page in self._fetch_and_cache(jql_query, cache_path, quiet=True)
+                    for ticket in page
+                ]
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.debug("Background ticket refresh failed: %s", exc)
+
+        self._refresh_thread = threading.Thread(
+            target=refresh, name="jira-ticket-refresh", daemon=True
+        )
+        self._refresh_thread.start()
 
-        return self._parse_tickets(response.json())
+    def _ticket_cache_path(self, jql_query: str):
+        cache_key = "\0".join([self.base_url or "", self.project, self.username or "", jql_query])
+        digest = hashlib.sha256(cache_key.encode("utf-8")).hexdigest()[:32]
+        return TICKET_CACHE_PATH / f"{digest}.json"
 
-    def _parse_tickets(self, response: list[dict]) -> list[dict]:
+    def _parse_tickets(self, issues: list[dict]) -> list[dict]:
         return [
             {
                 'key': issue.get('key'),
                 'title': issue.get('fields').get('summary'),
-                'slug': issue.get('key') + '-' + JiraClient._sanitize_title(issue.get('fields').get('summary'))
+                'slug': ticket_slug(issue.get('key'), issue.get('fields').get('summary'))
             }
-            for issue in response.get('issues', [])
+            for issue in issues
         ]
 
     @staticmethod
@@ -48,4 +270,22 @@ class JiraClient:
         return title_string.replace(' ', '-').lower().replace('---', '-')
 
     def close(self):
+        if self._refresh_thread is not None:
+            # Let an in-flight refresh land in the cache before the session goes away
+            self._refresh_thread.join(self.http.timeout)
         self.http.close()
+
+
+def jira_credentials() -> dict:
+    """JiraClient's credentials from JIRA_BASE_URL, JIRA_EMAIL, JIRA_USERNAME and JIRA_TOKEN."""
+    return {
+        "base_url": os.getenv("JIRA_BASE_URL"),
+        "email": os.getenv("JIRA_EMAIL"),
+        "username": os.getenv("JIRA_USERNAME"),
+        "api_token": os.getenv("JIRA_TOKEN"),
+    }
+
+
+def ticket_slug(key: str, summary: str) -> str:
+    """The branch name for a ticket, e.g. `DATA-12-fix-orders-model`."""
+    return key + '-' + JiraClient._sanitize_title(summary)  # pylint: disable=protected-access
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from cliutils import tracing
+from .config_manager import CACHE_PATH
+from .file_cache import read_json, write_json_atomic
+from .http_client import HttpClient
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_PATH = CACHE_PATH / "llm"
+DEFAULT_CACHE_MAX_BYTES = 5 * 1024 * 1024
+# Part of every cache key: bump it when the prompts change in a way the payload does not show
+PROMPT_VERSION = 1
+
+
+class LLMError(Exception):
+    """The API reported an error part-way through a streamed response."""
+
+
+class LLMCancelled(Exception):
+    """The request was cancelled before the response was complete."""
+
+
+class ResponseCache:
+    """
+    Completed model responses on disk, one JSON file per request hash.
+
+    A key is the sha256 of the request payload (model, prompts, diff sample,
+    commit types) and PROMPT_VERSION, so re-running a command on an unchanged
+    diff is answered without a round trip. A hit touches its file, and writes
+    evict the least recently used files until the directory fits max_bytes.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes: int = DEFAULT_CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(payload: dict) -> str:
+        document = json.dumps([PROMPT_VERSION, payload], sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        entry_path = self.path / f"{key}.json"
+        entry = read_json(entry_path)
+        if not isinstance(entry, dict) or not isinstance(entry.get("text"), str):
+            return None
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return entry["text"]
+
+    def put(self, key: str, text: str) -> None:
+        if write_json_atomic(self.path / f"{key}.json", {"text": text}):
+            self._evict()
+
+    def _evict(self):
+        try:
+            entries = [
+                (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                for entry in os.scandir(self.path)
+                if entry.name.endswith(".json")
+            ]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+
+
+class LLMClient:
+    """
+    Suggests commit messages and pull request bodies with the Anthropic Messages API.
+
+    Responses are streamed as server-sent events: on_text, when given, is called
+    with each piece of text as it arrives, so a command can show the suggestion
+    while it is being written. Setting cancel (a threading.Event), or leaving
+    with Ctrl-C, closes the connection so the rest is not generated. Only
+    complete responses are cached; a cached one is handed to on_text at once.
+
+    base_url defaults to the public API; pointing it at a local server that
+    replays canned event streams exercises everything without a key.
+    """
+
+    BASE_URL = "https://api.anthropic.com/v1/messages"
+    MODEL = "claude-3-5-haiku-latest"
+    API_VERSION = "2023-06-01"
+    MAX_TOKENS = 1024
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = None,
+        model: str = None,
+        cache: ResponseCache = None,
+    ):
+        self.base_url = base_url or self.BASE_URL
+        self.model = model or self.MODEL
+        self.cache = cache or ResponseCache()
+        # A stream can run for a while, so only the wait for the next event times out
+        self.http_client = HttpClient(
+            headers={"x-api-key": api_key, "anthropic-version": self.API_VERSION},
+            timeout=60,
+            max_retries=2,
+        )
+
+    def suggest_commit(self, diff, commit_types, cancel: threading.Event = None) -> tuple[str, str]:
+        """A (type, message) for the staged diff; ("", "") when the reply does not parse."""
+        system, prompt = self._build_commit_prompt(diff, commit_types)
+        text = self.complete(system, prompt, cancel=cancel)
+        try:
+            suggestion = json.loads(text[text.index("{"):text.rindex("}") + 1])
+            commit_type, message = str(suggestion["type"]), str(suggestion["message"])
+        except (ValueError, KeyError, TypeError):
+            logger.debug("Unparseable commit suggestion: %r", text)
+            return "", ""
+        # Match the configured spelling of the type, e.g. "feat" -> "Feat"
+        commit_type = next(
+            (known for known in commit_types if known.lower() == commit_type.lower()), commit_type
+        )
+        return commit_type, message.strip()
+
+    def suggest_pr_body(
+        self,
+        branch_name,
+        diff_stat,
+        diff_patch,
+        template,
+        on_text=None,
+        cancel: threading.Event = None,
+    ) -> str:
+        """The template filled in as markdown, streamed to on_text as it is written."""
+        system, prompt = self._build_pr_prompt(branch_name, diff_stat, diff_patch, template)
+        return self.complete(system, prompt, on_text=on_text, cancel=cancel).strip()
+
+    def complete(self, system, prompt, on_text=None, cancel: threading.Event = None) -> str:
+        """The model's whole reply to prompt, from the cache or streamed from the API."""
+        payload = {
+            "model": self.model,
+            "max_tokens": self.MAX_TOKENS,
+            "system": system,
+            "messages": [{"role": "user", "content": prompt}],
+        }
+        key = self.cache.key(payload)
+        with tracing.span("llm complete", "http", model=self.model) as span:
+            text = self.cache.get(key)
+            span.set(cached=text is not None)
+            if text is not None:
+                if on_text is not None:
+                    on_text(text)
+                return text
+
+            pieces = []
+            for piece in self._stream({**payload, "stream": True}, cancel):
+                pieces.append(piece)
+                if on_text is not None:
+                    on_text(piece)
+            text = "".join(pieces)
+            span.set(chars=len(text))
+        if text:
+            self.cache.put(key, text)
+        return text
+
+    def _stream(self, payload, cancel):
+        """Yield the text deltas of a streamed reply; cancelling closes the connection."""
+        with self.http_client.stream("POST", self.base_url, payload) as response:
+            # Event streams are UTF-8, whatever requests guesses for text/* without a charset
+            response.encoding = "utf-8"
+            for event, data in _sse_events(response.iter_lines(chunk_size=None, decode_unicode=True)):
+                if cancel is not None and cancel.is_set():
+                    raise LLMCancelled()
+                if event == "content_block_delta":
+                    delta = data.get("delta", {})
+                    if delta.get("type") == "text_delta":
+                        yield delta.get("text", "")
+                elif event == "message_stop":
+                    return
+                elif event == "error":
+                    raise LLMError(data.get("error", {}).get("message", "the stream failed"))
+        raise LLMError("The response ended before the message was complete")
+
+    @staticmethod
+    def _build_commit_prompt(diff, commit_types) -> tuple[str, str]:
+        system = (
+            "You write Conventional Commits messages. Reply with JSON only, in the form "
+            '{"type": "<type>", "message": "<message>"}: no preamble, no code fence.'
+        )
+        prompt = (
+            f"Pick the type from: {', '.join(commit_types)}.\n"
+            "The message is one imperative line under 72 characters, without the type "
+            "prefix, saying what the change does.\n\n"
+            f"{_describe_diff(diff)}"
+        )
+        return system, prompt
+
+    @staticmethod
+    def _build_pr_prompt(branch_name, diff_stat, diff_patch, template) -> tuple[str, str]:
+        system = (
+            "You fill in pull request descriptions. Reply with the filled-in markdown "
+            "template only: no preamble and no code fence around it."
+        )
+        prompt = (
+            f"Branch: {branch_name}\n\n"
+            f"Files changed:\n{diff_stat}\n\n"
+            f"Diff (sampled, may be truncated):\n{diff_patch}\n\n"
+            "Fill in this template from the changes above. Keep its headings and any "
+            f"ticket reference; leave a section short rather than guess.\n\n{template}"
+        )
+        return system, prompt
+
+    def close(self):
+        self.http_client.close()
+
+
+def _describe_diff(diff) -> str:
+    """A DiffSample as its file list and patch, or a diff string as it is."""
+    if hasattr(diff, "stat_lines"):
+        stat = "\n".join(diff.stat_lines())
+        return f"Files changed ({diff.summary()}):\n{stat}\n\nDiff (sampled):\n{diff.patch}"
+    return f"Diff:\n{diff}"
+
+
+def _sse_events(lines):
+    """Parse server-sent event lines into (event, data) pairs; data is decoded JSON."""
+    event, data = None, []
+    for line in lines:
+        if line:
+            field, _, value = line.partition(":")
+            value = value.removeprefix(" ")
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+            continue
+        if data:
+            try:
+                decoded = json.loads("\n".join(data))
+            except ValueError:
+                logger.debug("Skipping an undecodable event: %r", data)
+            else:
+                if isinstance(decoded, dict):
+                    yield event or decoded.get("type"), decoded
+        event, data = None, []
@@ -0,0 +1,167 @@
+import logging
+import math
+import sqlite3
+import time
+from functools import cached_property
+from .config_manager import CLIUTILS_HOME, ConfigManager
+
+logger = logging.getLogger(__name__)
+
+METRICS_PATH = CLIUTILS_HOME / "metrics.sqlite3"
+DEFAULT_MAX_INVOCATIONS = 20000
+PRUNE_EVERY = 100
+TOOLING_CATEGORIES = ("subprocess", "http")
+# Long-running commands (the daemon, the push worker) set this to False in ctx.meta
+RECORD_METRICS = "cliutils.record_metrics"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invocations (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    command TEXT NOT NULL,
+    exit_code INTEGER NOT NULL,
+    total_ms REAL NOT NULL,
+    prompt_ms REAL NOT NULL,
+    tooling_ms REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS invocations_started_at ON invocations (started_at);
+CREATE TABLE IF NOT EXISTS phases (
+    invocation_id INTEGER NOT NULL REFERENCES invocations (id) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    total_ms REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS phases_invocation_id ON phases (invocation_id);
+"""
+
+
+class MetricsStore:
+    """
+    Timing records for every cliutils invocation, in a SQLite file under ~/.cliutils.
+
+    Each invocation stores its total time, the time spent in prompts and in
+    subprocesses/HTTP on the main thread, and the calls and time per phase (one
+    row per traced span name). Only the newest max_invocations are kept; older
+    ones are deleted every PRUNE_EVERY records and their pages handed back to the
+    filesystem, so the file stays bounded.
+    """
+
+    def __init__(self, path=METRICS_PATH, max_invocations: int = DEFAULT_MAX_INVOCATIONS):
+        self.path = path
+        self.max_invocations = max_invocations
+
+    @cached_property
+    def connection(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=1)
+        # auto_vacuum only takes effect before the first table is created
+        connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute("PRAGMA foreign_keys = ON")
+        connection.executescript(SCHEMA)
+        return connection
+
+    def record(
+        self,
+        command: str,
+        started_at: float,
+        exit_code: int,
+        total: float,
+        phase_totals,
+    ) -> None:
+        """Store one invocation from tracing.PhaseTotals; failures are only logged."""
+        main_thread = phase_totals.main_thread
+        prompt = main_thread.get("prompt", 0.0)
+        tooling = sum(main_thread.get(category, 0.0) for category in TOOLING_CATEGORIES)
+        try:
+            with self.connection as connection:
+                invocation_id = connection.execute(
+                    "INSERT INTO invocations"
+                    " (started_at, command, exit_code, total_ms, prompt_ms, tooling_ms)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (started_at, command, exit_code, total * 1000, prompt * 1000, tooling * 1000),
+                ).lastrowid
+                connection.executemany(
+                    "INSERT INTO phases (invocation_id, category, name, calls, total_ms)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (invocation_id, category, name, calls, duration * 1000)
+                        for (category, name), (calls, duration) in phase_totals.phases.items()
+                    ],
+                )
+            if invocation_id % PRUNE_EVERY == 0:
+                self.prune()
+        except (sqlite3.Error, OSError) as exc:
+            logger.debug("Could not record metrics in %s: %s", self.path, exc)
+
+    def prune(self) -> None:
+        with self.connection as connection:
+            connection.execute(
+                "DELETE FROM invocations WHERE id <= (SELECT MAX(id) FROM invocations) - ?",
+                (self.max_invocations,),
+            )
+        self.connection.execute("PRAGMA incremental_vacuum")
+
+    def invocations(self, since: float, command: str = None) -> list[sqlite3.Row]:
+        """Invocations started at or after since (a Unix time), oldest first."""
+        return self._query(
+            "SELECT * FROM invocations WHERE started_at >= ?"
+            + (" AND command = ?" if command else "")
+            + " ORDER BY started_at",
+            (since, command) if command else (since,),
+        )
+
+    def phases(self, since: float, command: str = None) -> list[sqlite3.Row]:
+        """Per-invocation phase totals, joined with their command, for the same window."""
+        return self._query(
+            "SELECT invocations.command, phases.category, phases.name, phases.calls,"
+            " phases.total_ms FROM phases"
+            " JOIN invocations ON invocations.id = phases.invocation_id"
+            " WHERE invocations.started_at >= ?"
+            + (" AND invocations.command = ?" if command else ""),
+            (since, command) if command else (since,),
+        )
+
+    def _query(self, sql, params):
+        if not self.path.exists():
+            return []
+        self.connection.row_factory = sqlite3.Row
+        return self.connection.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        if "connection" in self.__dict__:
+            self.connection.close()
+
+
+def record_invocation(command: str, started_at: float, started: float, exc, phase_totals):
+    """Store the invocation that is finishing, unless metrics are turned off in config."""
+    metrics_config = ConfigManager().config.get("metrics", {})
+    if not metrics_config.get("enabled", True):
+        return
+    store = MetricsStore(
+        max_invocations=metrics_config.get("max-invocations", DEFAULT_MAX_INVOCATIONS)
+    )
+    try:
+        store.record(
+            command, started_at, _exit_code(exc), time.perf_counter() - started, phase_totals
+        )
+    finally:
+        store.close()
+
+
+def percentile(sorted_values, point: float) -> float:
+    """The nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(1, math.ceil(point / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def _exit_code(exc) -> int:
+    if exc is None:
+        return 0
+    if isinstance(exc, SystemExit):
+        if exc.code is None:
+            return 0
+        return exc.code if isinstance(exc.code, int) else 1
+    return getattr(exc, "exit_code", 1)
@@ -0,0 +1,235 @@
+import logging
+import sys
+import threading
+from contextlib import contextmanager
+import click
+import beaupy
+from rich.live import Live
+from rich.markup import escape
+from rich.text import Text
+from yakh import get_key
+from yakh.key import Keys
+from cliutils import tracing
+from .config_manager import ConfigManager
+from .fuzzy_index import FuzzyIndex
+
+logger = logging.getLogger(__name__)
+
+FILTER_HEIGHT = 10
+
+# Ctrl-C should abort the command, as it does from gum, rather than return None
+beaupy.Config.raise_on_interrupt = True
+
+
+class NativePrompts:
+    """
+    The GumPrompts methods drawn in-process with rich and beaupy instead of by gum.
+
+    Selected with `prompts.backend: native` in the config, or CLIUTILS_PROMPTS=native.
+    Colors and icons come from the same theme as the gum flags. Filtering runs on a
+    FuzzyIndex built once as options arrive, so each keystroke narrows the previous
+    matches rather than matching every option again. Writing longer text opens
+    $EDITOR, as `git commit` does, since neither library has a multi-line editor.
+    """
+
+    def __init__(self, config_manager: ConfigManager = None):
+        self.config_manager = config_manager or ConfigManager()
+
+    @property
+    def console(self):
+        return self.config_manager.console
+
+    def input(self, header, placeholder=""):
+        with tracing.span("native input", "prompt"), self._abort_on_interrupt():
+            value = beaupy.prompt(self._title(header), initial_value=placeholder or "")
+        if value is None:
+            sys.exit(1)
+        return value.strip()
+
+    def write(self, header, templated_text=None):
+        self.console.print(header, style=self.config_manager.primary_color, markup=False)
+        with tracing.span("native write", "prompt"):
+            edited = click.edit(templated_text or "", extension=".md")
+        # Closing the editor without saving keeps the template, as leaving gum write would
+        return (templated_text or "" if edited is None else edited).strip()
+
+    def confirm(self, message):
+        with tracing.span("native confirm", "prompt"), self._abort_on_interrupt():
+            confirmed = beaupy.confirm(
+                self._title(message),
+                cursor=self.config_manager.cursor_style.strip(),
+                cursor_style=self.config_manager.secondary_color,
+                default_is_yes=True,
+            )
+        return bool(confirmed)
+
+    def choose(self, options, label=str):
+        options = list(options)
+        with tracing.span("native choose", "prompt"), self._abort_on_interrupt():
+            index = beaupy.select(
+                options,
+                preprocessor=lambda option: escape(str(label(option))),
+                cursor=self.config_manager.cursor_style.strip(),
+                cursor_style=self.config_manager.quaternary_color,
+                return_index=True,
+            )
+        if index is None:
+            sys.exit(1)
+        return options[index]
+
+    def filter(self, options, header, has_limit=True, label=str):
+        """Same contract as GumPrompts.gum_filter."""
+        with tracing.span("native filter", "prompt"), self._abort_on_interrupt():
+            return FilterPrompt(self.config_manager, header, has_limit).run(options, label)
+
+    def _title(self, text):
+        return f"[{self.config_manager.primary_color}]{escape(text)}[/]"
+
+    @contextmanager
+    def _abort_on_interrupt(self):
+        """Ctrl-C leaves the command the way an aborted gum prompt does."""
+        try:
+            yield
+        except KeyboardInterrupt:
+            self.console.print("Aborted!", style=self.config_manager.quaternary_color)
+            sys.exit(1)
+
+
+class FilterPrompt:
+    """
+    One fuzzy picker: a query line over a window of matches, redrawn per key.
+
+    preview, if given, is called with the highlighted option and its Text is
+    drawn below the matches, e.g. to show what choosing it would look like.
+    """
+
+    def __init__(self, config_manager: ConfigManager, header: str, has_limit: bool, preview=None):
+        self.config_manager = config_manager
+        self.header = header
+        self.has_limit = has_limit
+        self.preview = preview
+        self.index = FuzzyIndex()
+        self.options = []
+        self.query = ""
+        self.cursor = 0
+        self.chosen = set()
+        self.loading = False
+        self._options_lock = threading.Lock()
+
+    def run(self, options, label):
+        if hasattr(options, "fileno"):
+            self._load_in_background((line.rstrip("\n") for line in options), str)
+        elif isinstance(options, (list, tuple)):
+            self._add(options, label)
+        else:
+            self._load_in_background(options, label)
+
+        with Live(
+            get_renderable=self._render,
+            console=self.config_manager.console,
+            auto_refresh=True,
+            refresh_per_second=12,
+            transient=True,
+        ) as live:
+            while True:
+                selection = self._handle(get_key())
+                if selection is not None:
+                    break
+                live.refresh()
+
+        chosen = [self.options[position] for position in selection]
+        if self.has_limit:
+            return chosen[0] if chosen else None
+        return chosen
+
+    def _handle(self, key):
+        """Apply one key; returns the chosen positions once the picker is done."""
+        if key == Keys.ENTER:
+            matches = self.index.search(self.query)
+            if not matches:
+                return None
+            if self.has_limit or not self.chosen:
+                return [matches[min(self.cursor, len(matches) - 1)]]
+            return sorted(self.chosen)
+        if key == Keys.ESC:
+            sys.exit(1)
+        if key == Keys.CTRL_C:
+            raise KeyboardInterrupt
+        if key in (Keys.UP_ARROW, Keys.CTRL_P):
+            self.cursor = max(0, self.cursor - 1)
+        elif key in (Keys.DOWN_ARROW, Keys.CTRL_N):
+            self.cursor += 1
+        elif key == Keys.TAB and not self.has_limit:
+            matches = self.index.search(self.query)
+            if matches:
+                position = matches[min(self.cursor, len(matches) - 1)]
+                self.chosen ^= {position}
+                self.cursor += 1
+        elif key in (Keys.BACKSPACE, Keys.CTRL_H):
+            self.query, self.cursor = self.query[:-1], 0
+        elif key == Keys.CTRL_U:
+            self.query, self.cursor = "", 0
+        elif key == Keys.CTRL_W:
+            self.query, self.cursor = self.query.rstrip().rpartition(" ")[0], 0
+        elif key.is_printable:
+            self.query, self.cursor = self.query + str(key), 0
+        return None
+
+    def _render(self):
+        theme = self.config_manager
+        query = self.query
+        matches = self.index.search(query)
+        self.cursor = min(self.cursor, max(0, len(matches) - 1))
+        top = max(0, self.cursor - FILTER_HEIGHT + 1)
+
+        text = Text(self.header, style=theme.primary_color)
+        text.append("\n")
+        text.append(theme.filter_prompt, style=theme.quaternary_color)
+        text.append(query)
+        text.append(" ", style="reverse")
+        for row, position in enumerate(matches[top:top + FILTER_HEIGHT], start=top):
+            current = row == self.cursor
+            text.append("\n")
+            if current:
+                text.append(theme.cursor_style, style=theme.cursor_color)
+            else:
+                text.append(" " * len(theme.cursor_style))
+            if not self.has_limit:
+                text.append(
+                    "✓ " if position in self.chosen else "• ", style=theme.tertiary_color
+                )
+            line = Text(
+                self.index.labels[position],
+                style=theme.secondary_color if current else theme.prompt_color,
+            )
+            for offset in self.index.positions(position, query):
+                line.stylize(theme.tertiary_color, offset, offset + 1)
+            text.append_text(line)
+        text.append(
+            f"\n{len(matches)}/{len(self.index)}{' loading…' if self.loading else ''}",
+            style="dim",
+        )
+        if self.preview is not None and matches:
+            text.append("\n\n")
+            text.append_text(self.preview(self.options[matches[self.cursor]]))
+        return text
+
+    def _add(self, options, label):
+        lines = [str(label(option)).replace("\n", " ") for option in options]
+        with self._options_lock:
+            self.options.extend(options)
+            self.index.extend(lines)
+
+    def _load_in_background(self, options, label):
+        """Keep reading a streaming iterable into the open picker, one option at a time."""
+        def load():
+            try:
+                for option in options:
+                    self._add([option], label)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.debug("Options for %r stopped early: %s", self.header, exc)
+            finally:
+                self.loading = False
+
+        self.loading = True
+        threading.Thread(target=load, name="filter-options", daemon=True).start()
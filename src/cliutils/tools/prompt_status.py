@@ -0,0 +1,244 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import NamedTuple
+from cliutils import tracing
+from .git_repo import STATUS_COMMAND, RepoStatus
+from .subprocess_utilities import SubprocessUtilities
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE = 2.0
+DEFAULT_WAIT = 0.05
+MAX_REPOS = 64
+# The order, and symbols, of the headline theme's status section
+STATUS_SYMBOLS = (
+    ("staged", "+"),
+    ("changed", "!"),
+    ("untracked", "?"),
+    ("behind", "↓"),
+    ("ahead", "↑"),
+    ("stashed", "*"),
+    ("conflicts", "✘"),
+)
+
+
+class PromptStatus(NamedTuple):
+    """What a shell prompt shows about a repository."""
+    branch: str  # the short commit hash when detached
+    detached: bool
+    staged: int
+    changed: int
+    untracked: int
+    behind: int
+    ahead: int
+    stashed: int
+    conflicts: int
+
+    def status_string(self) -> str:
+        """The headline status section, e.g. `2+!3?↑`; a count of one is left out."""
+        parts = []
+        for field, symbol in STATUS_SYMBOLS:
+            count = getattr(self, field)
+            if count:
+                parts.append(symbol if count == 1 else f"{count}{symbol}")
+        return "".join(parts)
+
+    def fields(self) -> str:
+        """
+        One space-separated line for shells:
+        `b|h ref staged changed untracked behind ahead stashed conflicts`.
+        """
+        counts = (str(getattr(self, field)) for field in self._fields[2:])
+        return " ".join(["h" if self.detached else "b", self.branch, *counts])
+
+
+class RepoPaths(NamedTuple):
+    toplevel: str
+    git_dir: Path
+    common_dir: Path
+
+
+def locate_repo(path, subprocess_utilities: SubprocessUtilities = None) -> RepoPaths | None:
+    """The work tree and git directories for path, or None outside a work tree."""
+    subprocess_utilities = subprocess_utilities or SubprocessUtilities()
+    result = subprocess_utilities.execute(
+        ["git", "rev-parse", "--show-toplevel", "--absolute-git-dir", "--git-common-dir"],
+        cwd=path, check=False, capture_stderr=True,
+    )
+    lines = (result.stdout or "").splitlines()
+    if result.returncode != 0 or len(lines) != 3:
+        return None
+    toplevel, git_dir, common_dir = lines
+    # --git-common-dir is relative to path unless it is elsewhere
+    return RepoPaths(toplevel, Path(git_dir), Path(path, common_dir).resolve())
+
+
+def read_prompt_status(
+    path, subprocess_utilities: SubprocessUtilities = None
+) -> PromptStatus | None:
+    """Compute the status once, directly; None outside a work tree."""
+    subprocess_utilities = subprocess_utilities or SubprocessUtilities()
+    paths = locate_repo(path, subprocess_utilities)
+    if paths is None:
+        return None
+    return _compute(paths, subprocess_utilities)[0]
+
+
+class PromptStatusCache:
+    """
+    PromptStatus per repository, kept in memory by the daemon so that drawing a
+    prompt costs a few stats instead of a `git status`.
+
+    An entry is recomputed at once when a file git rewrites on every commit,
+    checkout, stage, fetch or stash changes: the index, HEAD and its reflog,
+    the branch and upstream refs, packed-refs, FETCH_HEAD or the stash reflog.
+    Edits to the work tree alone change none of them, so an entry older than
+    max_age is refreshed in the background; the request waits up to wait seconds
+    for that refresh and otherwise answers with the previous status.
+    """
+
+    def __init__(self, max_age: float = DEFAULT_MAX_AGE, wait: float = DEFAULT_WAIT,
+                 subprocess_utilities: SubprocessUtilities = None):
+        self.max_age = max_age
+        self.wait = wait
+        self.subprocess_utilities = subprocess_utilities or SubprocessUtilities()
+        self._lock = threading.Lock()
+        self._locations = {}  # directory -> RepoPaths
+        self._entries = {}  # toplevel -> _Entry
+
+    def get(self, path) -> PromptStatus | None:
+        path = os.path.realpath(path)
+        paths = self._locate(path)
+        if paths is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(paths.toplevel)
+            if entry is None:
+                entry = self._entries[paths.toplevel] = _Entry(paths)
+                self._evict()
+            entry.used_at = time.monotonic()
+            changed = entry.stamps != _stamps(entry)
+            refresh = entry.refresh_if_needed(self, changed)
+
+        # After a commit, checkout or stage the old status is wrong, so wait it out
+        if refresh is not None and not refresh.wait(None if changed else self.wait):
+            logger.debug("Serving the previous status of %s while it refreshes", paths.toplevel)
+        return entry.status
+
+    def _locate(self, path):
+        paths = self._locations.get(path)
+        if paths is not None and paths.git_dir.is_dir():
+            return paths
+        paths = locate_repo(path, self.subprocess_utilities)
+        if paths is not None:
+            if len(self._locations) >= MAX_REPOS * 4:
+                self._locations.clear()
+            self._locations[path] = paths
+        return paths
+
+    def _evict(self):
+        while len(self._entries) > MAX_REPOS:
+            oldest = min(self._entries.values(), key=lambda entry: entry.used_at)
+            del self._entries[oldest.paths.toplevel]
+
+
+class _Entry:
+    def __init__(self, paths: RepoPaths):
+        self.paths = paths
+        self.status = None
+        self.upstream = None
+        self.stamps = None
+        self.computed_at = 0.0
+        self.used_at = 0.0
+        self.refreshing = None  # a threading.Event while a refresh runs
+
+    def refresh_if_needed(self, cache: PromptStatusCache, changed: bool):
+        """The Event of the refresh to wait for, starting one if the entry is out of date."""
+        if self.refreshing is not None:
+            return self.refreshing
+        if not changed and time.monotonic() - self.computed_at < cache.max_age:
+            return None
+        done = self.refreshing = threading.Event()
+        threading.Thread(
+            target=self._refresh, args=(cache, done), name="prompt-status", daemon=True
+        ).start()
+        return done
+
+    def _refresh(self, cache, done):
+        try:
+            # Stamp first, so a change made while git status runs forces another refresh
+            stamps = _stamps(self)
+            status, upstream = _compute(self.paths, cache.subprocess_utilities)
+            with cache._lock:  # pylint: disable=protected-access
+                moved = self.status is None or (
+                    (self.status.branch, self.upstream) != (status.branch, upstream)
+                )
+                self.status, self.upstream = status, upstream
+                # Another branch or upstream has other ref files to watch
+                self.stamps = _stamps(self) if moved else stamps
+                self.computed_at = time.monotonic()
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            logger.info("Status of %s failed: %s", self.paths.toplevel, exc)
+        finally:
+            with cache._lock:  # pylint: disable=protected-access
+                self.refreshing = None
+            done.set()
+
+
+def _compute(paths: RepoPaths, subprocess_utilities: SubprocessUtilities):
+    """One `git status` for the PromptStatus, plus the upstream whose ref it depends on."""
+    with tracing.span("prompt status", "subprocess", repo=paths.toplevel):
+        output = subprocess_utilities.execute(
+            STATUS_COMMAND, cwd=paths.toplevel, capture_stderr=True
+        ).stdout
+        status = RepoStatus.parse(output or "")
+
+    counts = dict.fromkeys(("staged", "changed", "untracked", "conflicts"), 0)
+    for change in status.changes:
+        if change.untracked:
+            counts["untracked"] += 1
+        elif change.conflicted:
+            counts["conflicts"] += 1
+        elif change.kind in "12":
+            counts["staged"] += change.staged
+            counts["changed"] += change.unstaged
+    branch = status.branch or (status.oid or "")[:7]
+    return PromptStatus(
+        branch, status.detached, counts["staged"], counts["changed"], counts["untracked"],
+        status.behind, status.ahead, _stash_count(paths), counts["conflicts"],
+    ), status.upstream
+
+
+def _stash_count(paths: RepoPaths) -> int:
+    """Stash entries, one per line of the stash reflog; no subprocess needed."""
+    try:
+        with open(paths.common_dir / "logs" / "refs" / "stash", "rb") as stream:
+            return sum(1 for _ in stream)
+    except OSError:
+        return 0
+
+
+def _stamps(entry: _Entry):
+    """mtime and size of every file whose change invalidates the entry."""
+    git_dir, common_dir = entry.paths.git_dir, entry.paths.common_dir
+    files = [
+        git_dir / "index", git_dir / "HEAD", git_dir / "logs" / "HEAD",
+        common_dir / "packed-refs", common_dir / "FETCH_HEAD",
+        common_dir / "logs" / "refs" / "stash",
+    ]
+    if entry.status is not None and not entry.status.detached:
+        files.append(common_dir / "refs" / "heads" / entry.status.branch)
+    if entry.upstream:
+        files.append(common_dir / "refs" / "remotes" / entry.upstream)
+    stamps = []
+    for path in files:
+        try:
+            stat = os.stat(path)
+            stamps.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamps.append(None)
+    return stamps
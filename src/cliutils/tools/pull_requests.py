@@ -0,0 +1,50 @@
+import json
+import re
+from .config_manager import ASSETS_PATH
+
+
+def parse_ticket_from_branch(branch_name: str, team_tag: str) -> tuple[str, str, str]:
+    """Extract ticket reference and clean branch name for PR title generation."""
+    ticket_pattern = rf"{team_tag}-(\d{{1,4}})"
+    ticket_match = re.search(ticket_pattern, branch_name)
+
+    if ticket_match:
+        ticket_reference = ticket_match.group(0)
+        pr_header = f"{ticket_reference}: "
+        cleaned_branch = re.sub(rf".*{team_tag}-\d{{1,4}}-", "", branch_name)
+    else:
+        ticket_reference = ""
+        pr_header = ""
+        cleaned_branch = branch_name
+
+    return ticket_reference, pr_header, cleaned_branch
+
+
+def resolve_template(ticket_only: bool) -> str:
+    """Load the appropriate PR body template."""
+    template_name = "data_dbt_ticket_only.md" if ticket_only else "data_dbt_verbose.md"
+    template_path = ASSETS_PATH / "templates" / "pull_requests" / template_name
+    return template_path.read_text()
+
+
+def generate_pr_title_default(branch_name: str) -> str:
+    """Convert a branch name into a human-readable PR title."""
+    protected_keywords = ["data-", "infra-", "spike-"]
+    prepositions = load_prepositions()
+
+    keyword_match = next(
+        (kw for kw in protected_keywords if kw in branch_name),
+        ""
+    )
+    pr_heading = keyword_match.replace("-", " - ") if keyword_match else ""
+    title_body = branch_name.replace(keyword_match, "").replace("-", " ")
+
+    words = [w.title() if w not in prepositions else w for w in title_body.split()]
+    return pr_heading + " ".join(words)
+
+
+def load_prepositions() -> list[str]:
+    """Load the prepositions list used for PR title casing."""
+    prepositions_file = ASSETS_PATH / "data" / "prepositions.json"
+    with open(prepositions_file, "r", encoding="utf-8") as f:
+        return json.load(f)
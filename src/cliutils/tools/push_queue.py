@@ -0,0 +1,236 @@
+import fcntl
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from .config_manager import CLIUTILS_HOME
+from .file_cache import read_json, write_json_atomic
+from .subprocess_utilities import SubprocessUtilities
+
+logger = logging.getLogger(__name__)
+
+JOBS_PATH = CLIUTILS_HOME / "jobs"
+JOURNAL_LOCK_PATH = JOBS_PATH / "journal.lock"
+WORKER_LOCK_PATH = JOBS_PATH / "worker.lock"
+WORKER_LOG_PATH = JOBS_PATH / "worker.log"
+WORKER_COMMAND = (sys.executable, "-m", "cliutils", "jobs", "--worker")
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+PUSH_TIMEOUT = 300
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 5
+BACKOFF_CAP = 300
+DONE_JOB_RETENTION = 24 * 3600
+
+# stderr fragments of `git push` failures worth retrying; anything else (a rejected
+# push, bad credentials) fails the job straight away
+TRANSIENT_ERRORS = (
+    "Could not resolve host",
+    "Connection refused",
+    "Connection reset",
+    "Temporary failure",
+    "Network is unreachable",
+    "The remote end hung up unexpectedly",
+    "early EOF",
+    "RPC failed",
+    "returned error: 5",
+    "timed out",
+)
+
+
+class PushQueue:
+    """
+    A journal of `git push` jobs drained by a detached background worker.
+
+    Each job is one JSON file under ~/.cliutils/jobs, written under a file lock so
+    the CLI and the worker can share it. Queueing a push of a branch that already
+    has one waiting adds to that job instead of creating another, since a single
+    push sends every commit made in the meantime. Failed pushes that look like
+    network trouble are retried with exponential backoff and jitter.
+    """
+
+    def __init__(self, subprocess_utilities: SubprocessUtilities = None):
+        self.subprocess_utilities = subprocess_utilities or SubprocessUtilities()
+
+    def enqueue(self, repo_path: str, branch_ref: str, remote: str, remote_ref: str) -> dict:
+        """Queue a push of branch_ref to remote_ref on remote and make sure a worker runs."""
+        with self._journal():
+            for job in self._load():
+                if job["state"] == PENDING and (
+                    job["repo"], job["branch_ref"], job["remote"], job["remote_ref"]
+                ) == (repo_path, branch_ref, remote, remote_ref):
+                    job["commits"] += 1
+                    self._save(job)
+                    logger.debug("Coalesced push of %s into job %s", branch_ref, job["id"])
+                    break
+            else:
+                job = {
+                    "id": uuid.uuid4().hex[:8],
+                    "repo": repo_path,
+                    "branch_ref": branch_ref,
+                    "remote": remote,
+                    "remote_ref": remote_ref,
+                    "state": PENDING,
+                    "commits": 1,
+                    "attempts": 0,
+                    "queued_at": time.time(),
+                    "not_before": 0,
+                    "started_at": None,
+                    "finished_at": None,
+                    "error": None,
+                }
+                self._save(job)
+                logger.debug("Queued push of %s as job %s", branch_ref, job["id"])
+        self._spawn_worker()
+        return job
+
+    def jobs(self) -> list[dict]:
+        """Every job in the journal, oldest first."""
+        return sorted(self._load(), key=lambda job: job["queued_at"])
+
+    def retry(self, job_id: str) -> bool:
+        """Put a failed job back in the queue; returns False if there is no such job."""
+        if not job_id.isalnum():
+            return False
+        with self._journal():
+            job = read_json(self._job_path(job_id))
+            if job is None or job["state"] != FAILED:
+                return False
+            job.update(state=PENDING, attempts=0, not_before=0, error=None)
+            self._save(job)
+        self._spawn_worker()
+        return True
+
+    def clear(self) -> int:
+        """Remove finished and failed jobs from the journal and return how many."""
+        with self._journal():
+            finished = [job for job in self._load() if job["state"] in (DONE, FAILED)]
+            for job in finished:
+                self._job_path(job["id"]).unlink(missing_ok=True)
+        return len(finished)
+
+    def run_worker(self) -> None:
+        """
+        Drain the queue, then exit. Only one worker runs at a time.
+
+        The worker lock is released while the journal is still locked, so a job
+        queued right as the worker finds nothing left starts a new worker rather
+        than being stranded.
+        """
+        JOBS_PATH.mkdir(parents=True, exist_ok=True)
+        with open(WORKER_LOCK_PATH, "a", encoding="utf-8") as worker_lock:
+            try:
+                fcntl.flock(worker_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+            # Nobody is there to answer a credential prompt
+            os.environ["GIT_TERMINAL_PROMPT"] = "0"
+            self._recover()
+            while True:
+                with self._journal():
+                    job, wait = self._claim_next()
+                    if job is None and wait is None:
+                        self._prune()
+                        fcntl.flock(worker_lock, fcntl.LOCK_UN)
+                        return
+                if job is None:
+                    time.sleep(wait)
+                else:
+                    self._push(job)
+
+    def _claim_next(self):
+        """Mark the oldest ready job running; else return how long until one is ready."""
+        now = time.time()
+        pending = [job for job in self._load() if job["state"] == PENDING]
+        ready = [job for job in pending if job["not_before"] <= now]
+        if ready:
+            job = min(ready, key=lambda job: job["queued_at"])
+            job.update(state=RUNNING, started_at=now, attempts=job["attempts"] + 1)
+            self._save(job)
+            return job, None
+        if pending:
+            return None, min(job["not_before"] for job in pending) - now
+        return None, None
+
+    def _push(self, job: dict) -> None:
+        argv = [
+            "git", "push", "--quiet", job["remote"], f"{job['branch_ref']}:{job['remote_ref']}",
+        ]
+        logger.info("Job %s: %s (attempt %d)", job["id"], " ".join(argv), job["attempts"])
+        try:
+            result = self.subprocess_utilities.execute(
+                argv, check=False, capture_stderr=True, timeout=PUSH_TIMEOUT, cwd=job["repo"]
+            )
+            error = None if result.ok else (result.stderr or f"exited with {result.returncode}")
+        except subprocess.TimeoutExpired:
+            error = f"timed out after {PUSH_TIMEOUT}s"
+        except OSError as exc:
+            error = str(exc)
+
+        with self._journal():
+            job = read_json(self._job_path(job["id"])) or job
+            job.update(finished_at=time.time(), error=error)
+            if error is None:
+                job["state"] = DONE
+            elif job["attempts"] < MAX_ATTEMPTS and _is_transient(error):
+                delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (job["attempts"] - 1))
+                job.update(
+                    state=PENDING, not_before=time.time() + delay / 2 + random.uniform(0, delay / 2)
+                )
+            else:
+                job["state"] = FAILED
+            self._save(job)
+        logger.info("Job %s: %s%s", job["id"], job["state"], f": {error}" if error else "")
+
+    def _recover(self) -> None:
+        """Requeue jobs left running by a worker that died; only one worker runs at a time."""
+        with self._journal():
+            for job in self._load():
+                if job["state"] == RUNNING:
+                    job["state"] = PENDING
+                    self._save(job)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - DONE_JOB_RETENTION
+        for job in self._load():
+            if job["state"] == DONE and job["finished_at"] < cutoff:
+                self._job_path(job["id"]).unlink(missing_ok=True)
+
+    def _spawn_worker(self) -> None:
+        """Start a worker detached from the terminal; it exits at once if one is running."""
+        JOBS_PATH.mkdir(parents=True, exist_ok=True)
+        with open(WORKER_LOG_PATH, "a", encoding="utf-8") as log:
+            subprocess.Popen(  # pylint: disable=consider-using-with
+                WORKER_COMMAND,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=log,
+                start_new_session=True,
+            )
+
+    @contextmanager
+    def _journal(self):
+        JOBS_PATH.mkdir(parents=True, exist_ok=True)
+        with open(JOURNAL_LOCK_PATH, "a", encoding="utf-8") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _load(self) -> list[dict]:
+        jobs = (read_json(path) for path in JOBS_PATH.glob("*.json"))
+        return [job for job in jobs if job is not None]
+
+    def _save(self, job: dict) -> None:
+        write_json_atomic(self._job_path(job["id"]), job)
+
+    @staticmethod
+    def _job_path(job_id: str):
+        return JOBS_PATH / f"{job_id}.json"
+
+
+def _is_transient(error: str) -> bool:
+    return any(fragment in error for fragment in TRANSIENT_ERRORS)
@@ -0,0 +1,303 @@
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import urlsplit
+from cliutils import tracing
+from .config_manager import CLIUTILS_HOME
+from .file_cache import read_json, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_PATH = CLIUTILS_HOME / "s3-sync"
+MANIFEST_VERSION = 1
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+DELETE_BATCH = 1000
+READ_SIZE = 1024 * 1024
+EXCLUDED_DIRS = frozenset({"__pycache__", ".git"})
+EXCLUDED_SUFFIXES = (".pyc",)
+
+
+class S3SyncError(Exception):
+    """The sync is misconfigured, or boto3 is not installed."""
+
+
+class LocalFile(NamedTuple):
+    key: str
+    path: Path
+    size: int
+    mtime_ns: int
+    etag: str
+
+
+@dataclass(slots=True)
+class SyncPlan:
+    """What a sync would change; listed is False when the manifest stood in for the bucket."""
+    uploads: list
+    deletes: list
+    unchanged: list
+    listed: bool
+
+    @property
+    def upload_bytes(self) -> int:
+        return sum(local_file.size for local_file in self.uploads)
+
+
+@dataclass(slots=True)
+class SyncResult:
+    uploaded: int = 0
+    uploaded_bytes: int = 0
+    deleted: int = 0
+    failed: list = field(default_factory=list)  # (key, error)
+    duration: float = 0.0
+
+
+def parse_s3_url(url: str) -> tuple[str, str]:
+    """("bucket", "some/prefix/") from s3://bucket/some/prefix."""
+    parts = urlsplit(url)
+    if parts.scheme != "s3" or not parts.netloc:
+        raise S3SyncError(f"{url!r} is not an s3://bucket/prefix location")
+    prefix = parts.path.strip("/")
+    return parts.netloc, f"{prefix}/" if prefix else ""
+
+
+def content_etag(path, size: int, threshold: int, part_size: int) -> str:
+    """
+    The ETag S3 gives the file once uploaded: its md5, or for a multipart upload
+    the md5 of its parts' md5s and the part count. It doubles as the content hash.
+    """
+    if size < threshold:
+        digest = hashlib.md5(usedforsecurity=False)
+        with open(path, "rb") as stream:
+            while chunk := stream.read(READ_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    part_digests = []
+    with open(path, "rb") as stream:
+        while part := stream.read(part_size):
+            part_digests.append(hashlib.md5(part, usedforsecurity=False).digest())
+    combined = hashlib.md5(b"".join(part_digests), usedforsecurity=False).hexdigest()
+    return f"{combined}-{len(part_digests)}"
+
+
+class S3Sync:
+    """
+    Mirrors a local directory to an S3 prefix, uploading only what changed.
+
+    A manifest under ~/.cliutils/s3-sync records each synced file's size, mtime
+    and ETag. Files whose size and mtime are unchanged are not read again, and
+    the manifest stands in for the bucket, so planning a sync lists nothing
+    remotely. The bucket is listed instead on the first sync, when the upload
+    settings changed, or with verify (e.g. after someone else synced the same
+    prefix). The ETag is computed locally the way S3 computes it, so a listing
+    can be compared with local files without downloading them.
+
+    Uploads go through one boto3 transfer manager: small files are single PUTs,
+    large ones multipart uploads, and parts and files share max_workers
+    connections. The manifest is saved when a sync ends, even when interrupted,
+    so an aborted sync resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        local_root,
+        s3_url: str,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        multipart_threshold: int = DEFAULT_MULTIPART_THRESHOLD,
+        part_size: int = DEFAULT_PART_SIZE,
+        client=None,
+    ):
+        self.local_root = Path(local_root).expanduser()
+        self.s3_url = s3_url
+        self.bucket, self.prefix = parse_s3_url(s3_url)
+        self.max_workers = max_workers
+        self.multipart_threshold = multipart_threshold
+        self.part_size = part_size
+        if client is not None:
+            self.client = client
+        name = hashlib.sha256(f"{self.local_root.resolve()}|{s3_url}".encode()).hexdigest()[:16]
+        self.manifest_path = MANIFEST_PATH / f"{name}.json"
+
+    @cached_property
+    def client(self):
+        """A boto3 S3 client; AWS_ENDPOINT_URL points it at a local S3 stand-in."""
+        try:
+            import boto3  # pylint: disable=import-outside-toplevel
+            from botocore.config import Config  # pylint: disable=import-outside-toplevel
+        except ImportError as exc:
+            raise S3SyncError("s3-sync needs boto3: pip install 'cliutils[s3]'") from exc
+        return boto3.client(
+            "s3", config=Config(max_pool_connections=self.max_workers, retries={"mode": "standard"})
+        )
+
+    @cached_property
+    def manifest(self) -> dict | None:
+        """The recorded files, or None when the manifest cannot be trusted for this sync."""
+        manifest = read_json(self.manifest_path)
+        if not isinstance(manifest, dict) or manifest.get("settings") != self._settings():
+            return None
+        return manifest.get("files")
+
+    def scan(self) -> dict[str, LocalFile]:
+        """Every file under local_root by key, hashing only those changed since the manifest."""
+        if not self.local_root.is_dir():
+            raise S3SyncError(f"{self.local_root} is not a directory")
+        recorded = self.manifest or {}
+        with tracing.span("scan", "s3", root=str(self.local_root)) as span:
+            found, to_hash = {}, []
+            for directory, dirs, files in os.walk(self.local_root):
+                dirs[:] = [name for name in dirs if name not in EXCLUDED_DIRS]
+                for name in files:
+                    if name.endswith(EXCLUDED_SUFFIXES):
+                        continue
+                    path = Path(directory, name)
+                    stat = path.stat()
+                    key = path.relative_to(self.local_root).as_posix()
+                    entry = recorded.get(key)
+                    if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                        found[key] = LocalFile(key, path, stat.st_size, stat.st_mtime_ns, entry[2])
+                    else:
+                        to_hash.append((key, path, stat.st_size, stat.st_mtime_ns))
+
+            def hashed(item):
+                key, path, size, mtime_ns = item
+                etag = content_etag(path, size, self.multipart_threshold, self.part_size)
+                return LocalFile(key, path, size, mtime_ns, etag)
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for local_file in pool.map(hashed, to_hash):
+                    found[local_file.key] = local_file
+            span.set(files=len(found), hashed=len(to_hash))
+        return found
+
+    def plan(self, verify: bool = False, delete: bool = True) -> SyncPlan:
+        local = self.scan()
+        listed = verify or self.manifest is None
+        if listed:
+            remote = self.list_remote()
+        else:
+            remote = {key: entry[2] for key, entry in self.manifest.items()}
+
+        uploads, unchanged = [], []
+        for key in sorted(local):
+            (unchanged if remote.get(key) == local[key].etag else uploads).append(local[key])
+        deletes = sorted(set(remote) - set(local)) if delete else []
+        if listed:
+            # Record what the bucket holds, so the listing is trusted next time.
+            # Otherwise planning writes nothing; apply() records the sync
+            self._record(remote, unchanged)
+        return SyncPlan(uploads, deletes, unchanged, listed)
+
+    def list_remote(self) -> dict[str, str]:
+        """ETags of every object under the prefix, by key relative to it."""
+        remote = {}
+        with tracing.span("list", "s3", url=self.s3_url) as span:
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+                for item in page.get("Contents", ()):
+                    key = item["Key"][len(self.prefix):]
+                    if key and not key.endswith("/"):
+                        remote[key] = item["ETag"].strip('"')
+            span.set(objects=len(remote))
+        return remote
+
+    def apply(self, plan: SyncPlan, on_progress=None) -> SyncResult:
+        """
+        Upload and delete what plan lists; on_progress(done, total) follows along.
+
+        The manifest is saved even when there is nothing to send, so files that
+        were hashed again but did not change are not read on the next sync.
+        """
+        result = SyncResult()
+        remote = {key: entry[2] for key, entry in (self.manifest or {}).items()}
+        synced = list(plan.unchanged)
+        if not plan.uploads and not plan.deletes:
+            self._record(remote, synced)
+            return result
+
+        from boto3.s3.transfer import (  # pylint: disable=import-outside-toplevel
+            TransferConfig,
+            create_transfer_manager,
+        )
+
+        started = time.perf_counter()
+        total, done = len(plan.uploads) + len(plan.deletes), 0
+        config = TransferConfig(
+            multipart_threshold=self.multipart_threshold,
+            multipart_chunksize=self.part_size,
+            max_concurrency=self.max_workers,
+        )
+        try:
+            with tracing.span("upload", "s3", files=len(plan.uploads)), create_transfer_manager(
+                self.client, config
+            ) as manager:
+                futures = [
+                    (local_file, manager.upload(
+                        str(local_file.path), self.bucket, self.prefix + local_file.key
+                    ))
+                    for local_file in plan.uploads
+                ]
+                for local_file, future in futures:
+                    try:
+                        future.result()
+                    except Exception as exc:  # pylint: disable=broad-exception-caught
+                        result.failed.append((local_file.key, str(exc)))
+                    else:
+                        synced.append(local_file)
+                        result.uploaded += 1
+                        result.uploaded_bytes += local_file.size
+                    done += 1
+                    if on_progress is not None:
+                        on_progress(done, total)
+
+            with tracing.span("delete", "s3", keys=len(plan.deletes)):
+                for start in range(0, len(plan.deletes), DELETE_BATCH):
+                    batch = plan.deletes[start:start + DELETE_BATCH]
+                    response = self.client.delete_objects(
+                        Bucket=self.bucket,
+                        Delete={"Objects": [{"Key": self.prefix + key} for key in batch], "Quiet": True},
+                    )
+                    failed = {
+                        error["Key"][len(self.prefix):]: error.get("Message", "")
+                        for error in response.get("Errors", [])
+                    }
+                    result.failed.extend(failed.items())
+                    for key in batch:
+                        if key not in failed:
+                            remote.pop(key, None)
+                            result.deleted += 1
+                    done += len(batch)
+                    if on_progress is not None:
+                        on_progress(done, total)
+        finally:
+            # Failed uploads keep their old ETag and failed deletes stay recorded, so
+            # the next sync tries them again
+            self._record(remote, synced)
+            result.duration = time.perf_counter() - started
+        return result
+
+    def _settings(self) -> dict:
+        return {
+            "version": MANIFEST_VERSION,
+            "remote": self.s3_url,
+            "multipart-threshold": self.multipart_threshold,
+            "part-size": self.part_size,
+        }
+
+    def _record(self, remote: dict, local_files):
+        """Save the bucket's ETags, with size and mtime for keys matching a local file."""
+        files = {key: [None, None, etag] for key, etag in remote.items()}
+        files.update(
+            (local_file.key, [local_file.size, local_file.mtime_ns, local_file.etag])
+            for local_file in local_files
+        )
+        write_json_atomic(self.manifest_path, {"settings": self._settings(), "files": files})
+        self.__dict__["manifest"] = files
@@ -1,55 +1,258 @@
+import os
 import sys
+import logging
+import shutil
+import signal
 import subprocess
-from pathlib import Path
-from rich.console import Console
-from .config_manager import ConfigManager
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import cache, cached_property
+from cliutils import tracing
+from .config_manager import ConfigManager, get_console
+
+logger = logging.getLogger(__name__)
+
+# How often a command that can be stopped checks whether it has been
+STOP_POLL_INTERVAL = 0.05
+
+
+@dataclass(frozen=True, slots=True)
+class CommandResult:
+    """The outcome of SubprocessUtilities.execute()."""
+    argv: tuple[str, ...]
+    returncode: int
+    duration: float
+    stdout: str | None = None
+    stderr: str | None = None
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
 
 class SubprocessUtilities:
     """This class provides utility functions for subprocesses."""
     def __init__(self):
-        self.console = Console()
         self.config_manager = ConfigManager()
 
-    def run(self, cmd):
-        """Fire and forget a given shell command."""
-        try:
-            subprocess.run(
-                cmd,
-                shell=True,
-                check=True,
-                cwd=Path.cwd(),
+    @cached_property
+    def console(self):
+        return get_console()
+
+    def execute(
+        self,
+        argv,
+        input=None,  # pylint: disable=redefined-builtin
+        capture=True,
+        on_line=None,
+        timeout=None,
+        check=True,
+        cwd=None,
+        capture_stderr=False,
+        stop=None,
+    ):
+        """
+        Run argv without a shell and return a CommandResult.
+
+        The executable is resolved on PATH once per process and passed as an absolute
+        path, which lets subprocess spawn it with posix_spawn where the platform
+        supports it (only when no cwd is given). stdout is captured unless capture is
+        False, in which case it goes to the terminal; stderr is only captured with
+        capture_stderr, e.g. to keep background work from drawing over a prompt.
+        on_line, if given, is called with each stdout line as it arrives.
+
+        input may be a str, a list or tuple of lines written in a single pass, any
+        other iterable of lines, written from a background thread as it is produced
+        so the command can start before a slow producer (e.g. a paginated API) is
+        exhausted, or a readable pipe from another process, handed to the command as
+        its stdin untouched. If the command exits before reading everything, the rest
+        is dropped.
+
+        Exit code 130 (the user aborted a prompt) exits cliutils. Any other failure
+        is printed and raised as CalledProcessError when check is True; a timeout
+        kills the command and raises TimeoutExpired, printed only when check is True,
+        so background work with check=False reports it when the terminal is free.
+        stop, a threading.Event, kills the command once set, e.g. when the work it
+        was started for is abandoned; its result is then returned without checks.
+        """
+        argv = tuple(str(arg) for arg in argv)
+        passthrough = hasattr(input, "fileno")
+        pipe_stdout = capture or on_line is not None
+
+        started = time.perf_counter()
+        process = subprocess.Popen(  # pylint: disable=consider-using-with
+            (_resolve_executable(argv[0]), *argv[1:]),
+            stdin=input if passthrough else (None if input is None else subprocess.PIPE),
+            stdout=subprocess.PIPE if pipe_stdout else None,
+            stderr=subprocess.PIPE if capture_stderr else None,
+            text=True,
+            # Our own descriptors are non-inheritable, so this only keeps posix_spawn usable
+            close_fds=False,
+            cwd=cwd,
+            # A command that may be killed gets its own group, so its children end too
+            process_group=None if timeout is None and stop is None else 0,
+        )
+
+        finished = threading.Event()
+        timed_out = threading.Event()
+        stopped = threading.Event()
+        if timeout is not None or stop is not None:
+            threading.Thread(
+                target=_watch, args=(process, timeout, stop, finished, timed_out, stopped),
+                name="command-watcher", daemon=True,
+            ).start()
+
+        producer_errors = []
+        if input is not None and not passthrough:
+            threading.Thread(
+                target=_feed, args=(process, input, producer_errors), name="stdin-feeder",
+                daemon=True,
+            ).start()
+
+        stderr_chunks = []
+        stderr_reader = None
+        if capture_stderr:
+            stderr_reader = threading.Thread(
+                target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True
             )
-        except subprocess.CalledProcessError as e:
+            stderr_reader.start()
+
+        output = None
+        try:
+            if on_line is not None:
+                lines = []
+                for line in process.stdout:
+                    line = line.rstrip("\n")
+                    on_line(line)
+                    if capture:
+                        lines.append(line)
+                output = "\n".join(lines) if capture else None
+            elif pipe_stdout:
+                output = process.stdout.read().rstrip("\n")
+            returncode = process.wait()
+            if stderr_reader is not None:
+                stderr_reader.join()
+        finally:
+            finished.set()
+            if pipe_stdout:
+                process.stdout.close()
+            if capture_stderr:
+                process.stderr.close()
+
+        errors = "".join(stderr_chunks).rstrip("\n") if capture_stderr else None
+        result = CommandResult(argv, returncode, time.perf_counter() - started, output, errors)
+        logger.debug("%s exited %d in %.1f ms", argv[0:2], returncode, result.duration * 1000)
+        tracing.record(
+            " ".join(argv[0:2]),
+            # gum calls are the user's time, not the tools'
+            "prompt" if argv[0] == "gum" else "subprocess",
+            started, result.duration,
+            argv=list(argv), returncode=returncode,
+            bytes=len(output or "") + len(errors or ""), timed_out=timed_out.is_set(),
+            stopped=stopped.is_set(),
+        )
+
+        if stopped.is_set():
+            logger.debug("%s stopped", argv[0:2])
+            return result
+
+        if timed_out.is_set():
+            if check:
+                self.console.print(
+                    f"Timed out after {timeout}s: {' '.join(argv)}",
+                    style=self.config_manager.quaternary_color
+                )
+            raise subprocess.TimeoutExpired(argv, timeout, output=output)
+        if returncode == 130:
+            self.console.print("Aborted!", style=self.config_manager.quaternary_color)
+            sys.exit(1)
+        if producer_errors:
+            if returncode != 0:
+                raise producer_errors[0]
+            logger.debug("Input for %s stopped early: %s", argv[0:2], producer_errors[0])
+        if check and returncode != 0:
             self.console.print(
-                f"Error running command: {e}",
+                f"Error running command: {' '.join(argv)} exited with {returncode}",
                 style=self.config_manager.quaternary_color
             )
-            raise
+            raise subprocess.CalledProcessError(returncode, argv, output=output, stderr=errors)
 
-    def run_and_capture_output(self, cmd, store_exit_code=False):
-        """Run a command and return the output."""
-        try:
-            ran_process = subprocess.run(
-                cmd,
-                shell=True,
-                check=True,
-                cwd=Path.cwd(),
+        return result
+
+    @contextmanager
+    def open_output(self, argv):
+        """Start argv and yield its stdout pipe, e.g. to pass as execute(input=...)."""
+        argv = tuple(str(arg) for arg in argv)
+        with tracing.span(" ".join(argv[0:2]), "subprocess", argv=list(argv)) as span:
+            process = subprocess.Popen(  # pylint: disable=consider-using-with
+                (_resolve_executable(argv[0]), *argv[1:]),
                 stdout=subprocess.PIPE,
-                text=True
+                text=True,
+                # Diffs and file contents need not be valid UTF-8
+                errors="replace",
+                close_fds=False,
             )
+            try:
+                yield process.stdout
+            finally:
+                process.stdout.close()
+                returncode = process.wait()
+                span.set(returncode=returncode)
+        # A reader that stops early (e.g. a picker closed mid-stream) is not an error
+        if returncode not in (0, -signal.SIGPIPE):
+            self.console.print(
+                f"Error running command: {' '.join(argv)} exited with {returncode}",
+                style=self.config_manager.quaternary_color
+            )
+            raise subprocess.CalledProcessError(returncode, argv)
+
+
+def _watch(process, timeout, stop, finished, timed_out, stopped):
+    """Kill process and its group on timeout or once stop is set, unless it finished first."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        wait = None if deadline is None else max(0.0, deadline - time.monotonic())
+        if stop is not None:
+            wait = STOP_POLL_INTERVAL if wait is None else min(STOP_POLL_INTERVAL, wait)
+        if finished.wait(wait):
+            return
+        if stop is not None and stop.is_set():
+            stopped.set()
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            timed_out.set()
+            break
+    # Children such as git's ssh hold the pipes open until they are gone too
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
 
-            if isinstance(ran_process, subprocess.CompletedProcess):
-                output = ran_process.stdout.strip()
-            else:
-                output = None
-
-            return ran_process, output
-
-        except subprocess.CalledProcessError as e:
-            if e.returncode == 130:
-                self.console.print("Aborted!", style=self.config_manager.quaternary_color)
-                sys.exit(1)
-            if store_exit_code: # TODO: evaluate if this is actually needed
-                return e.returncode, None
-            else:
-                sys.exit(1)
+@cache
+def _resolve_executable(name):
+    return shutil.which(name) or name
+
+
+def _feed(process, lines, producer_errors):
+    """Write lines to a process's stdin, stopping quietly if it stops reading."""
+    try:
+        if isinstance(lines, str):
+            process.stdin.write(lines)
+        elif isinstance(lines, (list, tuple)):
+            process.stdin.write("".join(f"{line}\n" for line in lines))
+        else:
+            for line in lines:
+                process.stdin.write(f"{line}\n")
+                process.stdin.flush()
+    except (BrokenPipeError, ValueError):
+        pass  # the command exited before reading everything
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        producer_errors.append(exc)
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
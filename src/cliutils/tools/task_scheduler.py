@@ -0,0 +1,72 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class TaskScheduler:
+    """
+    Runs a command's independent work (network calls, git fetches) in a thread pool.
+
+    start() begins a named task right away and result() joins it where its value is
+    needed, re-raising anything it raised there rather than in the background. On
+    close, the time each joined task ran while the command was busy elsewhere is
+    logged as the wall-clock saved, and `stop` is set: tasks that pass it on, e.g.
+    as execute(stop=...), are killed rather than keeping the process alive once the
+    command is done with them or has exited early.
+    """
+
+    def __init__(self, name: str = "tasks", max_workers: int = 4):
+        self.name = name
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"cliutils-{name}"
+        )
+        self.stop = threading.Event()
+        self._futures = {}
+        self._durations = {}
+        self._waits = {}
+
+    def start(self, task_name: str, fn, *args, **kwargs) -> None:
+        def timed():
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._durations[task_name] = time.perf_counter() - started
+
+        self._futures[task_name] = self._executor.submit(timed)
+
+    def result(self, task_name: str, timeout: float = None):
+        started = time.perf_counter()
+        try:
+            return self._futures[task_name].result(timeout)
+        finally:
+            self._waits[task_name] = self._waits.get(task_name, 0) + time.perf_counter() - started
+
+    def saved(self) -> float:
+        """Seconds of joined work that overlapped with the caller instead of blocking it."""
+        return sum(
+            max(0.0, self._durations.get(task_name, 0.0) - waited)
+            for task_name, waited in self._waits.items()
+        )
+
+    def close(self) -> None:
+        self.stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for task_name, waited in self._waits.items():
+            logger.debug(
+                "%s: %s ran %.0f ms, blocked %.0f ms",
+                self.name, task_name,
+                self._durations.get(task_name, 0.0) * 1000, waited * 1000,
+            )
+        if self._waits:
+            logger.info("%s: overlapping saved %.0f ms", self.name, self.saved() * 1000)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
@@ -1,62 +1,69 @@
 import subprocess
+from functools import cached_property
 from pathlib import Path
-from rich.console import Console
+from .config_manager import get_console
+from .toolchain import TOOLS, Toolchain
 
 ASSETS_PATH = Path(__file__).parent.parent / "assets"
+HOMEBREW_INSTALL_URL = "https://raw.githubusercontent.com/Homebrew/install/HEAD/install.sh"
 
 class TerminalInstaller:
-    """This class provides utility functions for the cliutils 
+    """This class provides utility functions for the cliutils
     command."""
     def __init__(self):
-        self.console = Console()
         self.config_path = ASSETS_PATH / "config.yml"
+        self.toolchain = Toolchain()
+
+    @cached_property
+    def console(self):
+        return get_console()
 
     def check_and_install_terminal_requirements(self):
         """Check and install the terminal requirements for the cliutils command."""
-        # Check if Homebrew is installed, if not install it
-        homebrew_check = subprocess.run(
-            "brew --version", 
-            shell=True,
-            check=False,
-            stdout=subprocess.PIPE,
-            text=True
-        )
-        if homebrew_check.returncode != 0:
-            self.console.print(
-                "Homebrew Not Found, Installing Homebrew",
-                style="bold red"
-            )
-            homebrew_install_url = (
-                "https://raw.githubusercontent.com/Homebrew/install/"
-                "HEAD/install.sh"
-            )
-            subprocess.run(
-                f"/bin/bash -c \"$(curl -fsSL {homebrew_install_url})\"",
-                shell=True,
+        # One PATH lookup each, and version probes only for tools not seen before
+        tools = self.toolchain.probe(("brew", "gum", "git", "gh"))
+
+        if tools["brew"] is None:
+            self.console.print("Homebrew Not Found, Installing Homebrew", style="bold red")
+            script = subprocess.run(
+                ["curl", "-fsSL", HOMEBREW_INSTALL_URL],
                 check=True,
                 stdout=subprocess.PIPE,
-                text=True
-            )
+                text=True,
+            ).stdout
+            subprocess.run(["/bin/bash", "-c", script], check=True)
             self.console.print("Homebrew Installed", style="bold green")
         else:
-            self.console.print("Homebrew Found", style="bold green")
-        # Check if Gum is installed, if not install it
-        gum_check = subprocess.run(
-            "gum --version", 
-            shell=True,
-            check=False,
-            stdout=subprocess.PIPE,
-            text=True
-        )
-        if gum_check.returncode != 0:
-            self.console.print("Gum Not Found, Installing Gum", style="bold red")
-            subprocess.run(
-                "brew install gum", 
-                shell=True,
-                check=True,
-                stdout=subprocess.PIPE,
-                text=True
-            )
-            self.console.print("Gum Installed", style="bold green")
+            self.console.print(_found("Homebrew", tools["brew"]), style="bold green")
+
+        if tools["gum"] is None:
+            brew = self.toolchain.which("brew")
+            if brew is None:
+                # A fresh Homebrew may not be on this shell's PATH yet
+                self.console.print(
+                    "Gum Not Found; open a new shell and run `brew install gum`", style="bold red"
+                )
+            else:
+                self.console.print("Gum Not Found, Installing Gum", style="bold red")
+                subprocess.run([brew, "install", "gum"], check=True, stdout=subprocess.PIPE, text=True)
+                self.console.print("Gum Installed", style="bold green")
         else:
-            self.console.print("Gum Found", style="bold green")
+            self.console.print(_found("Gum", tools["gum"]), style="bold green")
+
+        for name in ("git", "gh"):
+            if tools[name] is None:
+                self.console.print(
+                    f"{name} Not Found; install it with {TOOLS[name].install_hint}", style="bold red"
+                )
+            else:
+                self.console.print(_found(name, tools[name]), style="bold green")
+
+    def init_input(self, header, default):
+        """Ask one setup question, keeping default when the answer is left empty."""
+        from .gum_prompts import GumPrompts  # pylint: disable=import-outside-toplevel
+
+        return GumPrompts().gum_input(header, default) or default
+
+
+def _found(label, tool):
+    return f"{label} {tool.version} Found" if tool.version else f"{label} Found"
@@ -0,0 +1,117 @@
+import logging
+import os
+from functools import cached_property
+from pathlib import Path
+from typing import NamedTuple
+from cliutils import tracing
+from .config_manager import CACHE_PATH, THEME_DIRS, ConfigError, Theme, _extract_theme, load_yaml
+from .file_cache import read_json, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+THEME_INDEX_PATH = CACHE_PATH / "theme-index.json"
+THEME_INDEX_VERSION = 1
+
+
+class ThemeInfo(NamedTuple):
+    name: str
+    path: str
+    theme: Theme
+    palette: dict  # every hex_* color in the file, by name without the prefix
+    icons: dict
+
+
+class ThemeRegistry:
+    """
+    Every theme in THEME_DIRS, read from one precompiled index file.
+
+    The index (~/.cliutils/cache/theme-index.json) holds each theme's prompt
+    colors, palette and icons along with the size and mtime of the file they
+    came from. Loading it stats the theme files and parses only those that were
+    added or changed since, so listing and previewing every theme normally costs
+    one JSON read and no YAML at all.
+    """
+
+    def __init__(self, theme_dirs=THEME_DIRS, index_path=THEME_INDEX_PATH):
+        self.theme_dirs = tuple(Path(theme_dir) for theme_dir in theme_dirs)
+        self.index_path = index_path
+
+    @cached_property
+    def themes(self) -> dict[str, ThemeInfo]:
+        """Themes by name, sorted; a user theme hides a packaged one of the same name."""
+        with tracing.span("load theme index", "config") as span:
+            index = read_json(self.index_path)
+            if not isinstance(index, dict) or index.get("version") != THEME_INDEX_VERSION:
+                index = {}
+            entries = index.get("themes", {})
+
+            fresh, parsed = {}, 0
+            for path in self._theme_files():
+                stat = path.stat()
+                stamp = [stat.st_mtime_ns, stat.st_size]
+                entry = entries.get(str(path))
+                if entry is None or entry["stamp"] != stamp:
+                    entry = self._compile(path, stamp)
+                    parsed += 1
+                fresh[str(path)] = entry
+
+            if parsed or fresh.keys() != entries.keys():
+                write_json_atomic(
+                    self.index_path, {"version": THEME_INDEX_VERSION, "themes": fresh}
+                )
+            span.set(themes=len(fresh), parsed=parsed)
+
+        themes = {}
+        # Later directories lose to earlier ones, so add them first
+        for path, entry in sorted(fresh.items(), key=lambda item: self._rank(item[0]), reverse=True):
+            if entry["name"] is None:
+                continue
+            themes[entry["name"]] = ThemeInfo(
+                entry["name"], path, Theme(*entry["values"]), entry["palette"], entry["icons"]
+            )
+        return dict(sorted(themes.items()))
+
+    def names(self) -> list[str]:
+        return list(self.themes)
+
+    def get(self, name: str) -> ThemeInfo | None:
+        return self.themes.get(name)
+
+    def _theme_files(self):
+        for theme_dir in self.theme_dirs:
+            try:
+                with os.scandir(theme_dir) as entries:
+                    yield from sorted(
+                        Path(entry.path) for entry in entries
+                        if entry.name.endswith(".yaml") and entry.is_file()
+                    )
+            except FileNotFoundError:
+                continue
+
+    def _rank(self, path: str) -> int:
+        parent = Path(path).parent
+        return next(
+            (rank for rank, theme_dir in enumerate(self.theme_dirs) if theme_dir == parent),
+            len(self.theme_dirs),
+        )
+
+    @staticmethod
+    def _compile(path: Path, stamp) -> dict:
+        """One theme file as an index entry; a file that is not a theme gets no name."""
+        try:
+            theme = load_yaml(path)
+            palette = theme["color_pallette"]
+            return {
+                "stamp": stamp,
+                # The file name is what the config refers to
+                "name": path.stem,
+                "values": _extract_theme(theme),
+                "palette": {
+                    key.removeprefix("hex_"): value
+                    for key, value in palette.items() if key.startswith("hex_")
+                },
+                "icons": dict(theme.get("icons") or {}),
+            }
+        except (ConfigError, KeyError, TypeError, AttributeError) as exc:
+            logger.debug("Skipping %s, not a theme: %r", path, exc)
+            return {"stamp": stamp, "name": None}
@@ -0,0 +1,331 @@
+import hashlib
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple
+from cliutils import tracing
+from .config_manager import CACHE_PATH
+from .jira_client import ticket_slug
+
+logger = logging.getLogger(__name__)
+
+TICKET_INDEX_PATH = CACHE_PATH / "tickets.sqlite3"
+SCHEMA_VERSION = 1
+SYNC_PAGE_SIZE = 100
+# Relative JQL dates are whole minutes; a little overlap re-fetches a few tickets, never misses one
+SYNC_OVERLAP_MINUTES = 2
+DEFAULT_SPRINT_FIELD = "customfield_10020"
+SEARCH_LIMIT = 50
+# Matches ranked per search; a word in most tickets still only ranks the newest ones
+RANK_WINDOW = 2000
+JIRA_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+TOKEN_PATTERN = re.compile(r"[^\W_]+")
+KEY_PATTERN = re.compile(r"([A-Z][A-Z0-9_]+)-\d+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    project TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    status TEXT,
+    assignee TEXT,
+    sprint TEXT,
+    labels TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS tickets_updated ON tickets (updated);
+CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(
+    key, summary, labels, sprint,
+    content='tickets', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS tickets_ai AFTER INSERT ON tickets BEGIN
+    INSERT INTO tickets_fts (rowid, key, summary, labels, sprint)
+    VALUES (new.id, new.key, new.summary, new.labels, new.sprint);
+END;
+CREATE TRIGGER IF NOT EXISTS tickets_ad AFTER DELETE ON tickets BEGIN
+    INSERT INTO tickets_fts (tickets_fts, rowid, key, summary, labels, sprint)
+    VALUES ('delete', old.id, old.key, old.summary, old.labels, old.sprint);
+END;
+CREATE TRIGGER IF NOT EXISTS tickets_au AFTER UPDATE ON tickets BEGIN
+    INSERT INTO tickets_fts (tickets_fts, rowid, key, summary, labels, sprint)
+    VALUES ('delete', old.id, old.key, old.summary, old.labels, old.sprint);
+    INSERT INTO tickets_fts (rowid, key, summary, labels, sprint)
+    VALUES (new.id, new.key, new.summary, new.labels, new.sprint);
+END;
+CREATE TABLE IF NOT EXISTS sync_state (
+    scope TEXT PRIMARY KEY,
+    high_water REAL,
+    synced_at REAL
+);
+"""
+
+UPSERT = """
+INSERT INTO tickets (key, project, summary, status, assignee, sprint, labels, updated)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    project = excluded.project, summary = excluded.summary, status = excluded.status,
+    assignee = excluded.assignee, sprint = excluded.sprint, labels = excluded.labels,
+    updated = excluded.updated
+WHERE excluded.updated IS NOT tickets.updated OR excluded.summary IS NOT tickets.summary
+"""
+
+
+class IndexedTicket(NamedTuple):
+    key: str
+    summary: str
+    status: str
+    assignee: str
+    sprint: str
+    labels: str  # space-separated
+
+    @property
+    def slug(self) -> str:
+        return ticket_slug(self.key, self.summary)
+
+    @property
+    def label(self) -> str:
+        """The line shown for this ticket in a picker."""
+        details = ", ".join(part for part in (self.status, self.assignee) if part)
+        return f"{self.key} {self.summary} ({details})" if details else f"{self.key} {self.summary}"
+
+
+class SyncResult(NamedTuple):
+    fetched: int
+    pages: int
+    full: bool  # the first sync of this scope, fetching every ticket
+    complete: bool  # False when stopped early; the next sync carries on from there
+
+
+class TicketIndex:
+    """
+    A local full-text index (SQLite FTS5) of the Jira tickets in some projects.
+
+    sync() fetches only tickets updated since the last sync, oldest first, a page
+    at a time. Each page is written in one transaction together with the newest
+    update time seen, so memory stays at one page, and an interrupted sync
+    (Ctrl-C, a dropped connection) leaves a usable index that the next sync
+    continues from. search() ranks tickets by BM25 over key, summary, labels and
+    sprint, with each word matched as a prefix, and filters by project, status
+    or assignee, in milliseconds even at 100k tickets.
+
+    The index lives in ~/.cliutils/cache/tickets.sqlite3; each base_url and set
+    of projects keeps its own sync position.
+    """
+
+    def __init__(self, base_url: str, projects, sprint_field: str = DEFAULT_SPRINT_FIELD,
+                 path=TICKET_INDEX_PATH):
+        self.projects = sorted(projects)
+        self.sprint_field = sprint_field
+        self.path = path
+        self.scope = hashlib.sha256(
+            "\0".join([base_url or "", *self.projects]).encode("utf-8")
+        ).hexdigest()[:32]
+        self._connection = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Opened on first use; a connection belongs to the thread that opened it."""
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5)
+            # Readers keep searching while a sync in another process writes
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                with connection:
+                    connection.executescript(SCHEMA)
+                    connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._connection = connection
+        return self._connection
+
+    def last_synced(self) -> float | None:
+        """When a sync of this scope last ran to the end, as a timestamp."""
+        row = self.connection.execute(
+            "SELECT synced_at FROM sync_state WHERE scope = ?", (self.scope,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def sync(self, jira, stop: threading.Event = None, on_page=None) -> SyncResult:
+        """
+        Fetch the tickets updated since the last sync into the index.
+
+        jira is a JiraClient. stop, when set, ends the sync after the page being
+        written; on_page(fetched) is called after each page.
+        """
+        row = self.connection.execute(
+            "SELECT high_water FROM sync_state WHERE scope = ?", (self.scope,)
+        ).fetchone()
+        high_water = row[0] if row else None
+
+        jql_query = f"project in ({', '.join(self.projects)})"
+        if high_water is not None:
+            # Relative to now, so the Jira user's time zone does not matter
+            minutes = math.ceil((time.time() - high_water) / 60) + SYNC_OVERLAP_MINUTES
+            jql_query += f' AND updated >= "-{minutes}m"'
+        jql_query += " ORDER BY updated ASC, key ASC"
+        fetched = pages = 0
+        with tracing.span("sync ticket index", "jira", projects=self.projects) as span:
+            for issues in jira.iter_issue_pages(
+                jql_query, self._fields, page_size=SYNC_PAGE_SIZE, quiet=True
+            ):
+                rows = [self._row(issue) for issue in issues]
+                page_high_water = max((row[-1] for row in rows if row[-1] is not None), default=None)
+                with self.connection:
+                    self.connection.executemany(UPSERT, rows)
+                    if page_high_water is not None:
+                        self.connection.execute(
+                            "INSERT INTO sync_state (scope, high_water) VALUES (?, ?) "
+                            "ON CONFLICT (scope) DO UPDATE SET "
+                            "high_water = max(coalesce(high_water, 0), excluded.high_water)",
+                            (self.scope, page_high_water),
+                        )
+                fetched += len(rows)
+                pages += 1
+                if on_page is not None:
+                    on_page(fetched)
+                if stop is not None and stop.is_set():
+                    span.set(fetched=fetched, pages=pages, complete=False)
+                    return SyncResult(fetched, pages, high_water is None, False)
+
+            with self.connection:
+                self.connection.execute(
+                    "INSERT INTO sync_state (scope, synced_at) VALUES (?, ?) "
+                    "ON CONFLICT (scope) DO UPDATE SET synced_at = excluded.synced_at",
+                    (self.scope, time.time()),
+                )
+            span.set(fetched=fetched, pages=pages, complete=True)
+        logger.debug("Synced %d ticket(s) in %d page(s) into %s", fetched, pages, self.path)
+        return SyncResult(fetched, pages, high_water is None, True)
+
+    def search(self, text: str, limit: int = SEARCH_LIMIT, project: str = None,
+               status: str = None, assignee: str = None) -> list[IndexedTicket]:
+        """
+        The best matches for text, each of its words matched as a prefix; with no
+        words, the most recently updated tickets. Filters compare case-insensitively.
+
+        Only the RANK_WINDOW most recently indexed matches are ranked, which FTS5
+        reads in rowid order without scoring the rest, so a word found in most
+        tickets costs about as much as a rare one.
+        """
+        filters = [f"t.project IN ({', '.join('?' * len(self.projects))})"]
+        filter_params = list(self.projects)
+        for column, value in (("project", project), ("status", status), ("assignee", assignee)):
+            if value:
+                filters.append(f"t.{column} = ? COLLATE NOCASE")
+                filter_params.append(value)
+        where = " AND ".join(filters)
+
+        columns = "t.key, t.summary, t.status, t.assignee, t.sprint, t.labels"
+        # A project key matches every ticket in it, e.g. the DATA of DATA-42
+        projects = {project.lower() for project in self.projects}
+        match = " ".join(
+            f'"{token}"*' for token in TOKEN_PATTERN.findall(text.lower()) if token not in projects
+        )
+        if match:
+            # Weights for key, summary, labels and sprint: a key or summary hit ranks first
+            query = (
+                f"SELECT {columns} FROM ("
+                f"SELECT {columns}, t.updated, bm25(tickets_fts, 10.0, 4.0, 2.0, 1.0) AS score "
+                "FROM tickets_fts JOIN tickets t ON t.id = tickets_fts.rowid "
+                f"WHERE tickets_fts MATCH ? AND {where} "
+                "ORDER BY tickets_fts.rowid DESC LIMIT ?"
+                ") AS t ORDER BY score, updated DESC LIMIT ?"
+            )
+            params = [match, *filter_params, RANK_WINDOW, limit]
+        else:
+            query = (
+                f"SELECT {columns} FROM tickets t WHERE {where} "
+                "ORDER BY t.updated DESC LIMIT ?"
+            )
+            params = [*filter_params, limit]
+
+        with tracing.span("search ticket index", "jira", query=text) as span:
+            tickets = [IndexedTicket(*row) for row in self.connection.execute(query, params)]
+            key = KEY_PATTERN.fullmatch(text.strip().upper())
+            if key:
+                # DATA-5 itself before DATA-50 and DATA-512, which its words match as well
+                exact = [ticket for ticket in tickets if ticket.key == key.group(0)] or [
+                    IndexedTicket(*row) for row in self.connection.execute(
+                        f"SELECT {columns} FROM tickets t WHERE t.key = ? AND {where}",
+                        [key.group(0), *filter_params],
+                    )
+                ]
+                tickets = exact + [ticket for ticket in tickets if ticket.key != key.group(0)][:limit - len(exact)]
+            span.set(results=len(tickets))
+        return tickets
+
+    def search_jira(self, jira, text: str, limit: int = SEARCH_LIMIT,
+                    status: str = None) -> list[IndexedTicket]:
+        """
+        Ask Jira directly, for when the index has no match: its text search also
+        looks at descriptions and comments. The tickets found are indexed too.
+        """
+        words = re.sub(r'["\\]', " ", text).strip()
+        conditions = [f'text ~ "{words}"'] if words else []
+        key = KEY_PATTERN.fullmatch(text.strip().upper())
+        if key and key.group(1) in self.projects:
+            conditions.append(f'key = "{key.group(0)}"')
+        if not conditions:
+            return []
+        jql_query = f"project in ({', '.join(self.projects)}) AND ({' OR '.join(conditions)})"
+        if status:
+            jql_query += f" AND status = {_jql_string(status)}"
+        jql_query += " ORDER BY updated DESC"
+
+        with tracing.span("search jira", "jira", query=text):
+            issues = next(jira.iter_issue_pages(jql_query, self._fields, page_size=limit), [])
+        rows = [self._row(issue) for issue in issues]
+        with self.connection:
+            self.connection.executemany(UPSERT, rows)
+        return [IndexedTicket(row[0], *row[2:7]) for row in rows]
+
+    @property
+    def _fields(self):
+        return ("summary", "status", "assignee", "labels", "updated", self.sprint_field)
+
+    def _row(self, issue: dict):
+        fields = issue.get("fields") or {}
+        assignee = fields.get("assignee") or {}
+        return (
+            issue["key"],
+            issue["key"].rsplit("-", 1)[0],
+            fields.get("summary") or "",
+            (fields.get("status") or {}).get("name"),
+            assignee.get("displayName"),
+            _sprint_name(fields.get(self.sprint_field)),
+            " ".join(fields.get("labels") or ()),
+            _timestamp(fields.get("updated")),
+        )
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+def _jql_string(value: str) -> str:
+    """value as a quoted JQL string, its quotes and backslashes escaped."""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _sprint_name(sprints) -> str | None:
+    """The active sprint of a ticket's sprint field, else its latest."""
+    if not sprints:
+        return None
+    sprints = [sprint for sprint in sprints if isinstance(sprint, dict)]
+    active = [sprint for sprint in sprints if sprint.get("state") == "active"]
+    chosen = (active or sprints or [{}])[-1]
+    return chosen.get("name")
+
+
+def _timestamp(value: str) -> float | None:
+    try:
+        return datetime.strptime(value, JIRA_TIME_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return None
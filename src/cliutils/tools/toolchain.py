@@ -0,0 +1,158 @@
+import functools
+import logging
+import os
+import re
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from cliutils import tracing
+from .config_manager import CACHE_PATH
+from .file_cache import read_json, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+TOOLCHAIN_CACHE_PATH = CACHE_PATH / "toolchain.json"
+TOOLCHAIN_CACHE_VERSION = 1
+PROBE_TIMEOUT = 10
+VERSION_PATTERN = re.compile(r"\d+(?:\.\d+)+")
+
+
+class ToolSpec(NamedTuple):
+    name: str
+    install_hint: str
+    min_version: tuple = None
+
+
+TOOLS = {
+    "brew": ToolSpec("brew", "see https://brew.sh"),
+    # add --pathspec-from-file (commit, ws) arrived in git 2.25
+    "git": ToolSpec("git", "`brew install git`", (2, 25)),
+    "gh": ToolSpec("gh", "`brew install gh`, then `gh auth login`"),
+    "gum": ToolSpec("gum", "`brew install gum`"),
+}
+
+
+class Tool(NamedTuple):
+    name: str
+    path: str
+    version: str  # "" when --version printed nothing recognisable
+
+
+class MissingTool(Exception):
+    """Required tools are not installed, or are too old; the message says which and how to fix it."""
+
+
+class Toolchain:
+    """
+    Where the external tools cliutils runs (gum, git, gh, brew) are, and their versions.
+
+    Tools are found with a PATH lookup. Their versions come from a cache
+    (~/.cliutils/cache/toolchain.json) that is trusted while the binary's path,
+    mtime and size are unchanged, so a normal run spawns nothing; after an
+    install or upgrade the changed tools are probed again with `--version`, all
+    at once. path overrides $PATH, e.g. to point at fake binaries in tests.
+    """
+
+    def __init__(self, path: str = None, cache_path=TOOLCHAIN_CACHE_PATH):
+        self.path = path
+        self.cache_path = cache_path
+
+    def which(self, name: str) -> str | None:
+        return shutil.which(name, path=self.path)
+
+    def probe(self, names=tuple(TOOLS)) -> dict[str, Tool | None]:
+        """The named tools by name; None for those not on PATH."""
+        with tracing.span("probe toolchain", "subprocess", tools=list(names)) as span:
+            cache = read_json(self.cache_path)
+            if not isinstance(cache, dict) or cache.get("version") != TOOLCHAIN_CACHE_VERSION:
+                cache = {"version": TOOLCHAIN_CACHE_VERSION, "tools": {}}
+            cached = cache["tools"]
+
+            found, stale = {}, {}
+            for name in names:
+                path = self.which(name)
+                if path is None:
+                    found[name] = None
+                    continue
+                stamp = _stamp(path)
+                entry = cached.get(name)
+                if entry and entry["path"] == path and entry["stamp"] == stamp:
+                    found[name] = Tool(name, path, entry["version"])
+                else:
+                    stale[name] = (path, stamp)
+
+            if stale:
+                with ThreadPoolExecutor(max_workers=len(stale)) as pool:
+                    versions = dict(zip(stale, pool.map(_version, (path for path, _ in stale.values()))))
+                for name, (path, stamp) in stale.items():
+                    found[name] = Tool(name, path, versions[name])
+                    cached[name] = {"path": path, "stamp": stamp, "version": versions[name]}
+                write_json_atomic(self.cache_path, cache)
+            span.set(probed=list(stale))
+        return found
+
+    def require(self, *names, needed_by: str = None) -> dict[str, Tool]:
+        """The named tools, or MissingTool listing every one that is missing or too old."""
+        tools = self.probe(names)
+        problems = []
+        for name in names:
+            spec, tool = TOOLS.get(name, ToolSpec(name, f"install {name}")), tools[name]
+            if tool is None:
+                problems.append(f"{name} is not installed; install it with {spec.install_hint}")
+            elif spec.min_version and tool.version and _parse_version(tool.version) < spec.min_version:
+                problems.append(
+                    f"{name} {tool.version} at {tool.path} is older than "
+                    f"{'.'.join(map(str, spec.min_version))}; upgrade it with {spec.install_hint}"
+                )
+        if problems:
+            heading = f"{needed_by} cannot run:" if needed_by else "Missing tools:"
+            raise MissingTool("\n".join([heading, *(f"  {problem}" for problem in problems)]))
+        return tools
+
+
+def requires_tools(*names):
+    """
+    Declare the external tools a click command runs. They are checked before the
+    command starts, so a missing one fails at once with how to install it rather
+    than part-way through.
+    """
+    def decorate(callback):
+        @functools.wraps(callback)
+        def checked(*args, **kwargs):
+            import click  # pylint: disable=import-outside-toplevel
+
+            try:
+                Toolchain().require(*names, needed_by=click.get_current_context().command_path)
+            except MissingTool as exc:
+                raise click.ClickException(str(exc)) from exc
+            return callback(*args, **kwargs)
+
+        return checked
+
+    return decorate
+
+
+def _stamp(path):
+    """The installed binary's mtime and size; symlinks (as brew uses) are followed."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _version(path) -> str:
+    try:
+        result = subprocess.run(
+            [path, "--version"], capture_output=True, text=True, timeout=PROBE_TIMEOUT, check=False
+        )
+    except (OSError, subprocess.TimeoutExpired) as exc:
+        logger.debug("%s --version failed: %s", path, exc)
+        return ""
+    match = VERSION_PATTERN.search(result.stdout or result.stderr or "")
+    return match.group(0) if match else ""
+
+
+def _parse_version(version: str) -> tuple:
+    return tuple(int(part) for part in version.split(".")) if version else ()
@@ -0,0 +1,199 @@
+import logging
+import os
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import cached_property
+from pathlib import Path
+from typing import NamedTuple
+from cliutils import tracing
+from .config_manager import CLIUTILS_HOME, ConfigError, load_yaml
+from .git_repo import GitRepo
+from .subprocess_utilities import CommandResult, SubprocessUtilities
+
+logger = logging.getLogger(__name__)
+
+WORKSPACE_PATH = CLIUTILS_HOME / "workspace.yml"
+DEFAULT_MAX_WORKERS = 8
+
+
+class WorkspaceError(Exception):
+    """The workspace manifest is missing, invalid or names an unknown repository."""
+
+
+class RepoSkipped(Exception):
+    """Raised by an operation when a repository has nothing to do; not a failure."""
+
+
+class WorkspaceRepo(NamedTuple):
+    name: str
+    path: Path
+
+
+@dataclass(slots=True)
+class RepoOutcome:
+    """How an operation went in one repository."""
+    repo: WorkspaceRepo
+    state: str  # "ok", "skipped" or "failed"
+    summary: str
+    duration: float
+    log: list = field(default_factory=list)
+    value: object = None
+
+    @property
+    def ok(self) -> bool:
+        return self.state != "failed"
+
+
+class RepoSession:
+    """
+    What an operation gets for one repository: a GitRepo and a run() that captures.
+
+    Nothing is written to the terminal while repositories run side by side; each
+    command and its output goes to the session log, shown once the operation ends.
+    """
+
+    def __init__(self, repo: WorkspaceRepo, subprocess_utilities: SubprocessUtilities):
+        self.repo = repo
+        self.subprocess_utilities = subprocess_utilities
+        self.git = GitRepo(subprocess_utilities, cwd=repo.path)
+        self.summary = ""
+        self.log = []
+
+    def run(self, argv, check: bool = True) -> CommandResult:
+        """Run argv in the repository; a failure raises CalledProcessError with its stderr."""
+        result = self.subprocess_utilities.execute(
+            argv, check=False, cwd=self.repo.path, capture_stderr=True
+        )
+        self.log.append(f"$ {' '.join(result.argv)}")
+        self.log.extend(line for line in (result.stdout or "").splitlines() if line)
+        self.log.extend(line for line in (result.stderr or "").splitlines() if line)
+        self.git.invalidate()
+        if check and not result.ok:
+            raise subprocess.CalledProcessError(
+                result.returncode, result.argv, output=result.stdout, stderr=result.stderr
+            )
+        return result
+
+
+class Workspace:
+    """
+    The repositories listed in the workspace manifest, and a bounded pool to run in.
+
+    The manifest (~/.cliutils/workspace.yml unless another path is given) lists
+    repository paths, relative to the manifest or with `~`, optionally named:
+
+        repos:
+          - ~/code/analytics-dbt
+          - path: ~/code/airflow-dags
+            name: dags
+
+    run() calls an operation once per repository on up to max_workers threads.
+    Operations spend their time in git and gh subprocesses, so the repositories
+    progress in parallel and the whole run takes about as long as the slowest one.
+    An exception only fails its own repository.
+    """
+
+    def __init__(
+        self,
+        manifest_path=None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        subprocess_utilities: SubprocessUtilities = None,
+    ):
+        self.manifest_path = Path(manifest_path or WORKSPACE_PATH).expanduser()
+        self.max_workers = max_workers
+        self.subprocess_utilities = subprocess_utilities or SubprocessUtilities()
+
+    @cached_property
+    def repos(self) -> list[WorkspaceRepo]:
+        if not self.manifest_path.exists():
+            raise WorkspaceError(
+                f"No workspace manifest at {self.manifest_path}; list your repositories "
+                "under `repos:` there"
+            )
+        try:
+            manifest = load_yaml(self.manifest_path) or {}
+        except ConfigError as exc:
+            raise WorkspaceError(str(exc)) from exc
+        entries = manifest.get("repos") if isinstance(manifest, dict) else None
+        if not entries:
+            raise WorkspaceError(f"No repos listed in {self.manifest_path}")
+
+        repos, names = [], set()
+        for entry in entries:
+            if isinstance(entry, dict):
+                path, name = entry.get("path"), entry.get("name")
+            else:
+                path, name = entry, None
+            if not path:
+                raise WorkspaceError(f"A repo in {self.manifest_path} has no path")
+            path = (self.manifest_path.parent / os.path.expandvars(str(path))).expanduser()
+            name = str(name or path.name)
+            if name in names:
+                raise WorkspaceError(
+                    f"Two repos in {self.manifest_path} are named {name}; give one a name"
+                )
+            names.add(name)
+            repos.append(WorkspaceRepo(name, path))
+        return repos
+
+    def select(self, names=()) -> list[WorkspaceRepo]:
+        """The named repositories in manifest order, or all of them."""
+        if not names:
+            return list(self.repos)
+        unknown = set(names) - {repo.name for repo in self.repos}
+        if unknown:
+            raise WorkspaceError(f"Not in the workspace: {', '.join(sorted(unknown))}")
+        return [repo for repo in self.repos if repo.name in names]
+
+    def run(self, operation, repos=None, on_done=None) -> list[RepoOutcome]:
+        """
+        Run operation(session) in each repository and return outcomes in manifest order.
+
+        on_done, if given, is called with each outcome as it finishes, e.g. to
+        update a progress line.
+        """
+        repos = self.repos if repos is None else repos
+        if not repos:
+            return []
+        workers = min(self.max_workers, len(repos))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cliutils-ws") as pool:
+            futures = {pool.submit(self._run_one, operation, repo): repo for repo in repos}
+            outcomes = {}
+            for future in as_completed(futures):
+                outcome = future.result()
+                outcomes[outcome.repo] = outcome
+                if on_done is not None:
+                    on_done(outcome)
+        return [outcomes[repo] for repo in repos]
+
+    def _run_one(self, operation, repo: WorkspaceRepo) -> RepoOutcome:
+        started = time.perf_counter()
+        session = RepoSession(repo, self.subprocess_utilities)
+        value = None
+        with tracing.span(repo.name, "workspace", path=str(repo.path)) as span:
+            try:
+                if not repo.path.is_dir():
+                    raise FileNotFoundError(f"{repo.path} does not exist")
+                value = operation(session)
+                state, summary = "ok", session.summary
+            except RepoSkipped as exc:
+                state, summary = "skipped", str(exc)
+            except subprocess.CalledProcessError as exc:
+                state, summary = "failed", _failure_summary(exc)
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                logger.debug("%s failed", repo.name, exc_info=True)
+                state, summary = "failed", str(exc) or type(exc).__name__
+            span.set(state=state)
+        return RepoOutcome(
+            repo, state, summary, time.perf_counter() - started, session.log, value
+        )
+
+
+def _failure_summary(exc: subprocess.CalledProcessError) -> str:
+    """The last line git or gh wrote to stderr, else which command failed."""
+    lines = [line for line in (exc.stderr or "").splitlines() if line.strip()]
+    if lines:
+        return lines[-1].strip()
+    return f"{' '.join(exc.cmd[0:2])} exited with {exc.returncode}"
@@ -0,0 +1,199 @@
+import atexit
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Not CLIUTILS_HOME: tracing starts before cliutils.tools (and its config) is imported
+TRACES_PATH = Path.home() / ".cliutils" / "traces"
+
+_tracer = None
+_phase_totals = None
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """A timed region; set() attaches results such as an exit status or byte count."""
+    __slots__ = ("name", "category", "args", "_started")
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self._started = None
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        record(
+            self.name, self.category, self._started,
+            time.perf_counter() - self._started, **self.args,
+        )
+        return False
+
+    def set(self, **args):
+        self.args.update(args)
+
+
+class Tracer:
+    """
+    Collects spans as complete ("X") Chrome Trace events and writes them on finish().
+
+    The file opens in chrome://tracing and ui.perfetto.dev; a table of time spent
+    per span is printed to stderr as well. Until enable() creates a Tracer, span()
+    returns a shared no-op and record() returns at once, so the hooks in
+    SubprocessUtilities (gum prompts included), HttpClient and ConfigManager cost
+    a global lookup per call. The module imports nothing beyond the standard library, so
+    `--trace` can start it before any command or tool module loads.
+    """
+
+    def __init__(self, path, command: str = None):
+        self.path = path
+        self.command = command
+        self.origin = time.perf_counter()
+        self.events = []
+        self.threads = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, category, started, duration, args):
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((started - self.origin) * 1e6, 1),
+            "dur": round(duration * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": args,
+        }
+        with self._lock:
+            self.events.append(event)
+            self.threads[thread.ident] = thread.name
+
+    def finish(self):
+        import json  # pylint: disable=import-outside-toplevel
+
+        total = time.perf_counter() - self.origin
+        self.add(self.command or "cliutils", "command", self.origin, total, {"argv": sys.argv})
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+             "args": {"name": name}}
+            for tid, name in self.threads.items()
+        ]
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as stream:
+                json.dump({"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, stream)
+        except OSError as exc:
+            print(f"Could not write trace to {self.path}: {exc}", file=sys.stderr)
+            return
+        self.print_summary(total)
+
+    def print_summary(self, total: float):
+        from rich.console import Console  # pylint: disable=import-outside-toplevel
+        from rich.table import Table  # pylint: disable=import-outside-toplevel
+
+        rows = {}
+        for event in self.events:
+            if event["cat"] == "command":
+                continue
+            key = (event["cat"], event["name"])
+            count, duration, longest, size = rows.get(key, (0, 0.0, 0.0, 0))
+            rows[key] = (
+                count + 1,
+                duration + event["dur"],
+                max(longest, event["dur"]),
+                size + event["args"].get("bytes", 0),
+            )
+
+        table = Table(title=f"Trace: {total * 1000:.0f} ms total, written to {self.path}")
+        for column in ("Category", "Span", "Calls", "Total ms", "Max ms", "Bytes"):
+            table.add_column(column, justify="left" if column in ("Category", "Span") else "right")
+        for (category, name), (count, duration, longest, size) in sorted(
+            rows.items(), key=lambda row: -row[1][1]
+        ):
+            table.add_row(
+                category, name, str(count),
+                f"{duration / 1000:.1f}", f"{longest / 1000:.1f}", str(size) if size else "",
+            )
+        Console(stderr=True).print(table)
+
+
+class PhaseTotals:
+    """
+    Calls and seconds per (category, name) span for the metrics store, plus the
+    seconds per category spent on the main thread, where the user is waiting.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.main_thread = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, category, duration):
+        on_main_thread = threading.current_thread() is threading.main_thread()
+        with self._lock:
+            calls, total = self.phases.get((category, name), (0, 0.0))
+            self.phases[(category, name)] = (calls + 1, total + duration)
+            if on_main_thread:
+                self.main_thread[category] = self.main_thread.get(category, 0.0) + duration
+
+
+def collect_phases() -> PhaseTotals:
+    """Keep per-span totals for this process, alongside or without a full trace."""
+    global _phase_totals  # pylint: disable=global-statement
+    if _phase_totals is None:
+        _phase_totals = PhaseTotals()
+    return _phase_totals
+
+
+def enable(path=None, command: str = None) -> Tracer:
+    """Start tracing this process; the trace is written and summarised at exit."""
+    global _tracer  # pylint: disable=global-statement
+    if _tracer is None:
+        if path is None:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = TRACES_PATH / f"{stamp}-{command or 'cliutils'}-{os.getpid()}.json"
+        _tracer = Tracer(Path(path), command)
+        atexit.register(_tracer.finish)
+    return _tracer
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, category: str, **args):
+    """Time a with-block as a span; a no-op unless tracing or phase totals are on."""
+    if _tracer is None and _phase_totals is None:
+        return _NULL_SPAN
+    return Span(name, category, args)
+
+
+def record(name: str, category: str, started: float, duration: float, **args) -> None:
+    """Add a span that was timed by the caller, with started from time.perf_counter()."""
+    if _tracer is not None:
+        _tracer.add(name, category, started, duration, args)
+    if _phase_totals is not None:
+        _phase_totals.add(name, category, duration)
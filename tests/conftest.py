@@ -0,0 +1,35 @@
+import os
+import subprocess
+import tempfile
+import pytest
+
+# cliutils resolves ~/.cliutils when it is imported, so HOME is swapped out first
+os.environ["HOME"] = tempfile.mkdtemp(prefix="cliutils-home-")
+os.environ.setdefault("TERMINAL_THEME", "iron_gold")
+os.environ["CLIUTILS_NO_DAEMON"] = "1"
+for variable in ("GIT_AUTHOR_NAME", "GIT_COMMITTER_NAME"):
+    os.environ[variable] = "Test"
+for variable in ("GIT_AUTHOR_EMAIL", "GIT_COMMITTER_EMAIL"):
+    os.environ[variable] = "test@example.com"
+
+
+def _git(cwd, *args):
+    return subprocess.run(
+        ["git", *args], cwd=cwd, check=True, capture_output=True, text=True
+    ).stdout
+
+
+@pytest.fixture
+def git():
+    """Run git in a directory and return its stdout: git(path, "status")."""
+    return _git
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """A repository on main with one empty commit."""
+    path = tmp_path / "repo"
+    path.mkdir()
+    _git(path, "init", "--quiet", "--initial-branch=main")
+    _git(path, "commit", "--quiet", "--allow-empty", "-m", "init")
+    return path
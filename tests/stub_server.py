@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import NamedTuple
+from urllib.parse import parse_qsl, urlsplit
+
+
+class StubRequest(NamedTuple):
+    method: str
+    path: str
+    query: dict
+    headers: dict
+    body: bytes
+    received_at: float
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class StubServer:
+    """
+    A local HTTP server on a thread, answering with handler(request).
+
+    handler returns (status, headers, body); body may be bytes, str, a dict or list
+    (sent as JSON), or an iterable of bytes chunks, each sent as an HTTP chunk as
+    it is produced, e.g. server-sent events. Every request is kept in `requests`,
+    `in_flight_max` is the most requests handled at once, and `disconnects` counts
+    streams the client closed before they ended.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        self.in_flight_max = 0
+        self.disconnects = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                self._respond()
+
+            def do_POST(self):  # pylint: disable=invalid-name
+                self._respond()
+
+            def _respond(self):
+                url = urlsplit(self.path)
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                request = StubRequest(
+                    self.command, url.path, dict(parse_qsl(url.query)),
+                    dict(self.headers), body, time.monotonic(),
+                )
+                with stub._lock:  # pylint: disable=protected-access
+                    stub.requests.append(request)
+                    stub._in_flight += 1  # pylint: disable=protected-access
+                    stub.in_flight_max = max(stub.in_flight_max, stub._in_flight)  # pylint: disable=protected-access
+                try:
+                    status, headers, payload = stub.handler(request)
+                    self._write(status, headers, payload)
+                finally:
+                    with stub._lock:  # pylint: disable=protected-access
+                        stub._in_flight -= 1  # pylint: disable=protected-access
+
+            def _write(self, status, headers, payload):
+                if isinstance(payload, (dict, list)):
+                    payload = json.dumps(payload)
+                if isinstance(payload, str):
+                    payload = payload.encode("utf-8")
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                if isinstance(payload, bytes) or payload is None:
+                    payload = payload or b""
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                # A stream is sent chunked, as event streams over HTTP/1.1 are
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for chunk in payload:
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+                    with stub._lock:  # pylint: disable=protected-access
+                        stub.disconnects += 1
+
+        return Handler
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from cliutils.commands import branch_new
+from cliutils.tools.git_repo import GitRepo
+
+
+def test_fetch_timeout_is_a_failed_result_and_prints_nothing(git, git_repo, monkeypatch, capsys):
+    # An origin whose transport never answers, so the fetch runs into its timeout
+    git(git_repo, "config", "protocol.ext.allow", "always")
+    git(git_repo, "remote", "add", "origin", "ext::sleep 30")
+    monkeypatch.setattr(branch_new, "repo", GitRepo(branch_new.subprocess_utils, cwd=git_repo))
+    monkeypatch.setattr(branch_new, "FETCH_TIMEOUT", 0.5)
+    monkeypatch.chdir(git_repo)
+
+    default_branch, fetch = branch_new._fetch_default_branch()
+
+    assert default_branch == "main"
+    assert not fetch.ok
+    assert fetch.stderr == "timed out after 0.5s"
+    assert capsys.readouterr() == ("", "")
+
+
+ABORTED_PICKER = """
+import sys
+from cliutils.commands import branch_new
+from cliutils.tools.git_repo import GitRepo
+
+def leave_picker(*args, **kwargs):
+    sys.exit(1)
+
+branch_new.repo = GitRepo(branch_new.subprocess_utils)
+branch_new.select_ticket_slug = leave_picker
+branch_new.branch_new.callback.__wrapped__(False, None, None)
+"""
+
+
+def test_leaving_the_picker_kills_the_fetch(git, git_repo):
+    git(git_repo, "config", "protocol.ext.allow", "always")
+    git(git_repo, "remote", "add", "origin", "ext::sleep 30")
+
+    started = time.perf_counter()
+    # A process of its own, since exiting it is what used to wait for the fetch
+    exited = subprocess.run(
+        [sys.executable, "-c", ABORTED_PICKER], cwd=git_repo, timeout=20, check=False,
+        env={**os.environ, "PYTHONPATH": str(Path(branch_new.__file__).parents[2])},
+    )
+
+    assert exited.returncode == 1
+    assert time.perf_counter() - started < 5
@@ -0,0 +1,106 @@
+import pytest
+from cliutils.commands import commit as commit_command
+from cliutils.tools.git_repo import GitRepo
+
+
+class FakePrompts:
+    """Picks the first listed change (or directory) for each commit and takes every suggestion."""
+
+    def gum_filter(self, options, header, has_limit=True, label=str):  # pylint: disable=unused-argument
+        options = list(options)
+        return options[0] if has_limit else options[:1]
+
+    def gum_input(self, header, placeholder=None):  # pylint: disable=unused-argument
+        return placeholder
+
+    def gum_confirm(self, header):  # pylint: disable=unused-argument
+        return True
+
+
+class FakeClients:
+    """Stands in for ClientConnections, suggesting a message naming the sampled files."""
+
+    samples = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    @property
+    def llm(self):
+        return self
+
+    def suggest_commit(self, sample, commit_types):
+        paths = sorted(stat.path for stat in sample.files)
+        self.samples.append(paths)
+        return commit_types[0], f"change {' '.join(paths)}"
+
+
+@pytest.fixture
+def split_repo(git, git_repo, monkeypatch):
+    for name in ("orders/orders.sql", "orders/items.sql", "users/users.sql", "README.md"):
+        (git_repo / name).parent.mkdir(exist_ok=True)
+        (git_repo / name).write_text("select 1\n")
+    git(git_repo, "add", ".")
+    git(git_repo, "commit", "--quiet", "-m", "models")
+    for name in ("orders/orders.sql", "orders/items.sql", "users/users.sql", "README.md"):
+        (git_repo / name).write_text("select 2\n")
+    (git_repo / "users" / "new.sql").write_text("select 3\n")
+
+    monkeypatch.chdir(git_repo)
+    monkeypatch.setattr(commit_command, "repo", GitRepo())
+    monkeypatch.setattr(commit_command, "prompts", FakePrompts())
+    monkeypatch.setattr(commit_command, "ClientConnections", FakeClients)
+    monkeypatch.setattr(commit_command, "_push", lambda background: None)
+    FakeClients.samples = []
+    return git_repo
+
+
+def _commits(git, path):
+    """(message, files) of each commit made on top of the models commit, oldest first."""
+    log = git(path, "log", "--reverse", "--format=%x00%s", "--name-only", ":/^models..HEAD")
+    return [
+        (lines[0], sorted(filter(None, lines[1:])))
+        for lines in (entry.split("\n") for entry in log.split("\0") if entry)
+    ]
+
+
+def test_split_suggests_each_commit_from_its_own_changes(git, split_repo):
+    commit_command._split_commit(False, False, use_ai=True)  # pylint: disable=protected-access
+
+    order = ["README.md", "orders/items.sql", "orders/orders.sql", "users/users.sql", "users/new.sql"]
+    assert FakeClients.samples == [[path] for path in order]
+    assert _commits(git, split_repo) == [(f"Feat: change {path}", [path]) for path in order]
+    assert git(split_repo, "status", "--porcelain") == ""
+
+
+def test_split_by_directory_samples_each_directory(git, split_repo):
+    commit_command._split_commit(True, False, use_ai=True)  # pylint: disable=protected-access
+
+    assert FakeClients.samples == [["README.md"], ["orders/items.sql", "orders/orders.sql"],
+                                   ["users/new.sql", "users/users.sql"]]
+    assert _commits(git, split_repo) == [
+        ("Feat: change README.md", ["README.md"]),
+        ("Feat: change orders/items.sql orders/orders.sql", ["orders/items.sql", "orders/orders.sql"]),
+        ("Feat: change users/new.sql users/users.sql", ["users/new.sql", "users/users.sql"]),
+    ]
+
+
+def test_split_without_ai_stages_nothing_until_every_commit_is_given(git, split_repo, monkeypatch):
+    staged_while_asking = []
+    prompts = FakePrompts()
+    ask = prompts.gum_input
+
+    def gum_input(header, placeholder=None):
+        staged_while_asking.append(git(split_repo, "diff", "--cached", "--name-only"))
+        return ask(header, placeholder) or "change"
+
+    monkeypatch.setattr(prompts, "gum_input", gum_input)
+    monkeypatch.setattr(commit_command, "prompts", prompts)
+    commit_command._split_commit(True, False)  # pylint: disable=protected-access
+
+    assert FakeClients.samples == []
+    assert staged_while_asking == ["", "", ""]
+    assert len(_commits(git, split_repo)) == 3
@@ -0,0 +1,112 @@
+import importlib
+import os
+import subprocess
+import sys
+import pytest
+import yaml
+
+
+@pytest.fixture
+def fresh_import(tmp_path, monkeypatch):
+    """
+    Import cliutils from scratch under a HOME of its own, counting subprocess
+    spawns and YAML parses; returns a function that does one import and the counts.
+    """
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("TERMINAL_THEME", "iron_gold")
+    counts = {"spawns": 0, "yaml_loads": 0}
+    real_safe_load = yaml.safe_load
+
+    def counted(spawn):
+        def wrapper(*args, **kwargs):
+            counts["spawns"] += 1
+            return spawn(*args, **kwargs)
+        return wrapper
+
+    def safe_load(stream):
+        counts["yaml_loads"] += 1
+        return real_safe_load(stream)
+
+    monkeypatch.setattr(subprocess, "Popen", counted(subprocess.Popen))
+    # Anything calling posix_spawn itself, without subprocess, is counted too
+    for name in ("posix_spawn", "posix_spawnp"):
+        if hasattr(os, name):
+            monkeypatch.setattr(os, name, counted(getattr(os, name)))
+    monkeypatch.setattr(yaml, "safe_load", safe_load)
+    saved = {name: module for name, module in sys.modules.items() if name.startswith("cliutils")}
+
+    def run():
+        for name in [name for name in sys.modules if name.startswith("cliutils")]:
+            del sys.modules[name]
+        counts.update(spawns=0, yaml_loads=0)
+        main = importlib.import_module("cliutils.__main__")
+        # Importing every command builds a ConfigManager, GumPrompts, ... in each of them
+        for spec in main.COMMANDS.values():
+            importlib.import_module(spec.module)
+        return dict(counts)
+
+    yield run
+    for name in [name for name in sys.modules if name.startswith("cliutils")]:
+        del sys.modules[name]
+    sys.modules.update(saved)
+
+
+def test_cold_start_parses_config_and_theme_once_without_spawning(fresh_import, tmp_path):
+    counts = fresh_import()
+
+    assert counts == {"spawns": 0, "yaml_loads": 2}
+    assert (tmp_path / ".cliutils" / "cache" / "compiled-config.json").exists()
+
+
+def test_warm_start_reads_only_the_compiled_cache(fresh_import):
+    fresh_import()
+
+    assert fresh_import() == {"spawns": 0, "yaml_loads": 0}
+
+
+def test_changed_config_recompiles_the_cache(fresh_import):
+    fresh_import()
+    from cliutils.tools import config_manager  # pylint: disable=import-outside-toplevel
+
+    compiled = config_manager.read_json(config_manager.COMPILED_CONFIG_PATH)
+    compiled["config_stamp"][1] -= 1
+    config_manager.write_json_atomic(config_manager.COMPILED_CONFIG_PATH, compiled)
+
+    # config.yml and, with the cache rebuilt, the theme
+    assert fresh_import() == {"spawns": 0, "yaml_loads": 2}
+
+
+def test_settings_are_shared_and_read_only(fresh_import):
+    fresh_import()
+    from cliutils.tools import ConfigManager  # pylint: disable=import-outside-toplevel
+
+    first, second = ConfigManager(), ConfigManager()
+    assert first.settings is second.settings
+    with pytest.raises(TypeError):
+        first.config["general"]["team-tag"] = "OTHER"
+
+
+def test_user_config_section_overrides_config_yml(fresh_import, tmp_path):
+    (tmp_path / ".cliutils").mkdir()
+    (tmp_path / ".cliutils" / "cliutils-config.yaml").write_text(
+        'aws-info:\n  dag-root: "~/dags"\n'
+    )
+    # The user config is parsed once, then read from the compiled cache
+    assert fresh_import()["yaml_loads"] == 3
+    assert fresh_import()["yaml_loads"] == 0
+    from cliutils.tools import ConfigManager  # pylint: disable=import-outside-toplevel
+
+    aws_info = ConfigManager().section("aws-info")
+
+    assert aws_info["dag-root"] == "~/dags"
+    assert ConfigManager().section("no-such-section") == {}
+
+
+def test_a_config_value_json_cannot_hold_does_not_stop_startup(fresh_import, tmp_path):
+    (tmp_path / ".cliutils").mkdir()
+    (tmp_path / ".cliutils" / "cliutils-config.yaml").write_text("released: 2024-01-01\n")
+
+    # The compiled cache cannot be written, so every start parses the YAML again
+    assert fresh_import() == {"spawns": 0, "yaml_loads": 3}
+    assert fresh_import() == {"spawns": 0, "yaml_loads": 3}
+    assert not list((tmp_path / ".cliutils" / "cache").glob("*.tmp"))
@@ -0,0 +1,57 @@
+from cliutils.tools.config_writer import _with_value, set_config_value
+
+
+def test_set_config_value_creates_the_file(tmp_path):
+    path = tmp_path / "cliutils-config.yaml"
+
+    set_config_value(path, "theme", "name", "dusk")
+
+    assert path.read_text() == 'theme:\n  name: "dusk"\n'
+
+
+def test_set_config_value_keeps_other_lines(tmp_path):
+    path = tmp_path / "cliutils-config.yaml"
+    path.write_text("# mine\ntheme:\n  name: dusk  \nai:\n  enabled: true\n")
+
+    set_config_value(path, "theme", "name", "emberglow")
+
+    assert path.read_text() == '# mine\ntheme:\n  name: "emberglow"\nai:\n  enabled: true\n'
+
+
+def test_missing_section_is_appended():
+    assert _with_value("ai:\n  enabled: true\n", "theme", "name", "dusk") == (
+        'ai:\n  enabled: true\ntheme:\n  name: "dusk"\n'
+    )
+
+
+def test_missing_key_is_added_at_the_section_indent():
+    text = "theme:\n    font: mono\nai:\n  enabled: true\n"
+
+    assert _with_value(text, "theme", "name", "dusk") == (
+        'theme:\n    name: "dusk"\n    font: mono\nai:\n  enabled: true\n'
+    )
+
+
+def test_a_nested_key_of_the_same_name_is_left_alone():
+    text = "theme:\n  colors:\n    name: red\n  name: dusk\n"
+
+    assert _with_value(text, "theme", "name", "emberglow") == (
+        'theme:\n  colors:\n    name: red\n  name: "emberglow"\n'
+    )
+
+
+def test_a_comment_after_the_section_is_kept():
+    text = "theme:  # picked with theme-select\n  # the default\n  name: dusk\n"
+
+    assert _with_value(text, "theme", "name", "emberglow") == (
+        'theme:  # picked with theme-select\n  # the default\n  name: "emberglow"\n'
+    )
+
+
+def test_a_file_without_a_trailing_newline():
+    assert _with_value("theme:\n  name: dusk", "theme", "name", "emberglow") == (
+        'theme:\n  name: "emberglow"\n'
+    )
+    assert _with_value("ai:\n  enabled: true", "theme", "name", "dusk") == (
+        'ai:\n  enabled: true\ntheme:\n  name: "dusk"\n'
+    )
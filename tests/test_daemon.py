@@ -0,0 +1,77 @@
+import base64
+import threading
+import pytest
+from stub_server import StubServer
+from cliutils.tools import daemon as daemon_module
+from cliutils.tools.daemon import CliutilsDaemon, DaemonClient, DaemonJiraClient, DaemonUnavailable
+
+CREDENTIALS = {"base_url": None, "email": "me@example.com", "username": "me", "api_token": "secret-token"}
+
+
+def _jira(request):
+    assert request.path == "/rest/api/3/search/jql"
+    return 200, {}, {"issues": [{"key": "DATA-1", "fields": {"summary": "Fix orders"}}], "isLast": True}
+
+
+def _user(request):
+    return base64.b64decode(request.headers["Authorization"].split()[1]).decode().split(":")
+
+
+@pytest.fixture
+def jira_stub(monkeypatch):
+    with StubServer(_jira) as stub:
+        for variable, key in (("JIRA_BASE_URL", "base_url"), ("JIRA_EMAIL", "email"),
+                              ("JIRA_USERNAME", "username"), ("JIRA_TOKEN", "api_token")):
+            monkeypatch.setenv(variable, stub.url if key == "base_url" else CREDENTIALS[key])
+        yield stub
+
+
+@pytest.fixture
+def running_daemon(jira_stub, tmp_path, monkeypatch):  # pylint: disable=unused-argument
+    monkeypatch.setattr(daemon_module, "SOCKET_PATH", tmp_path / "daemon.sock")
+    server = CliutilsDaemon(idle_timeout=60)
+    thread = threading.Thread(target=server.serve, daemon=True)
+    thread.start()
+    client = DaemonClient(tmp_path / "daemon.sock")
+    for _ in range(100):
+        try:
+            client.call("ping")
+            break
+        except DaemonUnavailable:
+            threading.Event().wait(0.02)
+    yield client
+    client.call("stop")
+    thread.join(5)
+
+
+def test_daemon_serves_tickets_with_its_own_credentials(running_daemon, jira_stub, monkeypatch):
+    sent = []
+    exchange = DaemonClient._exchange  # pylint: disable=protected-access
+
+    def recorded(self, op, args, **kwargs):
+        sent.append(args)
+        return exchange(self, op, args, **kwargs)
+
+    monkeypatch.setattr(DaemonClient, "_exchange", recorded)
+    credentials = {**CREDENTIALS, "base_url": jira_stub.url}
+
+    jira = DaemonJiraClient(running_daemon, **credentials)
+    tickets = jira.retrieve_tickets(refresh=True)
+
+    assert [ticket["key"] for ticket in tickets] == ["DATA-1"]
+    assert jira._local is None  # pylint: disable=protected-access
+    assert running_daemon.call("ping")["jira_clients"] == 1
+    assert all("secret-token" not in repr(args) for args in sent)
+    assert [_user(request) for request in jira_stub.requests] == [["me@example.com", "secret-token"]]
+
+
+def test_other_credentials_are_served_in_process(running_daemon, jira_stub):
+    credentials = {**CREDENTIALS, "base_url": jira_stub.url, "api_token": "another-token"}
+
+    jira = DaemonJiraClient(running_daemon, **credentials)
+    tickets = jira.retrieve_tickets(refresh=True)
+
+    assert [ticket["key"] for ticket in tickets] == ["DATA-1"]
+    assert jira.daemon is None
+    assert [_user(request) for request in jira_stub.requests] == [["me@example.com", "another-token"]]
+    jira.close()
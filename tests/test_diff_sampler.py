@@ -0,0 +1,29 @@
+import pytest
+from cliutils.tools.diff_sampler import DiffSampler
+
+NAMES = ["plain.py", "with space.py", 'a "quoted".py', "tab\there.py", "back\\slash.py", "ünïcode.py"]
+
+
+@pytest.mark.parametrize("name", NAMES)
+def test_every_changed_file_is_sampled_whatever_its_name(git, git_repo, monkeypatch, name):
+    monkeypatch.chdir(git_repo)
+    (git_repo / name).write_text("one = 1\n")
+    git(git_repo, "add", "--", name)
+
+    sample = DiffSampler().sample("--cached", paths=[f":(literal){name}"])
+
+    assert [stat.path for stat in sample.files] == [name]
+    assert sample.sampled == [name]
+    assert "+one = 1" in sample.patch
+
+
+def test_files_are_sampled_together(git, git_repo, monkeypatch):
+    monkeypatch.chdir(git_repo)
+    for name in NAMES:
+        (git_repo / name).write_text(f"{name!r}\n")
+    git(git_repo, "add", "--", *NAMES)
+
+    sample = DiffSampler().sample("--cached")
+
+    assert sorted(sample.sampled) == sorted(NAMES)
+    assert not sample.truncated
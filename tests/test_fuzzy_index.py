@@ -0,0 +1,34 @@
+import random
+import pytest
+from cliutils.tools.fuzzy_index import FuzzyIndex
+
+
+def test_substring_matches_come_before_other_fuzzy_matches():
+    index = FuzzyIndex(["a-b-c", "xabc", "cba", "ABCD"])
+
+    assert index.search("abc") == [1, 3, 0]
+    assert index.search("") == [0, 1, 2, 3]
+
+
+def test_narrowing_does_not_depend_on_typing_history():
+    index = FuzzyIndex(["axbxc", "abxc"])
+    index.search("ab")
+
+    assert index.search("abc") == FuzzyIndex(["axbxc", "abxc"]).search("abc") == [0, 1]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_narrowed_searches_equal_fresh_ones(seed):
+    rng = random.Random(seed)
+    labels = ["".join(rng.choices("abcxyz-", k=rng.randint(1, 12))) for _ in range(300)]
+    queries = ["".join(rng.choices("abcxyz", k=4)) for _ in range(20)]
+    narrowed = FuzzyIndex(labels[:200])
+
+    for query in queries:
+        for end in range(1, len(query) + 1):
+            narrowed.search(query[:end])
+    # Labels added after a query was kept are matched on the next search
+    narrowed.extend(labels[200:])
+    for query in queries:
+        for end in range(len(query), 0, -1):
+            assert narrowed.search(query[:end]) == FuzzyIndex(labels).search(query[:end])
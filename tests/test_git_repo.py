@@ -0,0 +1,69 @@
+from cliutils.tools.git_repo import GitRepo
+
+
+def _staged(git, path):
+    return sorted(git(path, "diff", "--cached", "--name-only").split())
+
+
+def _write(path, name, text="x\n"):
+    target = path / name
+    target.parent.mkdir(parents=True, exist_ok=True)
+    target.write_text(text)
+
+
+def test_top_level_group_stages_only_top_level_changes(git, git_repo):
+    for name in ("top.txt", "models/m.sql", "models/n.sql"):
+        _write(git_repo, name)
+    git(git_repo, "add", ".")
+    git(git_repo, "commit", "--quiet", "-m", "files")
+    for name in ("top.txt", "models/m.sql", "models/n.sql"):
+        _write(git_repo, name, "changed\n")
+    _write(git_repo, "new.txt")
+
+    repo = GitRepo(cwd=git_repo)
+    assert set(repo.changes_by_directory()) == {"./", "models/"}
+    repo.stage(["./"])
+
+    assert _staged(git, git_repo) == ["new.txt", "top.txt"]
+
+
+def test_directory_group_stages_everything_under_it(git, git_repo):
+    for name in ("top.txt", "models/m.sql", "models/deep/n.sql"):
+        _write(git_repo, name)
+
+    repo = GitRepo(cwd=git_repo)
+    repo.stage(["models/"])
+
+    assert _staged(git, git_repo) == ["models/deep/n.sql", "models/m.sql"]
+
+
+def test_stage_reads_odd_file_names_over_stdin(git, git_repo):
+    names = ["with space.txt", "quote\"d.txt", "ünï.txt"]
+    for name in names:
+        _write(git_repo, name)
+
+    GitRepo(cwd=git_repo).stage(names)
+
+    staged = git(git_repo, "-c", "core.quotePath=false", "diff", "--cached", "--name-only", "-z")
+    assert sorted(filter(None, staged.split("\0"))) == sorted(names)
+
+
+def test_commit_only_leaves_other_staged_paths(git, git_repo):
+    _write(git_repo, "a.txt")
+    _write(git_repo, "b.txt")
+    repo = GitRepo(cwd=git_repo)
+    repo.stage(["a.txt", "b.txt"])
+
+    repo.commit_only("first", ["a.txt"])
+
+    assert git(git_repo, "show", "--name-only", "--format=", "HEAD").split() == ["a.txt"]
+    assert _staged(git, git_repo) == ["b.txt"]
+
+
+def test_branch_is_read_without_a_status(git, git_repo):
+    repo = GitRepo(cwd=git_repo)
+    assert repo.branch == "main"
+
+    git(git_repo, "checkout", "--quiet", "--detach")
+    assert repo.branch is None
+    assert repo._status is None  # pylint: disable=protected-access
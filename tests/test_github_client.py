@@ -0,0 +1,147 @@
+import hashlib
+import json
+import re
+import pytest
+from cliutils.tools.github_client import (
+    MAX_SEARCH_QUERY,
+    GitHubClient,
+    read_snapshot,
+    repo_from_remote,
+)
+from stub_server import StubServer
+
+
+def _pull_request(repo, number):
+    return {
+        "number": number,
+        "title": f"Change {number}",
+        "url": f"https://github.com/{repo}/pull/{number}",
+        "isDraft": False,
+        "headRefName": f"feature/DATA-{number}-change",
+        "updatedAt": "2026-10-18T00:00:00Z",
+        "repository": {"nameWithOwner": repo},
+        "reviewDecision": "APPROVED",
+        "mergeable": "MERGEABLE",
+        "mergeStateStatus": "CLEAN",
+        "commits": {"nodes": [{"commit": {"statusCheckRollup": {"state": "SUCCESS"}}}]},
+    }
+
+
+class GraphQLStub:
+    """Answers aliased PR searches from a fixed set of PRs, paging by offset cursors, with ETags."""
+
+    def __init__(self, pull_requests):
+        self.pull_requests = pull_requests
+        self.not_modified = 0
+
+    def __call__(self, request):
+        if request.headers.get("Authorization") != "bearer test-token":
+            return 401, {}, {"message": "Bad credentials"}
+        payload = request.json()
+        variables = payload["variables"]
+        data = {"rateLimit": {"cost": 1, "remaining": 4999}}
+        for alias in re.findall(r"(q\d+): search\(", payload["query"]):
+            query = variables[alias]
+            assert len(query) <= MAX_SEARCH_QUERY
+            first = int(re.search(rf"{alias}: search\(.*?first: (\d+)", payload["query"]).group(1))
+            repos = re.findall(r"repo:(\S+)", query)
+            matches = [pr for pr in self.pull_requests if pr["repository"]["nameWithOwner"] in repos]
+            start = int(variables[f"after{alias[1:]}"] or 0)
+            data[alias] = {
+                "pageInfo": {"hasNextPage": start + first < len(matches), "endCursor": str(start + first)},
+                "nodes": matches[start:start + first],
+            }
+        body = json.dumps({"data": data})
+        etag = f'"{hashlib.sha256(body.encode()).hexdigest()[:16]}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return 304, {"ETag": etag}, b""
+        return 200, {"ETag": etag, "Content-Type": "application/json"}, body
+
+
+def test_searches_page_by_cursor_until_each_is_done():
+    pull_requests = [_pull_request("acme/api", n) for n in range(1, 6)] + [_pull_request("acme/web", 9)]
+    stub = GraphQLStub(pull_requests)
+    with StubServer(stub) as server:
+        client = GitHubClient("test-token", f"{server.url}/graphql")
+        client.page_size = 2
+        snapshot = client.open_pull_requests(["acme/api", "acme/web"])
+
+    assert [(pr.repo, pr.number) for pr in snapshot.pull_requests] == [
+        ("acme/api", 5), ("acme/api", 4), ("acme/api", 3), ("acme/api", 2), ("acme/api", 1),
+        ("acme/web", 9),
+    ]
+    # One search over both repos: three pages of two
+    assert len(server.requests) == 3
+    cursors = [request.json()["variables"]["after0"] for request in server.requests]
+    assert cursors == [None, "2", "4"]
+
+
+def test_long_repo_lists_split_into_aliased_searches_in_one_request():
+    repos = [f"acme/service-with-a-long-name-{index:02d}" for index in range(20)]
+    stub = GraphQLStub([_pull_request(repo, 100 + index) for index, repo in enumerate(repos)])
+    with StubServer(stub) as server:
+        client = GitHubClient("test-token", f"{server.url}/graphql")
+        snapshot = client.open_pull_requests(repos)
+
+    assert len(snapshot.pull_requests) == 20
+    assert len(server.requests) == 1
+    searches = [value for name, value in server.requests[0].json()["variables"].items() if name.startswith("q")]
+    assert len(searches) > 1
+    assert all(len(search) <= MAX_SEARCH_QUERY for search in searches)
+    assert sorted(repo for search in searches for repo in re.findall(r"repo:(\S+)", search)) == repos
+
+
+def test_only_searches_with_more_pages_are_asked_again():
+    repos = [f"acme/service-with-a-long-name-{index:02d}" for index in range(20)]
+    # Eleven PRs in the first repo, one in each of the rest
+    pull_requests = [_pull_request(repo, 100 + index) for index, repo in enumerate(repos)]
+    pull_requests += [_pull_request(repos[0], number) for number in range(1, 11)]
+    stub = GraphQLStub(pull_requests)
+    with StubServer(stub) as server:
+        client = GitHubClient("test-token", f"{server.url}/graphql")
+        client.page_size = 6
+        snapshot = client.open_pull_requests(repos)
+
+    assert len(snapshot.pull_requests) == 30
+    queries = [request.json()["query"] for request in server.requests]
+    aliases = [re.findall(r"(q\d+): search\(", query) for query in queries]
+    # Every search on the first page; then only the first search has more
+    assert len(aliases[0]) > 1
+    assert aliases[1:] == [["q0"], ["q0"]]
+
+
+def test_unchanged_pages_are_reused_on_304():
+    stub = GraphQLStub([_pull_request("acme/api", n) for n in range(1, 4)])
+    with StubServer(stub) as server:
+        client = GitHubClient("test-token", f"{server.url}/graphql")
+        client.page_size = 2
+        first = client.open_pull_requests(["acme/api"])
+        second = client.open_pull_requests(["acme/api"])
+
+        # A change to the second page only: the first is still answered with a 304
+        stub.pull_requests[2]["reviewDecision"] = "CHANGES_REQUESTED"
+        third = client.open_pull_requests(["acme/api"])
+
+    assert second.pull_requests == first.pull_requests
+    assert [request.headers.get("If-None-Match") is not None for request in server.requests] == [
+        False, False, True, True, True, True,
+    ]
+    assert stub.not_modified == 3
+    # Newest first: the changed #3 leads
+    assert [pr.review for pr in third.pull_requests] == ["CHANGES_REQUESTED", "APPROVED", "APPROVED"]
+    assert read_snapshot(["acme/api"], f"{server.url}/graphql").pull_requests == third.pull_requests
+
+
+@pytest.mark.parametrize(
+    ("url", "repo"),
+    [
+        ("git@github.com:acme/api.git", "acme/api"),
+        ("https://github.com/acme/api", "acme/api"),
+        ("ssh://git@github.example.com:22/acme/api.git", "acme/api"),
+        ("/srv/git/api.git", None),
+        ("file:///srv/git/acme/api.git", None),
+    ],
+)
+def test_repo_from_remote(url, repo):
+    assert repo_from_remote(url) == repo
@@ -0,0 +1,34 @@
+import pytest
+from cliutils.tools import gum_prompts
+from cliutils.tools.gum_prompts import GumPrompts
+
+
+@pytest.fixture
+def gum_installed(monkeypatch):
+    monkeypatch.setattr(gum_prompts, "_gum_missing", lambda: False)
+
+
+def test_gum_draws_the_prompts_by_default(gum_installed, monkeypatch):
+    monkeypatch.delenv("CLIUTILS_PROMPTS", raising=False)
+
+    assert GumPrompts().native is None
+
+
+def test_native_backend_is_used_when_selected(gum_installed, monkeypatch):
+    monkeypatch.setenv("CLIUTILS_PROMPTS", "native")
+    prompts = GumPrompts()
+    calls = []
+    monkeypatch.setattr(
+        type(prompts.native), "filter",
+        lambda self, *args: calls.append(args) or ["b"],
+    )
+
+    assert prompts.gum_filter(["a", "b"], "Pick") == ["b"]
+    assert calls == [(["a", "b"], "Pick", True, str)]
+
+
+def test_native_backend_stands_in_when_gum_is_missing(monkeypatch):
+    monkeypatch.delenv("CLIUTILS_PROMPTS", raising=False)
+    monkeypatch.setattr(gum_prompts, "_gum_missing", lambda: True)
+
+    assert GumPrompts().native is not None
@@ -0,0 +1,106 @@
+import threading
+import time
+import pytest
+import requests
+from cliutils.tools.http_client import HttpClient, HttpRequest, TokenBucket
+from stub_server import StubServer
+
+
+def _echo_after_delay(request):
+    time.sleep(float(request.query.get("delay", 0)))
+    return 200, {"Content-Type": "application/json"}, {"id": int(request.query["id"])}
+
+
+def test_batch_returns_results_in_request_order():
+    with StubServer(_echo_after_delay) as stub:
+        client = HttpClient()
+        # Later requests answer first, so completion order is the reverse of request order
+        batch = [
+            HttpRequest("GET", f"{stub.url}/item", {"id": index, "delay": (8 - index) * 0.02})
+            for index in range(8)
+        ]
+        responses = client.batch(batch)
+
+    assert [response.json()["id"] for response in responses] == list(range(8))
+
+
+def test_batch_keeps_to_the_per_host_limit():
+    with StubServer(_echo_after_delay) as stub:
+        client = HttpClient(max_connections=10, max_per_host=3)
+        client.batch(HttpRequest("GET", f"{stub.url}/item", {"id": index, "delay": 0.05}) for index in range(12))
+
+    assert len(stub.requests) == 12
+    assert stub.in_flight_max == 3
+
+
+def test_retry_after_is_honoured():
+    answered = set()
+    lock = threading.Lock()
+
+    def once_limited(request):
+        with lock:
+            first = request.query["id"] not in answered
+            answered.add(request.query["id"])
+        if first:
+            return 429, {"Retry-After": "1"}, {"message": "slow down"}
+        return 200, {}, {"id": int(request.query["id"])}
+
+    with StubServer(once_limited) as stub:
+        responses = HttpClient().batch(
+            HttpRequest("GET", f"{stub.url}/item", {"id": index}) for index in range(3)
+        )
+
+    assert [response.json()["id"] for response in responses] == [0, 1, 2]
+    for index in map(str, range(3)):
+        limited, retried = [request for request in stub.requests if request.query["id"] == index]
+        assert retried.received_at - limited.received_at >= 0.95
+
+
+def test_429_on_the_last_retry_is_raised():
+    def always_limited(_request):
+        return 429, {"Retry-After": "0"}, {"message": "slow down"}
+
+    with StubServer(always_limited) as stub:
+        client = HttpClient(max_retries=2)
+        with pytest.raises(requests.HTTPError) as raised:
+            client.get(f"{stub.url}/item", quiet=True)
+        results = client.batch([HttpRequest("GET", f"{stub.url}/other")], return_exceptions=True)
+
+    assert raised.value.response.status_code == 429
+    assert isinstance(results[0], requests.HTTPError)
+    # The first try and two retries, for each of the two calls
+    assert len(stub.requests) == 6
+
+
+@pytest.mark.parametrize("method, sent", [("GET", 3), ("POST", 1)])
+def test_gateway_errors_are_retried_only_for_idempotent_methods(method, sent):
+    def unavailable(_request):
+        return 503, {"Retry-After": "0"}, {"message": "unavailable"}
+
+    with StubServer(unavailable) as stub:
+        client = HttpClient(max_retries=2)
+        [result] = client.batch([HttpRequest(method, f"{stub.url}/item")], return_exceptions=True)
+
+    assert result.response.status_code == 503
+    assert len(stub.requests) == sent
+
+
+def test_429_on_a_post_is_retried():
+    def limited_once(request):
+        return (429, {"Retry-After": "0"}, {}) if len(stub.requests) == 1 else (200, {}, request.json())
+
+    with StubServer(limited_once) as stub:
+        response = HttpClient().post(f"{stub.url}/graphql", {"query": "q"})
+
+    assert response.json() == {"query": "q"}
+    assert len(stub.requests) == 2
+
+
+def test_token_bucket_spaces_acquisitions_after_the_burst():
+    bucket = TokenBucket(rate=20, burst=2)
+    started = time.monotonic()
+    for _ in range(12):
+        bucket.acquire()
+
+    # Two from the burst, then ten at 20 a second
+    assert time.monotonic() - started >= 0.45
@@ -0,0 +1,36 @@
+import threading
+import time
+from stub_server import StubServer
+from cliutils.tools.jira_client import DETAIL_FIELDS, JiraClient
+
+
+def test_fetch_ticket_details_keeps_order_and_marks_failures():
+    limited = set()
+    lock = threading.Lock()
+
+    def issues(request):
+        key = request.path.rsplit("/", 1)[-1]
+        number = int(key.split("-")[1])
+        if number == 3:
+            return 404, {}, {"errorMessages": ["Issue does not exist"]}
+        with lock:
+            first = key not in limited
+            limited.add(key)
+        if number == 5 and first:
+            return 429, {"Retry-After": "0"}, {}
+        # Earlier keys answer last, so completion order is not request order
+        time.sleep((8 - number) * 0.01)
+        return 200, {}, {"key": key, "fields": {"summary": f"Ticket {number}"}}
+
+    with StubServer(issues) as stub:
+        client = JiraClient(stub.url, "me@example.com", "me", "token")
+        details = client.fetch_ticket_details(f"DATA-{number}" for number in range(8))
+        client.close()
+
+    assert [detail and detail["key"] for detail in details] == [
+        "DATA-0", "DATA-1", "DATA-2", None, "DATA-4", "DATA-5", "DATA-6", "DATA-7",
+    ]
+    assert {request.query["fields"] for request in stub.requests} == {",".join(DETAIL_FIELDS)}
+    # The 429 was retried and the 404 was not
+    assert len(stub.requests) == 9
+    assert stub.in_flight_max > 1
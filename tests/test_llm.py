@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+import pytest
+from cliutils.tools.llm import LLMCancelled, LLMClient, LLMError, ResponseCache
+from stub_server import StubServer
+
+SSE_HEADERS = {"Content-Type": "text/event-stream"}
+
+
+def _event(name, data):
+    body = data if isinstance(data, str) else json.dumps({"type": name, **data})
+    return f"event: {name}\ndata: {body}\n\n".encode("utf-8")
+
+
+def _reply(*pieces, delay=0.0, stop=True):
+    """A canned Messages API event stream writing pieces as text deltas."""
+    yield _event("message_start", {"message": {"id": "msg_1"}})
+    for piece in pieces:
+        if delay:
+            time.sleep(delay)
+        yield piece if isinstance(piece, bytes) else _event(
+            "content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": piece}}
+        )
+    if stop:
+        yield _event("message_stop", {})
+
+
+@pytest.fixture
+def client_for(tmp_path):
+    clients = []
+
+    def make(stub):
+        client = LLMClient("test-key", base_url=f"{stub.url}/v1/messages", cache=ResponseCache(tmp_path / "llm"))
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_streamed_reply_is_cached_by_diff(client_for):
+    def reply(request):
+        diff = request.json()["messages"][0]["content"]
+        message = "Add the orders model" if "orders" in diff else "Fix the users model"
+        return 200, SSE_HEADERS, _reply('{"type": "feat", ', f'"message": "{message}"}}')
+
+    with StubServer(reply) as stub:
+        client = client_for(stub)
+        first = client.suggest_commit("+select * from orders", ["Feat", "Fix"])
+        again = client.suggest_commit("+select * from orders", ["Feat", "Fix"])
+        other = client.suggest_commit("+select * from users", ["Feat", "Fix"])
+
+    assert first == again == ("Feat", "Add the orders model")
+    assert other == ("Feat", "Fix the users model")
+    # The repeat was answered from the cache; a different diff was not
+    assert len(stub.requests) == 2
+    assert stub.requests[0].headers["x-api-key"] == "test-key"
+    assert stub.requests[0].json()["stream"] is True
+
+
+def test_cached_reply_is_handed_to_on_text_whole(client_for):
+    with StubServer(lambda _request: (200, SSE_HEADERS, _reply("Hello", ", ", "world"))) as stub:
+        client = client_for(stub)
+        streamed, replayed = [], []
+        client.complete("system", "prompt", on_text=streamed.append)
+        client.complete("system", "prompt", on_text=replayed.append)
+
+    assert streamed == ["Hello", ", ", "world"]
+    assert replayed == ["Hello, world"]
+
+
+def test_cancelling_closes_the_stream_and_caches_nothing(client_for):
+    def slow_then_fast(_request):
+        # The first reply would take 4s; the one after the cancel comes at once
+        delay = 0.02 if len(stub.requests) == 1 else 0
+        return 200, SSE_HEADERS, _reply(*(["word "] * 200), delay=delay)
+
+    with StubServer(slow_then_fast) as stub:
+        client = client_for(stub)
+        cancel = threading.Event()
+        started = time.monotonic()
+        with pytest.raises(LLMCancelled):
+            client.complete("system", "prompt", on_text=lambda _piece: cancel.set(), cancel=cancel)
+        assert time.monotonic() - started < 1
+
+        # The server notices the closed connection at its next write
+        deadline = time.monotonic() + 2
+        while not stub.disconnects and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert stub.disconnects == 1
+
+        streamed = []
+        client.complete("system", "prompt", on_text=streamed.append)
+    assert len(streamed) == 200
+    assert len(stub.requests) == 2
+
+
+def test_undecodable_event_is_skipped(client_for):
+    malformed = _event("content_block_delta", "{not json")
+    with StubServer(lambda _request: (200, SSE_HEADERS, _reply("one", malformed, " two"))) as stub:
+        text = client_for(stub).complete("system", "prompt")
+
+    assert text == "one two"
+
+
+def test_error_event_raises(client_for):
+    failed = _event("error", {"error": {"type": "overloaded_error", "message": "Overloaded"}})
+    with StubServer(lambda _request: (200, SSE_HEADERS, _reply("partial", failed, stop=False))) as stub:
+        with pytest.raises(LLMError, match="Overloaded"):
+            client_for(stub).complete("system", "prompt")
+
+
+def test_stream_ending_early_raises_and_is_not_cached(client_for):
+    with StubServer(lambda _request: (200, SSE_HEADERS, _reply("cut", stop=False))) as stub:
+        client = client_for(stub)
+        with pytest.raises(LLMError, match="ended before"):
+            client.complete("system", "prompt")
+        with pytest.raises(LLMError):
+            client.complete("system", "prompt")
+
+    assert len(stub.requests) == 2
@@ -0,0 +1,45 @@
+import importlib
+import sys
+import pytest
+from cliutils import tracing
+
+
+@pytest.fixture
+def import_main(monkeypatch):
+    """Import cliutils.__main__ afresh as if run with argv; returns its module."""
+    saved = sys.modules.pop("cliutils.__main__", None)
+
+    def run(*argv):
+        monkeypatch.setattr(tracing, "_phase_totals", None)
+        monkeypatch.setattr(sys, "argv", ["cliutils", *argv])
+        sys.modules.pop("cliutils.__main__", None)
+        return importlib.import_module("cliutils.__main__")
+
+    yield run
+    sys.modules.pop("cliutils.__main__", None)
+    if saved is not None:
+        sys.modules["cliutils.__main__"] = saved
+
+
+def test_phases_are_collected_for_commands_that_record_metrics(import_main, monkeypatch):
+    monkeypatch.delenv("CLIUTILS_METRICS", raising=False)
+
+    main = import_main("--debug", "commit", "--split")
+
+    assert main.phase_totals is not None
+    assert tracing.span("x", "test") is not tracing.span("y", "test")
+
+
+@pytest.mark.parametrize("argv, metrics", [
+    (["prompt-segment", "--format", "zsh"], ""),
+    (["--help"], ""),
+    (["commit"], "0"),
+])
+def test_phases_are_not_collected_when_nothing_records_them(import_main, monkeypatch, argv, metrics):
+    monkeypatch.setenv("CLIUTILS_METRICS", metrics)
+
+    main = import_main(*argv)
+
+    assert main.phase_totals is None
+    # Without a trace or phase totals, every span is the same no-op
+    assert tracing.span("x", "test") is tracing.span("y", "test")
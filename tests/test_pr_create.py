@@ -0,0 +1,15 @@
+import pytest
+from cliutils.commands import pr_create
+from cliutils.tools.git_repo import GitRepo
+
+
+def test_detached_head_exits_like_main(git, git_repo, monkeypatch, capsys):
+    git(git_repo, "checkout", "--quiet", "--detach")
+    monkeypatch.chdir(git_repo)
+    monkeypatch.setattr(pr_create, "repo", GitRepo(pr_create.subprocess_utils))
+
+    with pytest.raises(SystemExit):
+        # The undecorated command, as requires_tools would need gh on PATH
+        pr_create.pr_create.callback.__wrapped__(False, False, False)
+
+    assert capsys.readouterr().out == "You are not on a branch. Please create a new branch and try again.\n"
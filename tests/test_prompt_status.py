@@ -0,0 +1,89 @@
+import time
+import pytest
+from click.testing import CliRunner
+from cliutils.tools.daemon import DaemonUnavailable
+from cliutils.tools.prompt_status import PromptStatus, PromptStatusCache, read_prompt_status
+
+
+def test_status_string_puts_counts_before_symbols_like_headline():
+    status = PromptStatus("main", False, staged=2, changed=1, untracked=3, behind=0, ahead=1,
+                          stashed=0, conflicts=0)
+
+    assert status.status_string() == "2+!3?↑"
+
+
+def test_clean_status_string_is_empty():
+    assert PromptStatus("main", False, *[0] * 7).status_string() == ""
+
+
+def test_fields_line_lists_every_count():
+    status = PromptStatus("abc1234", True, 2, 1, 3, 0, 1, 4, 0)
+
+    assert status.fields() == "h abc1234 2 1 3 0 1 4 0"
+
+
+@pytest.fixture
+def cache():
+    # A max age no test waits out: only the stamps can trigger a refresh
+    return PromptStatusCache(max_age=3600, wait=5)
+
+
+def test_staging_refreshes_without_waiting_out_max_age(git, git_repo, cache):
+    (git_repo / "orders.sql").write_text("select 1\n")
+    assert cache.get(git_repo).untracked == 1
+
+    git(git_repo, "add", "orders.sql")
+
+    status = cache.get(git_repo)
+    assert (status.staged, status.untracked) == (1, 0)
+
+
+def test_commit_and_checkout_refresh_through_head_and_ref_stamps(git, git_repo, cache):
+    (git_repo / "orders.sql").write_text("select 1\n")
+    git(git_repo, "add", "orders.sql")
+    assert cache.get(git_repo).staged == 1
+
+    git(git_repo, "commit", "--quiet", "-m", "orders")
+    assert cache.get(git_repo).staged == 0
+
+    git(git_repo, "checkout", "--quiet", "-b", "feature")
+    assert cache.get(git_repo).branch == "feature"
+
+    git(git_repo, "checkout", "--quiet", "--detach")
+    status = cache.get(git_repo)
+    assert status.detached and status.branch == git(git_repo, "rev-parse", "--short=7", "HEAD").strip()
+
+
+def test_work_tree_edits_show_once_max_age_passes(git, git_repo):
+    (git_repo / "orders.sql").write_text("select 1\n")
+    git(git_repo, "add", "orders.sql")
+    git(git_repo, "commit", "--quiet", "-m", "orders")
+    cache = PromptStatusCache(max_age=0.2, wait=5)
+    assert cache.get(git_repo).changed == 0
+
+    (git_repo / "orders.sql").write_text("select 2\n")
+    # Nothing git watches changed, so the cached status is still served
+    assert cache.get(git_repo).changed == 0
+    time.sleep(0.3)
+    assert cache.get(git_repo).changed == 1
+
+
+def test_outside_a_repository_there_is_no_status(tmp_path, cache):
+    assert cache.get(tmp_path) is None
+    assert read_prompt_status(tmp_path) is None
+
+
+def test_prompt_segment_reads_the_status_directly_without_the_daemon(git_repo, monkeypatch):
+    from cliutils.commands import prompt_segment  # pylint: disable=import-outside-toplevel
+
+    class UnavailableDaemon:
+        def call(self, op, **args):
+            raise DaemonUnavailable(f"{op} refused")
+
+    (git_repo / "orders.sql").write_text("select 1\n")
+    runner = CliRunner()
+    direct = runner.invoke(prompt_segment.prompt_segment, [str(git_repo), "--format", "fields"])
+    monkeypatch.setattr(prompt_segment, "get_daemon_client", UnavailableDaemon)
+    fallback = runner.invoke(prompt_segment.prompt_segment, [str(git_repo), "--format", "fields"])
+
+    assert direct.output == fallback.output == "b main 0 0 1 0 0 0 0\n"
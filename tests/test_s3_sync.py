@@ -0,0 +1,159 @@
+import os
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from cliutils.tools.s3_sync import S3Sync  # pylint: disable=wrong-import-position
+
+BUCKET = "dags-bucket"
+URL = f"s3://{BUCKET}/dags"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.delenv("AWS_ENDPOINT_URL", raising=False)
+    with moto.mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def dags(tmp_path):
+    root = tmp_path / "dags"
+    for name, text in {
+        "orders.py": "orders = 1\n",
+        "team_a/users.py": "users = 1\n",
+        "team_a/__pycache__/users.cpython-313.pyc": "compiled",
+    }.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return root
+
+
+def _sync(root, client, verify=False, **kwargs):
+    syncer = S3Sync(root, URL, max_workers=4, client=client, **kwargs)
+    plan = syncer.plan(verify=verify)
+    return plan, syncer.apply(plan)
+
+
+def _remote(client):
+    listing = client.list_objects_v2(Bucket=BUCKET).get("Contents", [])
+    return {item["Key"]: item["ETag"].strip('"') for item in listing}
+
+
+def test_first_sync_uploads_everything_it_finds(dags, s3):
+    plan, result = _sync(dags, s3)
+
+    assert plan.listed
+    assert result.uploaded == 2 and not result.failed
+    assert sorted(_remote(s3)) == ["dags/orders.py", "dags/team_a/users.py"]
+
+
+def test_unchanged_resync_uploads_and_lists_nothing(dags, s3):
+    _sync(dags, s3)
+    s3_calls = []
+    s3.meta.events.register("before-call.s3", lambda model, **_: s3_calls.append(model.name))
+
+    plan, result = _sync(dags, s3)
+
+    assert not plan.listed
+    assert (plan.uploads, plan.deletes, len(plan.unchanged)) == ([], [], 2)
+    assert result.uploaded == 0
+    assert s3_calls == []
+
+
+def test_touched_but_unchanged_file_is_not_uploaded(dags, s3):
+    _sync(dags, s3)
+    stat = os.stat(dags / "orders.py")
+    os.utime(dags / "orders.py", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    plan, _ = _sync(dags, s3)
+
+    assert plan.uploads == []
+
+
+def test_changed_file_is_uploaded_again(dags, s3):
+    _sync(dags, s3)
+    before = _remote(s3)
+    (dags / "orders.py").write_text("orders = 2\n")
+
+    plan, result = _sync(dags, s3)
+
+    assert [local_file.key for local_file in plan.uploads] == ["orders.py"]
+    assert result.uploaded == 1
+    after = _remote(s3)
+    assert after["dags/orders.py"] != before["dags/orders.py"]
+    assert after["dags/team_a/users.py"] == before["dags/team_a/users.py"]
+
+
+def test_removed_file_is_deleted_from_the_bucket(dags, s3):
+    _sync(dags, s3)
+    (dags / "team_a" / "users.py").unlink()
+
+    plan, result = _sync(dags, s3)
+
+    assert plan.deletes == ["team_a/users.py"]
+    assert result.deleted == 1
+    assert sorted(_remote(s3)) == ["dags/orders.py"]
+    # Once deleted, the key is gone from the manifest too
+    assert _sync(dags, s3)[0].deletes == []
+
+
+def test_deletes_can_be_left_out(dags, s3):
+    _sync(dags, s3)
+    (dags / "team_a" / "users.py").unlink()
+
+    syncer = S3Sync(dags, URL, max_workers=4, client=s3)
+    plan = syncer.plan(delete=False)
+    syncer.apply(plan)
+
+    assert plan.deletes == []
+    assert "dags/team_a/users.py" in _remote(s3)
+
+
+def test_verify_finds_objects_changed_behind_the_manifest(dags, s3):
+    _sync(dags, s3)
+    s3.delete_object(Bucket=BUCKET, Key="dags/orders.py")
+    s3.put_object(Bucket=BUCKET, Key="dags/stray.py", Body=b"stray")
+
+    trusted, _ = _sync(dags, s3, verify=False)
+    plan, result = _sync(dags, s3, verify=True)
+
+    assert trusted.uploads == [] and trusted.deletes == []
+    assert [local_file.key for local_file in plan.uploads] == ["orders.py"]
+    assert plan.deletes == ["stray.py"]
+    assert (result.uploaded, result.deleted) == (1, 1)
+
+
+def test_multipart_etag_matches_the_uploaded_object(tmp_path, s3):
+    root = tmp_path / "big"
+    root.mkdir()
+    (root / "model.bin").write_bytes(os.urandom(11 * 1024 * 1024))
+    part_size = 5 * 1024 * 1024
+
+    plan, result = _sync(root, s3, multipart_threshold=part_size, part_size=part_size)
+
+    assert result.uploaded == 1
+    assert _remote(s3)["dags/model.bin"] == plan.uploads[0].etag
+    assert plan.uploads[0].etag.endswith("-3")
+    # A verified re-sync compares the listing with the local ETag and uploads nothing
+    verified, _ = _sync(root, s3, multipart_threshold=part_size, part_size=part_size, verify=True)
+    assert verified.uploads == []
+
+
+def test_planning_from_the_manifest_writes_nothing(dags, s3):
+    _sync(dags, s3)
+    (dags / "orders.py").write_text("orders = 2\n")
+    syncer = S3Sync(dags, URL, max_workers=4, client=s3)
+    recorded = syncer.manifest_path.read_bytes()
+
+    plan = syncer.plan()
+
+    assert [local_file.key for local_file in plan.uploads] == ["orders.py"]
+    assert syncer.manifest_path.read_bytes() == recorded
@@ -0,0 +1,13 @@
+import shutil
+from cliutils.tools.config_manager import ASSETS_PATH
+from cliutils.tools.theme_registry import ThemeRegistry
+
+
+def test_an_invalid_theme_file_is_skipped(tmp_path):
+    shutil.copy(ASSETS_PATH / "themes" / "dusk.yaml", tmp_path / "dusk.yaml")
+    (tmp_path / "broken.yaml").write_text("color_pallette: [unclosed\n")
+
+    registry = ThemeRegistry([tmp_path], tmp_path / "theme-index.json")
+
+    assert registry.names() == ["dusk"]
+    assert registry.get("dusk").palette["user_color"].startswith("#")
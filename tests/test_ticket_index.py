@@ -0,0 +1,95 @@
+import re
+import threading
+import time
+from datetime import datetime, timezone
+import pytest
+from stub_server import StubServer
+from cliutils.tools import ticket_index
+from cliutils.tools.jira_client import JiraClient
+from cliutils.tools.ticket_index import TicketIndex
+
+NOW = time.time()
+# Ten minutes apart, the newest updated 10 minutes ago
+TICKETS = [
+    {
+        "key": f"DATA-{number}",
+        "summary": f"Fix the {'orders' if number % 2 else 'users'} model {number}",
+        "updated": NOW - (30 - number) * 600,
+    }
+    for number in range(30)
+]
+
+
+def _issue(ticket):
+    updated = datetime.fromtimestamp(ticket["updated"], timezone.utc)
+    return {"key": ticket["key"], "fields": {
+        "summary": ticket["summary"],
+        "status": {"name": "In Progress"},
+        "updated": updated.strftime("%Y-%m-%dT%H:%M:%S.000%z"),
+    }}
+
+
+def _search(request):
+    """search/jql over TICKETS, honoring `updated >= "-Nm"`, maxResults and nextPageToken."""
+    since = re.search(r'updated >= "-(\d+)m"', request.query["jql"])
+    matches = [
+        ticket for ticket in TICKETS
+        if since is None or ticket["updated"] >= time.time() - int(since.group(1)) * 60
+    ]
+    start = int(request.query.get("nextPageToken", 0))
+    end = start + int(request.query["maxResults"])
+    return 200, {}, {
+        "issues": [_issue(ticket) for ticket in matches[start:end]],
+        "isLast": end >= len(matches),
+        "nextPageToken": str(end),
+    }
+
+
+@pytest.fixture
+def jira():
+    with StubServer(_search) as stub:
+        client = JiraClient(stub.url, "me@example.com", "me", "token")
+        yield stub, client
+        client.close()
+
+
+def test_interrupted_sync_resumes_from_the_last_page(jira, tmp_path, monkeypatch):
+    stub, client = jira
+    monkeypatch.setattr(ticket_index, "SYNC_PAGE_SIZE", 10)
+    index = TicketIndex(stub.url, ["DATA"], path=tmp_path / "tickets.sqlite3")
+    stop = threading.Event()
+    stop.set()
+
+    interrupted = index.sync(client, stop)
+
+    assert interrupted == (10, 1, True, False)
+    assert index.last_synced() is None
+    assert len(index.search("")) == 10
+
+    resumed = index.sync(client)
+
+    # Picks up at DATA-9, the newest ticket already indexed, rather than starting over
+    assert resumed == (21, 3, False, True)
+    assert index.last_synced() is not None
+    assert len(index.search("", limit=100)) == 30
+    assert [ticket.key for ticket in index.search("orders model 7")] == ["DATA-7"]
+    assert {ticket.key for ticket in index.search("users", limit=100)} == {
+        f"DATA-{number}" for number in range(0, 30, 2)
+    }
+    index.close()
+
+
+def test_search_jira_escapes_the_status(jira, tmp_path):
+    stub, client = jira
+    index = TicketIndex(stub.url, ["DATA"], path=tmp_path / "tickets.sqlite3")
+
+    found = index.search_jira(client, "orders", limit=5, status='Done" OR project = "HR')
+
+    assert len(found) == 5
+    assert stub.requests[-1].query["jql"] == (
+        'project in (DATA) AND (text ~ "orders") AND status = "Done\\" OR project = \\"HR" '
+        "ORDER BY updated DESC"
+    )
+    # What Jira found is indexed for the next local search
+    assert len(index.search("")) == 5
+    index.close()
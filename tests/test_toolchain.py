@@ -0,0 +1,91 @@
+import os
+import click
+import pytest
+from click.testing import CliRunner
+from cliutils.tools.toolchain import MissingTool, Toolchain, requires_tools
+
+
+@pytest.fixture
+def fake_bin(tmp_path, monkeypatch):
+    """A directory that is the whole PATH, and a function that writes fake tools into it."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    calls = tmp_path / "calls"
+    monkeypatch.setenv("PATH", str(bin_dir))
+
+    def install(name, version_line):
+        script = bin_dir / name
+        # Each run appends its name, so tests can count --version probes
+        script.write_text(f"#!/bin/sh\necho {name} >> '{calls}'\necho '{version_line}'\n")
+        script.chmod(0o755)
+        return script
+
+    install.probes = lambda: calls.read_text().split() if calls.exists() else []
+    return install
+
+
+def test_versions_are_cached_until_a_binary_changes(fake_bin, tmp_path):
+    fake_bin("gum", "gum version v0.14.1")
+    git = fake_bin("git", "git version 2.44.0")
+    toolchain = Toolchain(cache_path=tmp_path / "toolchain.json")
+
+    first = toolchain.probe(("gum", "git", "gh"))
+    assert first["gum"].version == "0.14.1"
+    assert first["git"].version == "2.44.0"
+    assert first["gh"] is None
+    assert sorted(fake_bin.probes()) == ["git", "gum"]
+
+    # Unchanged binaries are answered from the cache without running anything
+    assert toolchain.probe(("gum", "git", "gh")) == first
+    assert sorted(fake_bin.probes()) == ["git", "gum"]
+
+    # An upgrade changes the binary's mtime and size, so only it is probed again
+    fake_bin("git", "git version 2.45.10")
+    stat = os.stat(git)
+    os.utime(git, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    second = toolchain.probe(("gum", "git"))
+    assert second["git"].version == "2.45.10"
+    assert second["gum"] == first["gum"]
+    assert sorted(fake_bin.probes()) == ["git", "git", "gum"]
+
+
+def test_require_lists_missing_and_outdated_tools(fake_bin, tmp_path):
+    fake_bin("git", "git version 2.20.1")
+
+    with pytest.raises(MissingTool) as raised:
+        Toolchain(cache_path=tmp_path / "toolchain.json").require("git", "gum", needed_by="cliutils x")
+
+    lines = str(raised.value).splitlines()
+    assert lines[0] == "cliutils x cannot run:"
+    assert lines[1].startswith("  git 2.20.1 at ") and "older than 2.25" in lines[1]
+    assert lines[2] == "  gum is not installed; install it with `brew install gum`"
+
+
+def test_requires_tools_fails_before_the_command_runs(fake_bin):
+    fake_bin("git", "git version 2.44.0")
+    ran = []
+
+    @click.command("needs-gh")
+    @requires_tools("git", "gh")
+    def needs_gh():
+        ran.append(True)
+
+    result = CliRunner().invoke(needs_gh)
+
+    assert result.exit_code == 1
+    assert not ran
+    assert "Error: needs-gh cannot run:\n  gh is not installed; install it with `brew install gh`" in result.output
+
+
+def test_requires_tools_runs_the_command_when_all_are_present(fake_bin):
+    fake_bin("git", "git version 2.44.0")
+
+    @click.command("needs-git")
+    @requires_tools("git")
+    def needs_git():
+        click.echo("ran")
+
+    result = CliRunner().invoke(needs_git)
+
+    assert result.exit_code == 0
+    assert result.output == "ran\n"
@@ -0,0 +1,22 @@
+import pytest
+from cliutils.tools.workspace import Workspace, WorkspaceError
+
+
+def test_invalid_manifest_raises_workspace_error(tmp_path):
+    manifest = tmp_path / "workspace.yml"
+    manifest.write_text("repos: [unclosed\n")
+
+    with pytest.raises(WorkspaceError, match="Invalid YAML"):
+        Workspace(manifest).select()
+
+
+def test_manifest_paths_are_relative_to_the_manifest(tmp_path):
+    (tmp_path / "api").mkdir()
+    manifest = tmp_path / "workspace.yml"
+    manifest.write_text("repos:\n  - api\n  - path: api\n    name: backend\n")
+
+    repos = Workspace(manifest).repos
+
+    assert [(repo.name, repo.path) for repo in repos] == [
+        ("api", tmp_path / "api"), ("backend", tmp_path / "api"),
+    ]